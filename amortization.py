@@ -0,0 +1,82 @@
+import numpy as np
+import pandas as pd
+
+# Sistemas de amortização suportados
+SISTEMAS_AMORTIZACAO = ('price', 'sac')
+
+def calcular_taxa_mensal(taxa_juros_anual):
+    """Converte a taxa anual (em %) na taxa mensal equivalente (em fração)"""
+    return (1 + np.asarray(taxa_juros_anual, dtype=float) / 100) ** (1 / 12) - 1
+
+def calcular_parcela(valor_emprestimo, taxa_juros_anual, prazo_meses):
+    """
+    Calcula o valor da parcela usando juros compostos (Tabela Price)
+    - valor_emprestimo: valor total do empréstimo
+    - taxa_juros_anual: taxa de juros ao ano (em %)
+    - prazo_meses: prazo em meses
+
+    Aceita escalares ou arrays (um valor por empréstimo).
+    """
+    taxa_mensal = calcular_taxa_mensal(taxa_juros_anual)
+    fator = (1 + taxa_mensal) ** np.asarray(prazo_meses)
+    parcela = valor_emprestimo * (taxa_mensal * fator) / (fator - 1)
+    return parcela
+
+def gerar_cronograma(valor_emprestimo, taxa_juros_anual, prazo_meses, sistema='price'):
+    """
+    Calcula o cronograma completo de um ou vários empréstimos, sem laços por mês.
+
+    - valor_emprestimo, taxa_juros_anual, prazo_meses: escalares ou arrays de
+      mesmo tamanho (um valor por empréstimo)
+    - sistema: 'price' (parcelas fixas) ou 'sac' (amortização constante)
+
+    Retorna um dicionário com arrays 2-D (empréstimos x meses) para
+    'prestacao', 'amortizacao', 'juros' e 'saldo_devedor'. Para empréstimos com
+    prazo menor que o maior prazo do lote, os meses excedentes ficam zerados.
+    """
+    if sistema not in SISTEMAS_AMORTIZACAO:
+        raise ValueError(f"Sistema de amortização inválido: {sistema}. Use um de {SISTEMAS_AMORTIZACAO}")
+
+    valor = np.atleast_1d(np.asarray(valor_emprestimo, dtype=float))[:, None]
+    taxa = np.atleast_1d(calcular_taxa_mensal(taxa_juros_anual))[:, None]
+    prazo = np.atleast_1d(np.asarray(prazo_meses, dtype=int))[:, None]
+
+    meses = np.arange(1, prazo.max() + 1)[None, :]
+    ativo = meses <= prazo
+
+    if sistema == 'price':
+        # Saldo após k parcelas: P * ((1+i)^n - (1+i)^k) / ((1+i)^n - 1)
+        fator_prazo = (1 + taxa) ** prazo
+        fator_mes = (1 + taxa) ** meses
+        saldo = valor * (fator_prazo - fator_mes) / (fator_prazo - 1)
+        prestacao = np.broadcast_to(valor * taxa * fator_prazo / (fator_prazo - 1), saldo.shape)
+    else:
+        # SAC: amortização constante e saldo decrescendo linearmente
+        saldo = valor * (1 - meses / prazo)
+        prestacao = None
+
+    saldo_anterior = np.concatenate([np.broadcast_to(valor, (valor.shape[0], 1)), saldo[:, :-1]], axis=1)
+    juros = saldo_anterior * taxa
+    if prestacao is None:
+        amortizacao = np.broadcast_to(valor / prazo, saldo.shape)
+        prestacao = amortizacao + juros
+    else:
+        amortizacao = prestacao - juros
+
+    return {
+        'prestacao': np.where(ativo, prestacao, 0.0),
+        'amortizacao': np.where(ativo, amortizacao, 0.0),
+        'juros': np.where(ativo, juros, 0.0),
+        'saldo_devedor': np.where(ativo, np.maximum(saldo, 0.0), 0.0),
+    }
+
+def cronograma_dataframe(valor_emprestimo, taxa_juros_anual, prazo_meses, sistema='price'):
+    """Cronograma de um único empréstimo no formato exibido na interface"""
+    cronograma = gerar_cronograma(valor_emprestimo, taxa_juros_anual, prazo_meses, sistema)
+    return pd.DataFrame({
+        'Mês': np.arange(1, int(prazo_meses) + 1),
+        'Prestação': cronograma['prestacao'][0],
+        'Amortização': cronograma['amortizacao'][0],
+        'Juros': cronograma['juros'][0],
+        'Saldo Devedor': cronograma['saldo_devedor'][0]
+    })
@@ -1,35 +1,66 @@
+import json
+import os
 import numpy as np
 
-def calcular_taxa_juros(score, prazo):
+# Tabela de faixas usada pela interface e pelos processos em lote
+CONFIG_TAXAS = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'config', 'taxas_juros.json')
+
+_tabelas_carregadas = {}
+
+def carregar_tabela_taxas(caminho=CONFIG_TAXAS):
+    """
+    Carrega a tabela de faixas de taxa de juros a partir do arquivo de configuração.
+    
+    - ajuste_prazo.limites_meses: limite superior (inclusivo) de cada faixa de prazo
+    - ajuste_score.limites_score: score mínimo de cada faixa a partir da segunda
+    """
+    tabela = _tabelas_carregadas.get(caminho)
+    if tabela is not None:
+        return tabela
+    
+    with open(caminho, 'r', encoding='utf-8') as f:
+        config = json.load(f)
+    
+    tabela = {
+        'taxa_base': float(config['taxa_base']),
+        'limites_prazo': np.asarray(config['ajuste_prazo']['limites_meses'], dtype=float),
+        'ajustes_prazo': np.asarray(config['ajuste_prazo']['ajustes'], dtype=float),
+        'limites_score': np.asarray(config['ajuste_score']['limites_score'], dtype=float),
+        'ajustes_score': np.asarray(config['ajuste_score']['ajustes'], dtype=float),
+    }
+    
+    # Validar a tabela: n limites definem n + 1 faixas
+    for nome in ('prazo', 'score'):
+        limites, ajustes = tabela[f'limites_{nome}'], tabela[f'ajustes_{nome}']
+        if len(ajustes) != len(limites) + 1:
+            raise ValueError(f"Tabela de {nome} inválida: {len(limites)} limites exigem {len(limites) + 1} ajustes")
+        if np.any(np.diff(limites) <= 0):
+            raise ValueError(f"Os limites de {nome} devem estar em ordem crescente")
+    
+    _tabelas_carregadas[caminho] = tabela
+    return tabela
+
+def calcular_taxa_juros(score, prazo, taxa_base=None, tabela=None):
     """
     Calcula a taxa de juros baseada no score de crédito e prazo do empréstimo
+    
+    - score, prazo: escalares ou arrays (um valor por contrato)
+    - taxa_base: sobrescreve a taxa base da configuração (% ao ano), útil para
+      reprecificar uma carteira inteira quando a taxa base muda
+    - tabela: tabela já carregada (padrão: config/taxas_juros.json)
     """
-    # Taxa base
-    taxa_base = 19.56  # % ao ano
-    
-    # Ajuste por prazo
-    if prazo <= 12:
-        ajuste_prazo = 0
-    elif prazo <= 24:
-        ajuste_prazo = 2
-    elif prazo <= 36:
-        ajuste_prazo = 4
-    else:
-        ajuste_prazo = 6
-    
-    # Ajuste por score
-    if score >= 800:
-        ajuste_score = -4
-    elif score >= 700:
-        ajuste_score = -2
-    elif score >= 600:
-        ajuste_score = 0
-    elif score >= 500:
-        ajuste_score = 2
-    else:
-        ajuste_score = 4
+    if tabela is None:
+        tabela = carregar_tabela_taxas()
+    if taxa_base is None:
+        taxa_base = tabela['taxa_base']
+    
+    # Localizar a faixa de cada contrato por busca nos limites ordenados
+    faixa_prazo = np.searchsorted(tabela['limites_prazo'], prazo, side='left')
+    faixa_score = np.searchsorted(tabela['limites_score'], score, side='right')
     
     # Taxa final
-    taxa_final = taxa_base + ajuste_prazo + ajuste_score
+    taxa_final = taxa_base + tabela['ajustes_prazo'][faixa_prazo] + tabela['ajustes_score'][faixa_score]
     
-    return taxa_final
\ No newline at end of file
+    if np.ndim(taxa_final) == 0:
+        return float(taxa_final)
+    return taxa_final
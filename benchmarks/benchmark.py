@@ -0,0 +1,318 @@
+"""
+Benchmarks dos caminhos críticos do sistema de análise de crédito.
+
+Uso:
+    python benchmarks/benchmark.py --saida resultados.json
+    python benchmarks/benchmark.py --baseline resultados.json --tolerancia 0.15
+
+Com --baseline, cada métrica é comparada com a execução anterior e o script
+termina com código 1 se alguma piorar mais do que a tolerância.
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import shutil
+import sys
+import tempfile
+import time
+import warnings
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+PROJECT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, PROJECT_DIR)
+sys.path.insert(0, os.path.join(PROJECT_DIR, 'src'))
+
+from enhanced_model import criar_dados_historicos, treinar_modelo_avancado, analisar_novo_caso, analisar_lote
+from model_lifecycle import obter_modelo, obter_pontuador
+from src.core.linear_scorer import exportar_pontuador
+from amortization import calcular_parcela, gerar_cronograma
+from analysis_interest_rate import calcular_taxa_juros
+
+# Tamanhos usados em cada grupo de benchmarks
+TAMANHOS = {
+    'completo': {
+        'lote': [1_000, 100_000, 1_000_000],
+        'treino': [1_000, 10_000, 100_000],
+        'contratos': 100_000,
+        'ingestao': 200_000,
+        'repeticoes_latencia': 2_000,
+    },
+    'rapido': {
+        'lote': [1_000, 10_000],
+        'treino': [1_000, 5_000],
+        'contratos': 10_000,
+        'ingestao': 20_000,
+        'repeticoes_latencia': 200,
+    },
+}
+
+
+def medir(funcao, repeticoes=5, aquecimento=1):
+    """Executa `funcao` várias vezes e retorna a mediana e o p95 do tempo (em segundos)."""
+    for _ in range(aquecimento):
+        funcao()
+    tempos = np.empty(repeticoes)
+    for i in range(repeticoes):
+        inicio = time.perf_counter()
+        funcao()
+        tempos[i] = time.perf_counter() - inicio
+    return float(np.median(tempos)), float(np.percentile(tempos, 95))
+
+
+def latencia(nome, funcao, repeticoes):
+    mediana, p95 = medir(funcao, repeticoes=repeticoes, aquecimento=10)
+    return {nome: {'metrica': 'latencia_s', 'valor': mediana, 'p95': p95, 'maior_melhor': False}}
+
+
+def vazao(nome, funcao, linhas, repeticoes=3):
+    mediana, _ = medir(funcao, repeticoes=repeticoes)
+    return {nome: {'metrica': 'linhas_por_s', 'valor': linhas / mediana, 'tempo_s': mediana, 'maior_melhor': True}}
+
+
+def silencioso(funcao):
+    """Executa `funcao` descartando o que ela imprime (inclusive barras de progresso)."""
+    def executar():
+        with contextlib.redirect_stdout(io.StringIO()), contextlib.redirect_stderr(io.StringIO()):
+            return funcao()
+    return executar
+
+
+def bench_analisar_novo_caso(tamanhos):
+    model, feature_names = obter_modelo()
+    pontuador, _ = obter_pontuador()
+    cliente = criar_dados_historicos(1).drop(columns='default').iloc[0].to_dict()
+    resultados = latencia('analisar_novo_caso', lambda: analisar_novo_caso(model, feature_names, cliente),
+                          tamanhos['repeticoes_latencia'])
+    resultados.update(latencia('analisar_novo_caso[pontuador]',
+                               lambda: analisar_novo_caso(pontuador, feature_names, cliente),
+                               tamanhos['repeticoes_latencia']))
+    return resultados
+
+
+def bench_pontuador(tamanhos):
+    """Compara o PontuadorLinear com o predict_proba do scikit-learn (linha única e lote)."""
+    model, feature_names = obter_modelo()
+    pontuador = exportar_pontuador(model, feature_names)
+
+    n = tamanhos['lote'][-1]
+    X = criar_dados_historicos(n).drop(columns='default')[list(feature_names)].to_numpy(dtype=float)
+    linha = X[0]
+    diferenca = float(np.max(np.abs(pontuador.probabilidade(X) - model.predict_proba(X)[:, 1])))
+    if diferenca > 1e-9:
+        raise AssertionError(f"Pontuador diverge do scikit-learn: diferença máxima {diferenca:.2e}")
+
+    repeticoes = tamanhos['repeticoes_latencia']
+    resultados = {}
+    resultados.update(latencia('predict_proba[sklearn, 1 linha]',
+                               lambda: model.predict_proba(linha.reshape(1, -1)), repeticoes))
+    resultados.update(latencia('probabilidade[pontuador, 1 linha]', lambda: pontuador.probabilidade(linha), repeticoes))
+    resultados.update(vazao(f'predict_proba[sklearn, {n}]', lambda: model.predict_proba(X), n))
+    resultados.update(vazao(f'probabilidade[pontuador, {n}]', lambda: pontuador.probabilidade(X), n))
+    resultados[f'probabilidade[pontuador, {n}]']['diferenca_maxima'] = diferenca
+    return resultados
+
+
+def bench_analisar_emprestimo(tamanhos):
+    from predict_new_loan import analisar_emprestimo
+    if not os.path.exists(os.path.join(PROJECT_DIR, 'models', 'logistic_model.pkl')):
+        return {'analisar_emprestimo': {'ignorado': "models/logistic_model.pkl não encontrado"}}
+
+    dados = {
+        'loan_amnt': 10000,
+        'int_rate': 12.5,
+        'annual_inc': 50000,
+        'dti': 15.5,
+        'loan_to_income': 0.2,
+        'grade': 'B',
+        'purpose': 'debt_consolidation'
+    }
+    return latencia('analisar_emprestimo', lambda: analisar_emprestimo(dados), tamanhos['repeticoes_latencia'])
+
+
+def bench_analisar_lote(tamanhos):
+    model, feature_names = obter_modelo()
+    resultados = {}
+    for n in tamanhos['lote']:
+        dados = criar_dados_historicos(n).drop(columns='default')
+        resultados.update(vazao(f'analisar_lote[{n}]', lambda: analisar_lote(model, feature_names, dados), n))
+    return resultados
+
+
+def bench_parcelas_e_cronogramas(tamanhos):
+    n = tamanhos['contratos']
+    rng = np.random.default_rng(42)
+    valores = rng.uniform(1_000, 40_000, n)
+    scores = rng.uniform(0, 1000, n)
+    prazos = rng.choice([12, 18, 24, 36, 48, 60], n)
+    taxas = calcular_taxa_juros(scores, prazos)
+
+    resultados = {}
+    resultados.update(vazao('calcular_taxa_juros', lambda: calcular_taxa_juros(scores, prazos), n))
+    resultados.update(vazao('calcular_parcela', lambda: calcular_parcela(valores, taxas, prazos), n))
+    resultados.update(vazao('gerar_cronograma[price]', lambda: gerar_cronograma(valores, taxas, prazos), n))
+    resultados.update(vazao('gerar_cronograma[sac]', lambda: gerar_cronograma(valores, taxas, prazos, 'sac'), n))
+    return resultados
+
+
+def bench_treinamento(tamanhos):
+    resultados = {}
+    for n in tamanhos['treino']:
+        treinar = silencioso(lambda: treinar_modelo_avancado(n_samples=n))
+        mediana, _ = medir(treinar, repeticoes=3)
+        resultados[f'treinar_modelo_avancado[{n}]'] = {'metrica': 'tempo_s', 'valor': mediana, 'maior_melhor': False}
+    return resultados
+
+
+def criar_csv_bruto(n, caminho):
+    """Gera um arquivo no formato LoanStats a partir dos dados sintéticos de `criar_dados_historicos`."""
+    base = criar_dados_historicos(n)
+    rng = np.random.default_rng(42)
+    bruto = pd.DataFrame({
+        'id': np.arange(n),
+        'loan_amnt': base['loan_amnt'].round(0),
+        'term': rng.choice([' 36 months', ' 60 months'], n),
+        'int_rate': base['int_rate'].map('{:.2f}%'.format),
+        'grade': rng.choice(list('ABCDEFG'), n),
+        'emp_length': rng.choice(['< 1 year', '1 year', '5 years', '10+ years'], n),
+        'home_ownership': rng.choice(['RENT', 'OWN', 'MORTGAGE'], n),
+        'annual_inc': base['annual_inc'].round(2),
+        'purpose': rng.choice(['debt_consolidation', 'credit_card', 'car', 'small_business', 'other'], n),
+        'addr_state': rng.choice(['CA', 'NY', 'TX', 'FL', 'SP'], n),
+        'dti': rng.uniform(0, 40, n).round(2),
+        'delinq_2yrs': rng.integers(0, 3, n),
+        'earliest_cr_line': rng.choice(['Jan-2000', 'Mar-2010'], n),
+        'inq_last_6mths': base['consultas_cpf_6m'],
+        'open_acc': rng.integers(1, 30, n),
+        'pub_rec': rng.integers(0, 2, n),
+        'revol_bal': rng.integers(0, 50_000, n),
+        'revol_util': pd.Series(rng.uniform(0, 100, n)).map('{:.1f}%'.format),
+        'total_acc': rng.integers(1, 60, n),
+        'loan_status': np.where(base['default'] == 1, 'Charged Off', 'Fully Paid'),
+    })
+    with open(caminho, 'w', encoding='utf-8') as f:
+        f.write('Notes offered by Prospectus\n')
+        bruto.to_csv(f, index=False)
+
+
+def bench_ingestao(tamanhos):
+    from lending_club_scraper import LendingClubScraper
+
+    n = tamanhos['ingestao']
+    tmp_dir = tempfile.mkdtemp(prefix='bench_ingestao_')
+    try:
+        scraper = LendingClubScraper()
+        scraper.data_dir = tmp_dir
+        scraper.processed_dir = tmp_dir
+        criar_csv_bruto(n, os.path.join(tmp_dir, scraper.raw_file))
+
+        resultados = {}
+        resultados.update(vazao('process_data', silencioso(scraper.process_data), n))
+        resultados.update(vazao('process_data_streaming',
+                                silencioso(lambda: scraper.process_data_streaming(chunksize=50_000)), n))
+        return resultados
+    finally:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+
+
+BENCHMARKS = {
+    'analisar_novo_caso': bench_analisar_novo_caso,
+    'analisar_emprestimo': bench_analisar_emprestimo,
+    'analisar_lote': bench_analisar_lote,
+    'pontuador': bench_pontuador,
+    'parcelas': bench_parcelas_e_cronogramas,
+    'treinamento': bench_treinamento,
+    'ingestao': bench_ingestao,
+}
+
+
+def executar(grupos, tamanhos):
+    resultados = {}
+    for grupo in grupos:
+        print(f"Executando {grupo}...", file=sys.stderr)
+        resultados.update(BENCHMARKS[grupo](tamanhos))
+    return {
+        'metadados': {
+            'data': datetime.now().isoformat(timespec='seconds'),
+            'python': platform.python_version(),
+            'numpy': np.__version__,
+            'pandas': pd.__version__,
+            'plataforma': platform.platform(),
+            'cpus': os.cpu_count(),
+        },
+        'resultados': resultados,
+    }
+
+
+def comparar(atual, baseline, tolerancia):
+    """
+    Compara cada métrica com a baseline. Retorna uma lista de linhas
+    (nome, valor baseline, valor atual, variação, regressão?).
+    """
+    linhas = []
+    for nome, resultado in atual['resultados'].items():
+        anterior = baseline['resultados'].get(nome)
+        if 'valor' not in resultado or not anterior or 'valor' not in anterior:
+            continue
+        variacao = resultado['valor'] / anterior['valor'] - 1
+        # Para latências e tempos, um aumento é piora; para vazão, uma queda
+        piora = -variacao if resultado['maior_melhor'] else variacao
+        linhas.append((nome, anterior['valor'], resultado['valor'], variacao, piora > tolerancia))
+    return linhas
+
+
+def imprimir_resultados(resultados):
+    for nome, resultado in resultados['resultados'].items():
+        if 'ignorado' in resultado:
+            print(f"{nome:40s} ignorado: {resultado['ignorado']}")
+        elif resultado['metrica'] == 'linhas_por_s':
+            print(f"{nome:40s} {resultado['valor']:>16,.0f} linhas/s")
+        elif resultado['metrica'] == 'latencia_s':
+            print(f"{nome:40s} {resultado['valor'] * 1e6:>16,.1f} µs (p95 {resultado['p95'] * 1e6:,.1f} µs)")
+        else:
+            print(f"{nome:40s} {resultado['valor']:>16,.3f} s")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmarks de scoring, precificação, treino e ingestão.")
+    parser.add_argument('--grupos', nargs='+', choices=list(BENCHMARKS), default=list(BENCHMARKS),
+                        help="Grupos de benchmarks a executar (padrão: todos)")
+    parser.add_argument('--rapido', action='store_true', help="Usa tamanhos menores")
+    parser.add_argument('--saida', help="Arquivo JSON onde salvar os resultados")
+    parser.add_argument('--baseline', help="Arquivo JSON de uma execução anterior para comparação")
+    parser.add_argument('--tolerancia', type=float, default=0.10,
+                        help="Piora relativa aceita antes de acusar regressão (padrão: 0.10)")
+    args = parser.parse_args()
+
+    # Avisos do scikit-learn (convergência, nomes de features) poluiriam o relatório
+    warnings.filterwarnings('ignore')
+
+    resultados = executar(args.grupos, TAMANHOS['rapido' if args.rapido else 'completo'])
+    imprimir_resultados(resultados)
+
+    if args.saida:
+        with open(args.saida, 'w', encoding='utf-8') as f:
+            json.dump(resultados, f, indent=2)
+
+    if args.baseline:
+        with open(args.baseline, 'r', encoding='utf-8') as f:
+            baseline = json.load(f)
+
+        print(f"\nComparação com {args.baseline} (tolerância {args.tolerancia:.0%}):")
+        regressoes = 0
+        for nome, anterior, atual, variacao, regressao in comparar(resultados, baseline, args.tolerancia):
+            marcador = 'REGRESSÃO' if regressao else 'ok'
+            print(f"{nome:40s} {variacao:+8.1%}  {marcador}")
+            regressoes += regressao
+        if regressoes:
+            print(f"\n{regressoes} regressão(ões) acima da tolerância.")
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
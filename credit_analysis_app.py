@@ -1,7 +1,9 @@
 import streamlit as st
 import numpy as np
-import pandas as pd
-from enhanced_model import treinar_modelo_avancado, analisar_novo_caso
+from enhanced_model import analisar_novo_caso
+from model_lifecycle import obter_pontuador
+from amortization import calcular_parcela, cronograma_dataframe
+from analysis_interest_rate import calcular_taxa_juros
 
 def format_currency(value):
     """Formata valor em reais"""
@@ -17,17 +19,6 @@ def format_account_time(years):
     else:
         return f"{years:.1f} anos"
 
-def calcular_parcela(valor_emprestimo, taxa_juros_anual, prazo_meses):
-    """
-    Calcula o valor da parcela usando juros compostos
-    - valor_emprestimo: valor total do empréstimo
-    - taxa_juros_anual: taxa de juros ao ano (em %)
-    - prazo_meses: prazo em meses
-    """
-    taxa_mensal = (1 + taxa_juros_anual/100) ** (1/12) - 1
-    parcela = valor_emprestimo * (taxa_mensal * (1 + taxa_mensal) ** prazo_meses) / ((1 + taxa_mensal) ** prazo_meses - 1)
-    return parcela
-
 def calcular_custo_total(parcela, prazo_meses, valor_emprestimo):
     """Calcula o custo total do empréstimo"""
     total_pago = parcela * prazo_meses
@@ -35,33 +26,8 @@ def calcular_custo_total(parcela, prazo_meses, valor_emprestimo):
     return total_pago, juros_pagos
 
 def ajustar_taxa_juros(valor, prazo_meses, score_credito):
-    """Ajusta a taxa de juros baseado no prazo e score de crédito"""
-    # Taxa base: 1.5% a.m. = 19.56% a.a.
-    taxa_base = 19.56
-    
-    # Ajuste pelo prazo
-    if prazo_meses <= 12:
-        ajuste_prazo = 0
-    elif prazo_meses <= 24:
-        ajuste_prazo = 2
-    elif prazo_meses <= 36:
-        ajuste_prazo = 4
-    else:
-        ajuste_prazo = 6
-    
-    # Ajuste pelo score
-    if score_credito >= 800:
-        ajuste_score = -4
-    elif score_credito >= 700:
-        ajuste_score = -2
-    elif score_credito >= 600:
-        ajuste_score = 0
-    elif score_credito >= 500:
-        ajuste_score = 2
-    else:
-        ajuste_score = 4
-    
-    return taxa_base + ajuste_prazo + ajuste_score
+    """Ajusta a taxa de juros baseado no prazo e score de crédito (faixas em config/taxas_juros.json)"""
+    return calcular_taxa_juros(score_credito, prazo_meses)
 
 def main():
     # Configuração da página
@@ -238,24 +204,14 @@ def main():
     
     # Mostrar tabela de evolução
     if st.checkbox("Ver Evolução do Empréstimo"):
-        evolucao = []
-        saldo_devedor = loan_amount
-        taxa_mensal = (1 + taxa_juros/100) ** (1/12) - 1
-        
-        for mes in range(1, prazo_meses + 1):
-            juros_mes = saldo_devedor * taxa_mensal
-            amortizacao = parcela - juros_mes
-            saldo_devedor -= amortizacao
-            
-            evolucao.append({
-                'Mês': mes,
-                'Prestação': parcela,
-                'Amortização': amortizacao,
-                'Juros': juros_mes,
-                'Saldo Devedor': max(0, saldo_devedor)
-            })
-        
-        df_evolucao = pd.DataFrame(evolucao)
+        sistema = st.radio(
+            "Sistema de Amortização",
+            ['price', 'sac'],
+            format_func=lambda x: 'Tabela Price' if x == 'price' else 'SAC',
+            horizontal=True,
+            help="Price: parcelas fixas. SAC: amortização constante e parcelas decrescentes"
+        )
+        df_evolucao = cronograma_dataframe(loan_amount, taxa_juros, prazo_meses, sistema)
         st.dataframe(
             df_evolucao.style.format({
                 'Prestação': 'R$ {:.2f}',
@@ -284,8 +240,8 @@ def main():
                 'tem_outros_emprestimos': 1 if has_other_loans else 0
             }
             
-            # Fazer análise
-            model, feature_names = treinar_modelo_avancado()
+            # Fazer análise (modelo treinado uma única vez e compartilhado entre sessões)
+            model, feature_names = obter_pontuador()
             resultado = analisar_novo_caso(model, feature_names, dados_cliente)
             
             # Mostrar resultados
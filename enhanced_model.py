@@ -7,65 +7,36 @@ from sklearn.linear_model import LogisticRegression
 import pickle
 import os
 from analysis_interest_rate import calcular_taxa_juros
+from portfolio_generator import gerar_blocos
+from src.core.linear_scorer import PontuadorLinear
 
 # Simular um banco de dados com histórico
-def criar_dados_historicos(n_samples=1000):
-    np.random.seed(42)
-    
-    dados = {
-        # Features básicas (que já tínhamos)
-        'loan_amnt': np.random.uniform(1000, 40000, n_samples),
-        'int_rate': np.random.uniform(5, 25, n_samples),
-        'annual_inc': np.random.uniform(30000, 150000, n_samples),
-        
-        # NOVO: Histórico de Pagamentos
-        'dias_atraso_media': np.random.uniform(0, 30, n_samples),
-        'parcelas_pagas_pontualmente': np.random.uniform(0, 1, n_samples),  # % de parcelas em dia
-        'maior_atraso': np.random.uniform(0, 90, n_samples),
-        
-        # NOVO: Relacionamento com Banco
-        'tempo_conta_anos': np.random.uniform(0, 20, n_samples),
-        'saldo_medio': np.random.uniform(-1000, 50000, n_samples),
-        'usa_cheque_especial': np.random.choice([0, 1], n_samples),
-        
-        # NOVO: Score de Crédito
-        'score_credito': np.random.uniform(0, 1000, n_samples),
-        'consultas_cpf_6m': np.random.randint(0, 10, n_samples),
-        'tem_outros_emprestimos': np.random.choice([0, 1], n_samples)
-    }
-    
-    # Criar target (default) baseado em regras realistas
-    probabilidade_default = (
-        0.3 * (dados['dias_atraso_media'] > 5) +  # Atrasos frequentes
-        0.2 * (dados['parcelas_pagas_pontualmente'] < 0.8) +  # Histórico ruim
-        0.15 * (dados['score_credito'] < 600) +  # Score baixo
-        0.15 * (dados['usa_cheque_especial'] == 1) +  # Usa cheque especial
-        0.1 * (dados['consultas_cpf_6m'] > 3) +  # Muitas consultas
-        0.1 * (dados['tem_outros_emprestimos'] == 1)  # Tem outros empréstimos
-    )
-    
-    dados['default'] = np.random.binomial(1, probabilidade_default)
-    
-    return pd.DataFrame(dados)
+def criar_dados_historicos(n_samples=1000, seed=42, compacto=False):
+    """
+    Cria a base sintética de clientes (veja `portfolio_generator.gerar_blocos`).
+    Para bases grandes demais para a memória, use `portfolio_generator.gerar_portfolio`.
+    """
+    blocos = gerar_blocos(n_samples, seed=seed, compacto=compacto)
+    return pd.concat(blocos, ignore_index=True)
 
-def treinar_modelo_avancado():
+def treinar_modelo_avancado(n_samples=1000, test_size=0.2, random_state=42):
     """Treina um modelo com features avançadas de histórico."""
     print("1. Criando dados de treinamento com histórico...")
-    df = criar_dados_historicos()
+    df = criar_dados_historicos(n_samples)
     
     # Separar features e target
     X = df.drop('default', axis=1)
     y = df['default']
     
     # Dividir em treino e teste
-    X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, random_state=42)
+    X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=test_size, random_state=random_state)
     
     print("\n2. Distribuição de Default nos dados:")
     print(f"Taxa de Default: {y.mean():.1%}")
     
     # Treinar modelo
     print("\n3. Treinando modelo com features de histórico...")
-    model = LogisticRegression(random_state=42)
+    model = LogisticRegression(random_state=random_state)
     model.fit(X_train, y_train)
     
     # Avaliar modelo
@@ -87,6 +58,24 @@ def treinar_modelo_avancado():
     
     return model, X.columns
 
+# Regras de fatores de risco: nome -> (feature, comparação, limite)
+REGRAS_RISCO = {
+    'atraso_medio': ('dias_atraso_media', np.greater, 5),
+    'pontualidade_baixa': ('parcelas_pagas_pontualmente', np.less, 0.8),
+    'score_baixo': ('score_credito', np.less, 600),
+    'cheque_especial': ('usa_cheque_especial', np.equal, 1),
+    'consultas_cpf': ('consultas_cpf_6m', np.greater, 3),
+}
+
+# Mensagens exibidas para cada fator de risco identificado
+MENSAGENS_RISCO = {
+    'atraso_medio': lambda valor: f"Média de {valor:.1f} dias de atraso",
+    'pontualidade_baixa': lambda valor: f"Apenas {valor*100:.1f}% das parcelas pagas em dia",
+    'score_baixo': lambda valor: f"Score de crédito baixo: {valor:.0f}",
+    'cheque_especial': lambda valor: "Utiliza cheque especial",
+    'consultas_cpf': lambda valor: f"{valor} consultas ao CPF nos últimos 6 meses",
+}
+
 def analisar_novo_caso(model, feature_names, dados_cliente):
     """
     Analisa um novo caso com dados de histórico.
@@ -115,34 +104,60 @@ def analisar_novo_caso(model, feature_names, dados_cliente):
     }
     """
     # Preparar dados no formato correto
-    X = np.zeros(len(feature_names))
-    for i, feature in enumerate(feature_names):
-        X[i] = dados_cliente.get(feature, 0)
+    X = np.array([dados_cliente.get(feature, 0) for feature in feature_names], dtype=float)
     
-    # Fazer previsão
-    X = X.reshape(1, -1)
-    prob_default = model.predict_proba(X)[0][1]
-    is_default = model.predict(X)[0]
+    # Fazer previsão (a classe é derivada da probabilidade, sem uma segunda chamada ao modelo)
+    if isinstance(model, PontuadorLinear):
+        # Produto escalar + sigmoide direto na linha, sem o overhead do scikit-learn
+        prob_default = model.probabilidade(X)
+    else:
+        prob_default = model.predict_proba(X.reshape(1, -1))[0][1]
+    is_default = prob_default > 0.5
     
     # Analisar fatores de risco
     fatores_risco = []
-    if dados_cliente['dias_atraso_media'] > 5:
-        fatores_risco.append(f"Média de {dados_cliente['dias_atraso_media']:.1f} dias de atraso")
-    if dados_cliente['parcelas_pagas_pontualmente'] < 0.8:
-        fatores_risco.append(f"Apenas {dados_cliente['parcelas_pagas_pontualmente']*100:.1f}% das parcelas pagas em dia")
-    if dados_cliente['score_credito'] < 600:
-        fatores_risco.append(f"Score de crédito baixo: {dados_cliente['score_credito']:.0f}")
-    if dados_cliente['usa_cheque_especial'] == 1:
-        fatores_risco.append("Utiliza cheque especial")
-    if dados_cliente['consultas_cpf_6m'] > 3:
-        fatores_risco.append(f"{dados_cliente['consultas_cpf_6m']} consultas ao CPF nos últimos 6 meses")
+    for nome, (feature, comparacao, limite) in REGRAS_RISCO.items():
+        valor = dados_cliente[feature]
+        if comparacao(valor, limite):
+            fatores_risco.append(MENSAGENS_RISCO[nome](valor))
     
     return {
         'probabilidade_default': prob_default * 100,
-        'previsao': 'ALTO RISCO' if is_default == 1 else 'BAIXO RISCO',
+        'previsao': 'ALTO RISCO' if is_default else 'BAIXO RISCO',
         'fatores_risco': fatores_risco
     }
 
+def analisar_lote(model, feature_names, dados):
+    """
+    Analisa vários casos de uma só vez.
+    
+    - dados: DataFrame (ou array estruturado / lista de dicionários) com uma linha
+      por cliente e as mesmas colunas usadas em `analisar_novo_caso`
+    
+    Retorna um DataFrame com o mesmo índice de `dados`, contendo
+    `probabilidade_default`, `previsao` e uma coluna booleana `risco_<nome>`
+    para cada regra em REGRAS_RISCO.
+    """
+    if not isinstance(dados, pd.DataFrame):
+        dados = pd.DataFrame(dados)
+    
+    # Montar a matriz de features em um único passo (features ausentes valem 0)
+    X = dados.reindex(columns=list(feature_names), fill_value=0).to_numpy(dtype=float)
+    
+    # Uma única chamada ao modelo para todo o lote
+    prob_default = model.predict_proba(X)[:, 1]
+    
+    resultado = pd.DataFrame({
+        'probabilidade_default': prob_default * 100,
+        'previsao': np.where(prob_default > 0.5, 'ALTO RISCO', 'BAIXO RISCO')
+    }, index=dados.index)
+    
+    # Fatores de risco como máscaras booleanas por coluna
+    for nome, (feature, comparacao, limite) in REGRAS_RISCO.items():
+        resultado[f'risco_{nome}'] = comparacao(dados[feature].to_numpy(), limite)
+    
+    return resultado
+
 if __name__ == "__main__":
     # 1. Treinar modelo
     model, feature_names = treinar_modelo_avancado()
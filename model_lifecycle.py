@@ -0,0 +1,135 @@
+import hashlib
+import json
+import os
+import pickle
+import threading
+from datetime import datetime
+
+from enhanced_model import treinar_modelo_avancado
+from portfolio_generator import VERSAO_GERADOR
+from src.core.linear_scorer import PontuadorLinear, exportar_pontuador
+
+# Diretório onde os artefatos treinados são salvos
+MODEL_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'models')
+
+# Configuração padrão de treinamento (qualquer mudança gera uma nova versão do artefato)
+CONFIG_TREINAMENTO = {
+    'n_samples': 1000,
+    'test_size': 0.2,
+    'random_state': 42,
+}
+
+# Cache do processo: compartilhado por todas as sessões do Streamlit
+_modelos_carregados = {}
+_pontuadores_carregados = {}
+_lock = threading.RLock()
+
+def versao_config(config):
+    """Gera um hash curto e estável a partir da configuração de treinamento (e da versão do gerador de dados)."""
+    conteudo = json.dumps({'config': config, 'versao_gerador': VERSAO_GERADOR}, sort_keys=True)
+    return hashlib.sha256(conteudo.encode('utf-8')).hexdigest()[:12]
+
+def caminho_artefato(config, model_dir=MODEL_DIR):
+    """Caminho do artefato correspondente a uma configuração."""
+    return os.path.join(model_dir, f'enhanced_model_{versao_config(config)}.pkl')
+
+def caminho_pontuador(config, model_dir=MODEL_DIR):
+    """Caminho dos coeficientes exportados (veja `obter_pontuador`)."""
+    return os.path.join(model_dir, f'enhanced_model_{versao_config(config)}.npz')
+
+def salvar_artefato(model, feature_names, config, caminho):
+    """Salva o modelo treinado junto com a configuração que o gerou."""
+    os.makedirs(os.path.dirname(caminho), exist_ok=True)
+    artefato = {
+        'model': model,
+        'feature_names': list(feature_names),
+        'config': config,
+        'versao': versao_config(config),
+        'criado_em': datetime.now().isoformat(timespec='seconds'),
+    }
+    # Escrever em arquivo temporário e renomear evita artefatos corrompidos
+    caminho_tmp = f'{caminho}.{os.getpid()}.tmp'
+    with open(caminho_tmp, 'wb') as f:
+        pickle.dump(artefato, f)
+    os.replace(caminho_tmp, caminho)
+
+def carregar_artefato(caminho):
+    """Carrega um artefato salvo por `salvar_artefato`."""
+    with open(caminho, 'rb') as f:
+        return pickle.load(f)
+
+def obter_modelo(config=None, model_dir=MODEL_DIR):
+    """
+    Retorna (model, feature_names) para a configuração informada.
+
+    O modelo é treinado apenas uma vez: depois disso é lido do artefato em disco
+    e mantido em memória para todo o processo.
+    """
+    config = dict(CONFIG_TREINAMENTO if config is None else config)
+    versao = versao_config(config)
+
+    modelo = _modelos_carregados.get(versao)
+    if modelo is not None:
+        return modelo
+
+    with _lock:
+        # Outra thread pode ter carregado o modelo enquanto esperávamos
+        modelo = _modelos_carregados.get(versao)
+        if modelo is not None:
+            return modelo
+
+        caminho = caminho_artefato(config, model_dir)
+        if os.path.exists(caminho):
+            artefato = carregar_artefato(caminho)
+            model, feature_names = artefato['model'], artefato['feature_names']
+        else:
+            model, feature_names = treinar_modelo_avancado(**config)
+            feature_names = list(feature_names)
+            salvar_artefato(model, feature_names, config, caminho)
+
+        modelo = (model, feature_names)
+        _modelos_carregados[versao] = modelo
+        return modelo
+
+def obter_pontuador(config=None, model_dir=MODEL_DIR):
+    """
+    Retorna (pontuador, feature_names), onde o pontuador é um `PontuadorLinear`
+    com os coeficientes do modelo: mesma probabilidade do scikit-learn, sem o
+    custo de validação de entrada a cada chamada.
+
+    Os coeficientes são exportados uma vez para um .npz ao lado do artefato.
+    """
+    config = dict(CONFIG_TREINAMENTO if config is None else config)
+    versao = versao_config(config)
+
+    pontuador = _pontuadores_carregados.get(versao)
+    if pontuador is not None:
+        return pontuador
+
+    with _lock:
+        pontuador = _pontuadores_carregados.get(versao)
+        if pontuador is not None:
+            return pontuador
+
+        caminho = caminho_pontuador(config, model_dir)
+        if os.path.exists(caminho):
+            modelo = PontuadorLinear.carregar(caminho)
+        else:
+            model, feature_names = obter_modelo(config, model_dir)
+            modelo = exportar_pontuador(model, feature_names)
+            modelo.salvar(caminho)
+
+        pontuador = (modelo, modelo.feature_names)
+        _pontuadores_carregados[versao] = pontuador
+        return pontuador
+
+def limpar_cache():
+    """Descarta os modelos mantidos em memória (os artefatos em disco são preservados)."""
+    with _lock:
+        _modelos_carregados.clear()
+        _pontuadores_carregados.clear()
+
+if __name__ == "__main__":
+    model, feature_names = obter_modelo()
+    print(f"\nModelo versão {versao_config(CONFIG_TREINAMENTO)} disponível em: "
+          f"{caminho_artefato(CONFIG_TREINAMENTO)}")
@@ -0,0 +1,131 @@
+import math
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+# Incrementar quando a forma de gerar os dados mudar (invalida modelos treinados com a versão anterior)
+VERSAO_GERADOR = 2
+
+# Tipos usados com compacto=True (com compacto=False, float64/int64 como no numpy)
+DTYPES_COMPACTOS = {
+    'loan_amnt': np.float32,
+    'int_rate': np.float32,
+    'annual_inc': np.float32,
+    'dias_atraso_media': np.float32,
+    'parcelas_pagas_pontualmente': np.float32,
+    'maior_atraso': np.float32,
+    'tempo_conta_anos': np.float32,
+    'saldo_medio': np.float32,
+    'usa_cheque_especial': np.bool_,
+    'score_credito': np.float32,
+    'consultas_cpf_6m': np.int8,
+    'tem_outros_emprestimos': np.bool_,
+    'default': np.int8,
+}
+
+def gerar_bloco(n_samples, rng, compacto=False):
+    """
+    Gera `n_samples` clientes sintéticos com histórico usando o gerador `rng`.
+    """
+    dados = {
+        # Features básicas
+        'loan_amnt': rng.uniform(1000, 40000, n_samples),
+        'int_rate': rng.uniform(5, 25, n_samples),
+        'annual_inc': rng.uniform(30000, 150000, n_samples),
+
+        # Histórico de Pagamentos
+        'dias_atraso_media': rng.uniform(0, 30, n_samples),
+        'parcelas_pagas_pontualmente': rng.uniform(0, 1, n_samples),  # % de parcelas em dia
+        'maior_atraso': rng.uniform(0, 90, n_samples),
+
+        # Relacionamento com Banco
+        'tempo_conta_anos': rng.uniform(0, 20, n_samples),
+        'saldo_medio': rng.uniform(-1000, 50000, n_samples),
+        'usa_cheque_especial': rng.integers(0, 2, n_samples),
+
+        # Score de Crédito
+        'score_credito': rng.uniform(0, 1000, n_samples),
+        'consultas_cpf_6m': rng.integers(0, 10, n_samples),
+        'tem_outros_emprestimos': rng.integers(0, 2, n_samples)
+    }
+
+    # Criar target (default) baseado em regras realistas
+    probabilidade_default = (
+        0.3 * (dados['dias_atraso_media'] > 5) +  # Atrasos frequentes
+        0.2 * (dados['parcelas_pagas_pontualmente'] < 0.8) +  # Histórico ruim
+        0.15 * (dados['score_credito'] < 600) +  # Score baixo
+        0.15 * (dados['usa_cheque_especial'] == 1) +  # Usa cheque especial
+        0.1 * (dados['consultas_cpf_6m'] > 3) +  # Muitas consultas
+        0.1 * (dados['tem_outros_emprestimos'] == 1)  # Tem outros empréstimos
+    )
+
+    dados['default'] = rng.binomial(1, probabilidade_default)
+
+    if compacto:
+        dados = {coluna: valores.astype(DTYPES_COMPACTOS[coluna]) for coluna, valores in dados.items()}
+
+    return pd.DataFrame(dados)
+
+def _rng_do_bloco(seed, indice):
+    """
+    Gerador independente do bloco `indice`. Depende apenas da seed e do índice,
+    e não de qual processo gera o bloco nem da ordem de geração.
+    """
+    return np.random.default_rng(np.random.SeedSequence(seed, spawn_key=(indice,)))
+
+def _tamanhos_blocos(n_samples, tamanho_bloco):
+    n_blocos = max(1, math.ceil(n_samples / tamanho_bloco))
+    return [min(tamanho_bloco, n_samples - i * tamanho_bloco) for i in range(n_blocos)]
+
+def gerar_blocos(n_samples, tamanho_bloco=100_000, seed=42, compacto=False):
+    """
+    Gera a carteira sintética em blocos de até `tamanho_bloco` linhas.
+
+    O resultado é reprodutível para a mesma combinação de (seed, tamanho_bloco).
+    """
+    for indice, tamanho in enumerate(_tamanhos_blocos(n_samples, tamanho_bloco)):
+        yield gerar_bloco(tamanho, _rng_do_bloco(seed, indice), compacto)
+
+def _gravar_bloco(indice, tamanho, seed, compacto, diretorio):
+    caminho = os.path.join(diretorio, f'part-{indice:05d}.parquet')
+    gerar_bloco(tamanho, _rng_do_bloco(seed, indice), compacto).to_parquet(caminho, index=False)
+    return caminho
+
+def gerar_portfolio(n_samples, diretorio, tamanho_bloco=1_000_000, seed=42, compacto=True, n_processos=None):
+    """
+    Gera uma carteira sintética grande diretamente em disco, em paralelo.
+
+    Cada bloco vira um arquivo `part-NNNNN.parquet` em `diretorio` (o conjunto
+    pode ser lido com `pd.read_parquet(diretorio)`). Cada processo mantém em
+    memória apenas o bloco que está gerando, e o conteúdo de cada arquivo não
+    depende do número de processos.
+
+    Retorna a lista de arquivos gerados.
+    """
+    os.makedirs(diretorio, exist_ok=True)
+    tamanhos = _tamanhos_blocos(n_samples, tamanho_bloco)
+
+    with ProcessPoolExecutor(max_workers=n_processos) as executor:
+        futures = [
+            executor.submit(_gravar_bloco, indice, tamanho, seed, compacto, diretorio)
+            for indice, tamanho in enumerate(tamanhos)
+        ]
+        return [future.result() for future in futures]
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Gera uma carteira sintética de clientes em Parquet.")
+    parser.add_argument('n_samples', type=int, help="Número de clientes")
+    parser.add_argument('diretorio', help="Diretório de saída")
+    parser.add_argument('--tamanho-bloco', type=int, default=1_000_000)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--processos', type=int, default=None)
+    parser.add_argument('--float64', action='store_true', help="Não usar tipos compactos")
+    args = parser.parse_args()
+
+    arquivos = gerar_portfolio(args.n_samples, args.diretorio, args.tamanho_bloco, args.seed,
+                               compacto=not args.float64, n_processos=args.processos)
+    print(f"{len(arquivos)} arquivos gerados em {args.diretorio}")
@@ -0,0 +1,400 @@
+"""
+Serviço HTTP local de análise de crédito (somente biblioteca padrão + modelo).
+
+Os modelos são carregados uma única vez na inicialização. Requisições
+simultâneas são agrupadas em micro-lotes e avaliadas com uma única chamada
+vetorizada ao modelo.
+
+Endpoints:
+    POST /analisar      dados de histórico do cliente (lógica de `analisar_novo_caso`)
+    POST /emprestimo    pedido de empréstimo (lógica de `predict_new_loan.analisar_emprestimo`)
+    GET  /health        estado do serviço e dos modelos
+    GET  /metrics       contadores, tamanho dos lotes e latências
+
+Os endpoints POST aceitam um objeto JSON (um caso) ou uma lista de objetos.
+
+Uso:
+    python scoring_service.py --porta 8000 --max-lote 64 --espera-max-ms 2
+"""
+import argparse
+import asyncio
+import json
+import math
+import os
+import sys
+import time
+from collections import deque
+from http import HTTPStatus
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'src'))
+
+from enhanced_model import analisar_lote, REGRAS_RISCO, MENSAGENS_RISCO
+from model_lifecycle import obter_pontuador
+
+# Latências guardadas para o cálculo de percentis em /metrics
+JANELA_LATENCIAS = 10_000
+
+# Limites de uma requisição: requisições maiores são recusadas sem serem lidas
+MAX_CORPO = 1024 * 1024
+MAX_CABECALHOS = 100
+
+
+class ErroRequisicao(Exception):
+    """Erro de validação da requisição (resposta 400, ou `status`)."""
+
+    def __init__(self, mensagem, status=HTTPStatus.BAD_REQUEST):
+        super().__init__(mensagem)
+        self.status = status
+
+
+class MicroLote:
+    """
+    Agrupa chamadas concorrentes em lotes.
+
+    Cada `avaliar(item)` entra em uma fila; um único consumidor junta até
+    `max_lote` itens, esperando no máximo `espera_max` segundos depois do
+    primeiro, e chama `funcao_lote(itens)` (em uma thread, para não bloquear
+    o event loop). `funcao_lote` deve devolver um resultado por item, na mesma ordem.
+    """
+
+    def __init__(self, funcao_lote, max_lote=64, espera_max=0.002):
+        self.funcao_lote = funcao_lote
+        self.max_lote = max_lote
+        self.espera_max = espera_max
+        self.fila = asyncio.Queue()
+        self.lotes = 0
+        self.itens = 0
+        self.maior_lote = 0
+        self._tarefa = None
+
+    def iniciar(self):
+        self._tarefa = asyncio.create_task(self._consumir())
+
+    async def parar(self):
+        if self._tarefa is not None:
+            self._tarefa.cancel()
+            await asyncio.gather(self._tarefa, return_exceptions=True)
+
+    async def avaliar(self, item):
+        future = asyncio.get_running_loop().create_future()
+        await self.fila.put((item, future))
+        return await future
+
+    async def _consumir(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            lote = [await self.fila.get()]
+            prazo = loop.time() + self.espera_max
+            while len(lote) < self.max_lote:
+                restante = prazo - loop.time()
+                if restante <= 0:
+                    # Sem esperar mais: aproveitar o que já está na fila
+                    while len(lote) < self.max_lote and not self.fila.empty():
+                        lote.append(self.fila.get_nowait())
+                    break
+                try:
+                    lote.append(await asyncio.wait_for(self.fila.get(), restante))
+                except asyncio.TimeoutError:
+                    break
+
+            itens = [item for item, _ in lote]
+            try:
+                resultados = await loop.run_in_executor(None, self.funcao_lote, itens)
+            except Exception as erro:
+                for _, future in lote:
+                    if not future.done():
+                        future.set_exception(erro)
+            else:
+                for (_, future), resultado in zip(lote, resultados):
+                    if not future.done():
+                        future.set_result(resultado)
+
+            self.lotes += 1
+            self.itens += len(lote)
+            self.maior_lote = max(self.maior_lote, len(lote))
+
+    def metricas(self):
+        return {
+            'lotes': self.lotes,
+            'itens': self.itens,
+            'tamanho_medio_lote': self.itens / self.lotes if self.lotes else 0.0,
+            'maior_lote': self.maior_lote,
+            'fila': self.fila.qsize(),
+        }
+
+
+def criar_avaliador_historico(model, feature_names):
+    """Função de lote para /analisar: mesmo resultado de `analisar_novo_caso` para cada cliente."""
+    def avaliar(casos):
+        resultado = analisar_lote(model, feature_names, casos)
+        saida = []
+        for caso, linha in zip(casos, resultado.to_dict('records')):
+            fatores = [MENSAGENS_RISCO[nome](caso[REGRAS_RISCO[nome][0]])
+                       for nome in REGRAS_RISCO if linha[f'risco_{nome}']]
+            saida.append({
+                'probabilidade_default': float(linha['probabilidade_default']),
+                'previsao': linha['previsao'],
+                'fatores_risco': fatores,
+            })
+        return saida
+    return avaliar
+
+
+def criar_avaliador_emprestimo():
+    """
+    Função de lote para /emprestimo. Cada lote usa o modelo atual do registro
+    de `predict_new_loan`, que troca de versão quando o artefato em disco muda.
+    """
+    from predict_new_loan import analisar_emprestimos_lote, registro
+
+    def avaliar(pedidos):
+        return analisar_emprestimos_lote(pedidos, registro.obter())
+    return avaliar
+
+
+def _numero_finito(valor):
+    return isinstance(valor, (int, float)) and not isinstance(valor, bool) and math.isfinite(valor)
+
+
+def _rejeitar_constante(nome):
+    # NaN, Infinity e -Infinity não são JSON válido (o json do Python os aceita por padrão)
+    raise ErroRequisicao(f"Valor não permitido no JSON: {nome}")
+
+
+def validar_historico(caso, feature_names):
+    faltantes = [feature for feature in feature_names if feature not in caso]
+    if faltantes:
+        raise ErroRequisicao(f"Campos obrigatórios ausentes: {', '.join(faltantes)}")
+    for feature in feature_names:
+        if not _numero_finito(caso[feature]):
+            raise ErroRequisicao(f"Campo '{feature}' deve ser numérico e finito")
+
+
+def validar_emprestimo(pedido, feature_names):
+    from predict_new_loan import NUMERIC_FIELDS
+    for campo in NUMERIC_FIELDS:
+        if campo in pedido and not _numero_finito(pedido[campo]):
+            raise ErroRequisicao(f"Campo '{campo}' deve ser numérico e finito")
+
+
+class ServicoPontuacao:
+    def __init__(self, max_lote=64, espera_max=0.002, max_corpo=MAX_CORPO):
+        self.max_lote = max_lote
+        self.espera_max = espera_max
+        self.max_corpo = max_corpo
+        self.inicio = time.time()
+        self.endpoints = {}  # caminho -> (MicroLote, validador, feature_names)
+        self.erros_carregamento = {}
+        self.requisicoes = {}
+        self.erros = {}
+        self.latencias = deque(maxlen=JANELA_LATENCIAS)
+
+    def carregar_modelos(self):
+        """
+        Carrega os modelos uma única vez. Um modelo indisponível desativa apenas o seu endpoint.
+        O modelo de /emprestimo é trocado pelo registro quando o artefato em disco muda.
+        """
+        model, feature_names = obter_pontuador()
+        self._registrar('/analisar', criar_avaliador_historico(model, feature_names),
+                        validar_historico, feature_names)
+
+        try:
+            from predict_new_loan import carregar_modelo
+            model, feature_names = carregar_modelo()
+        except (FileNotFoundError, ImportError) as erro:
+            self.erros_carregamento['/emprestimo'] = str(erro)
+        else:
+            self._registrar('/emprestimo', criar_avaliador_emprestimo(),
+                            validar_emprestimo, feature_names)
+
+    def _registrar(self, caminho, funcao_lote, validador, feature_names):
+        self.endpoints[caminho] = (MicroLote(funcao_lote, self.max_lote, self.espera_max), validador, feature_names)
+
+    def iniciar(self):
+        for micro_lote, _, _ in self.endpoints.values():
+            micro_lote.iniciar()
+
+    async def parar(self):
+        for micro_lote, _, _ in self.endpoints.values():
+            await micro_lote.parar()
+
+    async def pontuar(self, caminho, corpo):
+        if caminho not in self.endpoints:
+            motivo = self.erros_carregamento.get(caminho, "modelo não carregado")
+            return HTTPStatus.SERVICE_UNAVAILABLE, {'erro': motivo}
+
+        micro_lote, validador, feature_names = self.endpoints[caminho]
+        try:
+            dados = json.loads(corpo, parse_constant=_rejeitar_constante)
+        except (json.JSONDecodeError, UnicodeDecodeError):
+            raise ErroRequisicao("Corpo da requisição não é um JSON válido")
+
+        lista = dados if isinstance(dados, list) else [dados]
+        if not lista or not all(isinstance(caso, dict) for caso in lista):
+            raise ErroRequisicao("Envie um objeto JSON ou uma lista de objetos")
+        for caso in lista:
+            validador(caso, feature_names)
+
+        # Cada caso entra no micro-lote; casos de requisições diferentes são avaliados juntos
+        resultados = await asyncio.gather(*(micro_lote.avaliar(caso) for caso in lista))
+        return HTTPStatus.OK, (resultados if isinstance(dados, list) else resultados[0])
+
+    def health(self):
+        return {
+            'status': 'ok' if self.endpoints else 'sem_modelos',
+            'endpoints': sorted(self.endpoints),
+            'indisponiveis': self.erros_carregamento,
+        }
+
+    def metricas(self):
+        latencias = np.array(self.latencias) * 1000
+        return {
+            'uptime_s': time.time() - self.inicio,
+            'requisicoes': self.requisicoes,
+            'erros': self.erros,
+            'latencia_ms': {
+                'p50': float(np.percentile(latencias, 50)) if len(latencias) else None,
+                'p95': float(np.percentile(latencias, 95)) if len(latencias) else None,
+                'p99': float(np.percentile(latencias, 99)) if len(latencias) else None,
+            },
+            'micro_lotes': {caminho: micro_lote.metricas() for caminho, (micro_lote, _, _) in self.endpoints.items()},
+            'config': {'max_lote': self.max_lote, 'espera_max_ms': self.espera_max * 1000},
+        }
+
+    async def responder(self, metodo, caminho, corpo):
+        if metodo == 'GET' and caminho == '/health':
+            return HTTPStatus.OK, self.health()
+        if metodo == 'GET' and caminho == '/metrics':
+            return HTTPStatus.OK, self.metricas()
+        if caminho in ('/analisar', '/emprestimo'):
+            if metodo != 'POST':
+                return HTTPStatus.METHOD_NOT_ALLOWED, {'erro': "Use POST"}
+            return await self.pontuar(caminho, corpo)
+        return HTTPStatus.NOT_FOUND, {'erro': f"Endpoint não encontrado: {caminho}"}
+
+    @staticmethod
+    async def _ler_linha(reader):
+        try:
+            return await reader.readline()
+        except (ValueError, asyncio.LimitOverrunError):
+            # Linha maior que o limite do StreamReader
+            raise ErroRequisicao("Linha da requisição muito longa")
+
+    async def _ler_cabecalho(self, reader, linha):
+        """
+        Lê a linha de requisição e os cabeçalhos. Retorna (metodo, alvo, versao,
+        cabecalhos, tamanho do corpo); requisições malformadas ou grandes demais
+        levantam `ErroRequisicao` antes de o corpo ser lido.
+        """
+        try:
+            metodo, alvo, versao = linha.decode('latin-1').split()
+        except ValueError:
+            raise ErroRequisicao("Requisição inválida")
+
+        cabecalhos = {}
+        for linhas in range(MAX_CABECALHOS + 1):
+            cabecalho = await self._ler_linha(reader)
+            if cabecalho in (b'\r\n', b'\n', b''):
+                break
+            if linhas == MAX_CABECALHOS:
+                raise ErroRequisicao("Cabeçalhos demais", HTTPStatus.REQUEST_HEADER_FIELDS_TOO_LARGE)
+            nome, _, valor = cabecalho.decode('latin-1').partition(':')
+            cabecalhos[nome.strip().lower()] = valor.strip()
+
+        tamanho = cabecalhos.get('content-length', '0') or '0'
+        if not (tamanho.isascii() and tamanho.isdigit()):
+            raise ErroRequisicao("Content-Length inválido")
+        if int(tamanho) > self.max_corpo:
+            raise ErroRequisicao(f"Corpo maior que o limite de {self.max_corpo} bytes",
+                                 HTTPStatus.REQUEST_ENTITY_TOO_LARGE)
+        return metodo, alvo, versao, cabecalhos, int(tamanho)
+
+    async def tratar_conexao(self, reader, writer):
+        """Atende uma conexão HTTP/1.1 (com keep-alive)."""
+        try:
+            while True:
+                try:
+                    linha = await self._ler_linha(reader)
+                    if not linha:
+                        break
+                    metodo, alvo, versao, cabecalhos, tamanho = await self._ler_cabecalho(reader, linha)
+                except ErroRequisicao as erro:
+                    # O restante da conexão não pode ser interpretado: responde e fecha
+                    await self._enviar(writer, erro.status, {'erro': str(erro)}, False)
+                    break
+
+                corpo = await reader.readexactly(tamanho)
+                manter = (cabecalhos.get('connection', '').lower() != 'close'
+                          if versao == 'HTTP/1.1' else cabecalhos.get('connection', '').lower() == 'keep-alive')
+
+                caminho = alvo.split('?', 1)[0]
+                inicio = time.perf_counter()
+                try:
+                    status, resposta = await self.responder(metodo, caminho, corpo)
+                except ErroRequisicao as erro:
+                    status, resposta = erro.status, {'erro': str(erro)}
+                except Exception as erro:
+                    status, resposta = HTTPStatus.INTERNAL_SERVER_ERROR, {'erro': f"{type(erro).__name__}: {erro}"}
+
+                self.requisicoes[caminho] = self.requisicoes.get(caminho, 0) + 1
+                if status >= 400:
+                    self.erros[caminho] = self.erros.get(caminho, 0) + 1
+                elif metodo == 'POST':
+                    self.latencias.append(time.perf_counter() - inicio)
+
+                await self._enviar(writer, status, resposta, manter)
+                if not manter:
+                    break
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            writer.close()
+
+    @staticmethod
+    async def _enviar(writer, status, resposta, manter):
+        try:
+            corpo = json.dumps(resposta, ensure_ascii=False, allow_nan=False).encode('utf-8')
+        except ValueError:
+            # Um resultado não finito (ex.: NaN do modelo) não é JSON válido: responde com erro
+            status = HTTPStatus.INTERNAL_SERVER_ERROR
+            corpo = json.dumps({'erro': "Resultado não finito"}, ensure_ascii=False).encode('utf-8')
+        cabecalho = (
+            f"HTTP/1.1 {status.value} {status.phrase}\r\n"
+            f"Content-Type: application/json; charset=utf-8\r\n"
+            f"Content-Length: {len(corpo)}\r\n"
+            f"Connection: {'keep-alive' if manter else 'close'}\r\n\r\n"
+        )
+        writer.write(cabecalho.encode('latin-1') + corpo)
+        await writer.drain()
+
+
+async def executar(host, porta, max_lote, espera_max, max_corpo=MAX_CORPO):
+    servico = ServicoPontuacao(max_lote, espera_max, max_corpo)
+    servico.carregar_modelos()
+    servico.iniciar()
+    servidor = await asyncio.start_server(servico.tratar_conexao, host, porta)
+    print(f"Serviço de análise em http://{host}:{porta} (endpoints: {', '.join(sorted(servico.endpoints))})")
+    try:
+        async with servidor:
+            await servidor.serve_forever()
+    finally:
+        await servico.parar()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Serviço HTTP de análise de crédito com micro-lotes.")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--porta', type=int, default=8000)
+    parser.add_argument('--max-lote', type=int, default=64, help="Máximo de casos por chamada ao modelo")
+    parser.add_argument('--espera-max-ms', type=float, default=2.0,
+                        help="Tempo máximo de espera por mais casos depois do primeiro (ms)")
+    parser.add_argument('--max-corpo', type=int, default=MAX_CORPO,
+                        help="Tamanho máximo do corpo de uma requisição (bytes); maiores recebem 413")
+    args = parser.parse_args()
+
+    try:
+        asyncio.run(executar(args.host, args.porta, args.max_lote, args.espera_max_ms / 1000, args.max_corpo))
+    except KeyboardInterrupt:
+        pass
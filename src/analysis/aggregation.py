@@ -0,0 +1,349 @@
+"""
+Agregação das estatísticas da análise exploratória em uma única passagem pelos dados.
+
+O dataset processado é lido em blocos; cada bloco atualiza agregados
+pequenos (o tamanho não depende do número de linhas):
+
+- contagem de linhas e de defaults
+- contagem e defaults por categoria (grade, purpose, ...)
+- por classe de default: soma, contagem, esboço de quantis e amostra de
+  tamanho fixo (reservatório) de loan_amnt/int_rate
+- momentos para a matriz de correlação (`correlation.MomentosCorrelacao`,
+  pares de colunas com valores presentes, como em `DataFrame.corr()`)
+
+Os agregados de dois blocos (ou de duas partições do arquivo, em processos
+separados) são combinados com `combinar`, e os gráficos são gerados a
+partir deles, sem manter o dataset na memória. Com `exato=True` as colunas por classe são guardadas
+inteiras e os boxplots usam os quartis exatos (memória O(N) nessas colunas).
+"""
+import copy
+import math
+import os
+import sys
+from functools import partial
+
+import numpy as np
+import pandas as pd
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from data_processing.processed_data import NUMERIC_COLUMNS, PROCESSED_FILE
+from analysis.correlation import MomentosCorrelacao, agregar_em_paralelo, TARGET
+
+# Colunas usadas pela análise exploratória
+COLUNAS_EDA = NUMERIC_COLUMNS + ['grade', 'purpose']
+
+
+class EsbocoQuantis:
+    """
+    Esboço de quantis com erro relativo limitado (buckets logarítmicos, como
+    no DDSketch): cada valor positivo x cai no bucket ceil(log_gamma(x)),
+    com gamma = (1 + erro) / (1 - erro). O quantil estimado fica a no máximo
+    `erro_relativo` do valor exato, e o número de buckets cresce só com o
+    logaritmo da amplitude dos dados. Zeros e negativos têm buckets próprios.
+    """
+
+    def __init__(self, erro_relativo=0.005):
+        self.erro_relativo = erro_relativo
+        self.gamma = (1 + erro_relativo) / (1 - erro_relativo)
+        self._log_gamma = math.log(self.gamma)
+        self.positivos = {}
+        self.negativos = {}
+        self.zeros = 0
+        self.n = 0
+        self.minimo = math.inf
+        self.maximo = -math.inf
+
+    def _buckets(self, valores):
+        indices, contagens = np.unique(np.ceil(np.log(valores) / self._log_gamma).astype(np.int64),
+                                       return_counts=True)
+        return zip(indices.tolist(), contagens.tolist())
+
+    def atualizar(self, valores):
+        valores = np.asarray(valores, dtype=np.float64)
+        valores = valores[~np.isnan(valores)]
+        if not len(valores):
+            return self
+        self.n += len(valores)
+        self.minimo = min(self.minimo, float(valores.min()))
+        self.maximo = max(self.maximo, float(valores.max()))
+        self.zeros += int((valores == 0).sum())
+        for buckets, sinal in ((self.positivos, 1), (self.negativos, -1)):
+            for indice, contagem in self._buckets(sinal * valores[sinal * valores > 0]):
+                buckets[indice] = buckets.get(indice, 0) + contagem
+        return self
+
+    def combinar(self, outro):
+        if outro.gamma != self.gamma:
+            raise ValueError("Esboços com precisões diferentes não podem ser combinados")
+        for buckets, outros in ((self.positivos, outro.positivos), (self.negativos, outro.negativos)):
+            for indice, contagem in outros.items():
+                buckets[indice] = buckets.get(indice, 0) + contagem
+        self.zeros += outro.zeros
+        self.n += outro.n
+        self.minimo = min(self.minimo, outro.minimo)
+        self.maximo = max(self.maximo, outro.maximo)
+        return self
+
+    def _valores_contagens(self):
+        """Valor representativo de cada bucket (crescente) e quantos valores ele contém."""
+        negativos = sorted(self.negativos.items(), reverse=True)
+        positivos = sorted(self.positivos.items())
+        representante = lambda i: 2 * self.gamma ** i / (self.gamma + 1)
+        valores = [-representante(i) for i, _ in negativos] + [0.0] * (self.zeros > 0) + \
+                  [representante(i) for i, _ in positivos]
+        contagens = [c for _, c in negativos] + [self.zeros] * (self.zeros > 0) + [c for _, c in positivos]
+        return np.array(valores), np.array(contagens)
+
+    def quantis(self, qs):
+        """Quantis `qs` (entre 0 e 1) estimados, limitados ao mínimo e máximo observados."""
+        qs = np.atleast_1d(np.asarray(qs, dtype=np.float64))
+        if self.n == 0:
+            return np.full(len(qs), np.nan)
+        valores, contagens = self._valores_contagens()
+        posicao = np.searchsorted(np.cumsum(contagens), qs * (self.n - 1), side='right')
+        return np.clip(valores[np.minimum(posicao, len(valores) - 1)], self.minimo, self.maximo)
+
+    def quantil(self, q):
+        return float(self.quantis([q])[0])
+
+    def estatisticas_boxplot(self, rotulo=None, whis=1.5, amostra=None):
+        """
+        Estatísticas para `Axes.bxp` (quartis, bigodes e mediana), como em
+        `matplotlib.cbook.boxplot_stats`, mas estimadas a partir do esboço.
+        Os outliers desenhados ('fliers') são os da `amostra` (valores de uma
+        `AmostraReservatorio`), se houver; `n_outliers` informa quantos são no total.
+        """
+        q1, mediana, q3 = self.quantis([0.25, 0.5, 0.75])
+        iqr = q3 - q1
+        valores, contagens = self._valores_contagens()
+        valores = np.clip(valores, self.minimo, self.maximo)
+        limite_inferior, limite_superior = q1 - whis * iqr, q3 + whis * iqr
+        dentro = (valores >= limite_inferior) & (valores <= limite_superior)
+        amostra = np.empty(0) if amostra is None else np.asarray(amostra)
+
+        # Bigodes: valores extremos dentro dos limites, entre os representantes dos
+        # buckets, os valores da amostra e o mínimo/máximo exatos
+        candidatos = np.concatenate([valores[dentro], amostra, [self.minimo, self.maximo]])
+        candidatos = candidatos[(candidatos >= limite_inferior) & (candidatos <= limite_superior)]
+        whislo = float(min(candidatos.min(), q1)) if len(candidatos) else q1
+        whishi = float(max(candidatos.max(), q3)) if len(candidatos) else q3
+        return {
+            'label': rotulo,
+            'q1': q1, 'med': mediana, 'q3': q3, 'iqr': iqr,
+            'whislo': whislo, 'whishi': whishi,
+            'fliers': np.sort(amostra[(amostra < whislo) | (amostra > whishi)]),
+            'n_outliers': int(contagens[~dentro].sum()),
+        }
+
+
+class AmostraReservatorio:
+    """
+    Amostra aleatória uniforme de até `capacidade` valores de um fluxo
+    (reservatório com prioridades: cada valor recebe uma chave aleatória e
+    ficam os de menores chaves). Duas amostras são combinadas mantendo as
+    menores chaves da união, o que equivale a amostrar os dois fluxos juntos.
+    Com `capacidade=None` todos os valores são guardados (modo exato), sem
+    chaves: os blocos são só acumulados e concatenados uma vez, ao ler `valores`.
+    """
+
+    def __init__(self, capacidade=10_000, rng=None):
+        self.capacidade = capacidade
+        self.rng = rng if rng is not None else np.random.default_rng()
+        self._valores = np.empty(0)
+        self._chaves = np.empty(0)
+        self._blocos = []  # modo exato: blocos ainda não concatenados
+        self.n = 0
+
+    @property
+    def valores(self):
+        if self._blocos:
+            self._valores = np.concatenate([self._valores, *self._blocos])
+            self._blocos = []
+        return self._valores
+
+    def _manter(self, valores, chaves):
+        if len(valores) > self.capacidade:
+            menores = np.argpartition(chaves, self.capacidade - 1)[:self.capacidade]
+            valores, chaves = valores[menores], chaves[menores]
+        self._valores, self._chaves = valores, chaves
+
+    def atualizar(self, valores):
+        valores = np.asarray(valores, dtype=np.float64)
+        valores = valores[~np.isnan(valores)]
+        self.n += len(valores)
+        if self.capacidade is None:
+            if len(valores):
+                self._blocos.append(valores)
+            return self
+
+        chaves = self.rng.random(len(valores))
+        if len(self._valores) == self.capacidade:
+            # Amostra cheia: só entram os valores com chave menor que a maior mantida
+            entram = chaves < self._chaves.max()
+            valores, chaves = valores[entram], chaves[entram]
+        if len(valores):
+            self._manter(np.concatenate([self._valores, valores]), np.concatenate([self._chaves, chaves]))
+        return self
+
+    def combinar(self, outro):
+        self.n += outro.n
+        if self.capacidade is None:
+            self._blocos.extend(bloco for bloco in (outro._valores, *outro._blocos) if len(bloco))
+            return self
+        self._manter(np.concatenate([self._valores, outro._valores]), np.concatenate([self._chaves, outro._chaves]))
+        return self
+
+
+class AgregadorEDA:
+    """
+    Acumula, bloco a bloco, todas as estatísticas usadas por `CreditAnalysis`.
+
+    - categorias: colunas categóricas com taxa de default por categoria
+    - colunas_classe: colunas numéricas com média e esboço de quantis por classe de default
+    - colunas_correlacao: colunas da matriz de correlação (padrão: as numéricas do primeiro bloco)
+    - tamanho_amostra: valores amostrados por classe e coluna para os outliers dos boxplots
+    - exato: guarda todos os valores de `colunas_classe` e calcula boxplots e
+      medianas exatos (como `sns.boxplot`), em vez de estimá-los pelo esboço
+    """
+
+    def __init__(self, categorias=('grade', 'purpose'), colunas_classe=('loan_amnt', 'int_rate'),
+                 colunas_correlacao=None, erro_relativo=0.005, tamanho_amostra=10_000, exato=False,
+                 random_state=42):
+        self.categorias = list(categorias)
+        self.colunas_classe = list(colunas_classe)
+        self.colunas_correlacao = None if colunas_correlacao is None else list(colunas_correlacao)
+        self.erro_relativo = erro_relativo
+        self.tamanho_amostra = None if exato else tamanho_amostra
+        self.exato = exato
+        self._rng = np.random.default_rng(random_state)
+
+        self.n = 0
+        self.defaults = 0
+        self.amostra_inicial = None
+        self.colunas = None
+        self.por_categoria = {col: pd.DataFrame(columns=['count', 'sum'], dtype=np.float64) for col in self.categorias}
+        self.soma_classe = {}      # (classe, coluna) -> soma
+        self.contagem_classe = {}  # (classe, coluna) -> valores presentes
+        self.esbocos = {}          # (classe, coluna) -> EsbocoQuantis
+        self.amostras = {}         # (classe, coluna) -> AmostraReservatorio (estratificada por classe)
+        self.momentos = None       # MomentosCorrelacao de `colunas_correlacao`
+
+    def atualizar(self, df):
+        """Acumula as estatísticas de um bloco (DataFrame)."""
+        if self.amostra_inicial is None:
+            self.amostra_inicial = df.head()
+            self.colunas = list(df.columns)
+            if self.colunas_correlacao is None:
+                self.colunas_correlacao = list(df.select_dtypes(include=[np.number]).columns)
+            self.momentos = MomentosCorrelacao(self.colunas_correlacao)
+        self.n += len(df)
+        self.defaults += int(df[TARGET].sum())
+
+        for col in self.categorias:
+            bloco = df.groupby(col, observed=True)[TARGET].agg(['count', 'sum']).astype(np.float64)
+            self.por_categoria[col] = self.por_categoria[col].add(bloco, fill_value=0)
+
+        for classe, grupo in df.groupby(TARGET):
+            for col in self.colunas_classe:
+                valores = grupo[col].to_numpy(dtype=np.float64)
+                chave = (int(classe), col)
+                self.soma_classe[chave] = self.soma_classe.get(chave, 0.0) + float(np.nansum(valores))
+                self.contagem_classe[chave] = self.contagem_classe.get(chave, 0) + int((~np.isnan(valores)).sum())
+                self.esbocos.setdefault(chave, EsbocoQuantis(self.erro_relativo)).atualizar(valores)
+                if chave not in self.amostras:
+                    self.amostras[chave] = AmostraReservatorio(self.tamanho_amostra, self._rng)
+                self.amostras[chave].atualizar(valores)
+
+        self.momentos.atualizar(df)
+        return self
+
+    def combinar(self, outro):
+        """Combina os agregados de outro `AgregadorEDA` (ex.: de outro processo) neste."""
+        if outro.n == 0:
+            return self
+        if self.n == 0:
+            self.__dict__.update(copy.deepcopy(outro.__dict__))
+            return self
+
+        self.n += outro.n
+        self.defaults += outro.defaults
+        for col in self.categorias:
+            self.por_categoria[col] = self.por_categoria[col].add(outro.por_categoria[col], fill_value=0)
+        for chave, soma in outro.soma_classe.items():
+            self.soma_classe[chave] = self.soma_classe.get(chave, 0.0) + soma
+            self.contagem_classe[chave] = self.contagem_classe.get(chave, 0) + outro.contagem_classe[chave]
+            if chave in self.esbocos:
+                self.esbocos[chave].combinar(outro.esbocos[chave])
+                self.amostras[chave].combinar(outro.amostras[chave])
+            else:
+                self.esbocos[chave] = outro.esbocos[chave]
+                self.amostras[chave] = outro.amostras[chave]
+        self.momentos.combinar(outro.momentos)
+        return self
+
+    # Resultados
+
+    def taxa_default(self):
+        return self.defaults / self.n if self.n else np.nan
+
+    def contagem_classes(self):
+        """Número de empréstimos por classe de default."""
+        return pd.Series({0: self.n - self.defaults, 1: self.defaults}, name='count')
+
+    def taxa_por_categoria(self, col):
+        """DataFrame com 'mean' (taxa de default) e 'count' por categoria, como `groupby(col)[TARGET].agg(...)`."""
+        agregado = self.por_categoria[col]
+        return pd.DataFrame({
+            'mean': agregado['sum'] / agregado['count'],
+            'count': agregado['count'].astype(np.int64),
+        }).rename_axis(col).sort_index()
+
+    def estatisticas_por_classe(self):
+        """Média e mediana (exata ou estimada pelo esboço) de `colunas_classe` por classe de default."""
+        classes = sorted({classe for classe, _ in self.soma_classe})
+        dados = {}
+        for col in self.colunas_classe:
+            dados[(col, 'mean')] = [self.soma_classe[c, col] / self.contagem_classe[c, col] for c in classes]
+            if self.exato:
+                dados[(col, 'median')] = [np.median(self.amostras[c, col].valores) for c in classes]
+            else:
+                dados[(col, 'median')] = [self.esbocos[c, col].quantil(0.5) for c in classes]
+        return pd.DataFrame(dados, index=pd.Index(classes, name=TARGET))
+
+    def estatisticas_boxplot(self, col):
+        """
+        Estatísticas de boxplot de `col` para cada classe de default (para `Axes.bxp`).
+        No modo aproximado, quartis e bigodes vêm do esboço e os outliers, da
+        amostra da classe; no modo exato, tudo vem de todos os valores.
+        """
+        estatisticas = []
+        for classe in sorted({c for c, nome in self.esbocos if nome == col}):
+            amostra = self.amostras[classe, col]
+            if self.exato:
+                from matplotlib.cbook import boxplot_stats
+                estatisticas.append(boxplot_stats(amostra.valores, labels=[str(classe)])[0])
+            else:
+                estatisticas.append(self.esbocos[classe, col].estatisticas_boxplot(rotulo=str(classe),
+                                                                                   amostra=amostra.valores))
+        return estatisticas
+
+    def correlacao(self):
+        """Matriz de correlação de Pearson, com os pares de valores presentes (como `DataFrame.corr()`)."""
+        return self.momentos.correlacao()
+
+
+def _novo_agregador(opcoes, particao):
+    # Cada partição amostra com a sua semente, derivada de random_state
+    return AgregadorEDA(**{**opcoes, 'random_state': [opcoes.get('random_state', 42), particao]})
+
+
+def agregar_dados_processados(colunas, tamanho_bloco=200_000, caminho=PROCESSED_FILE, processos=1,
+                              transformar=None, **opcoes):
+    """
+    Lê `colunas` do dataset processado em blocos e retorna o `AgregadorEDA`
+    com as estatísticas de todas as linhas (uma única leitura dos dados).
+    Com `processos` > 1, as partições do arquivo são agregadas em paralelo
+    (veja `correlation.agregar_em_paralelo`).
+    """
+    return agregar_em_paralelo(partial(_novo_agregador, opcoes), colunas, caminho, processos, tamanho_bloco,
+                               transformar)
@@ -0,0 +1,194 @@
+"""
+Correlações e covariâncias de Pearson calculadas em blocos, sobre dados de qualquer tamanho.
+
+Cada bloco gera momentos centrados (contagem, médias, somas dos quadrados
+dos desvios e co-momentos) para todos os pares de colunas, usando só as
+linhas em que as duas colunas do par estão presentes, como em
+`DataFrame.corr()`. Momentos de blocos diferentes são combinados pela
+fórmula de Chan (a versão em lote do algoritmo de Welford), sem
+cancelamento numérico, em qualquer ordem.
+
+O arquivo Parquet é dividido por row groups, e as partições são agregadas
+em processos separados (`agregar_em_paralelo`); qualquer agregado com
+`atualizar(df)` e `combinar(outro)` (como `aggregation.AgregadorEDA`)
+pode ser calculado da mesma forma.
+
+Uso:
+    momentos = calcular_momentos(NUMERIC_COLUMNS, processos=4)
+    momentos.correlacao()        # matriz de Pearson (DataFrame)
+    momentos.correlacao_com()    # correlações com default (Series)
+"""
+import argparse
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+
+import numpy as np
+import pandas as pd
+import pyarrow.parquet as pq
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from data_processing.processed_data import iterar_dados_processados, NUMERIC_COLUMNS, PROCESSED_FILE
+
+TARGET = 'default'
+
+
+class MomentosCorrelacao:
+    """
+    Momentos para a matriz de correlação de `colunas`, com os pares de valores
+    presentes. Todas as matrizes são k x k; a entrada [i, j] considera só as
+    linhas em que as colunas i e j estão presentes (valores infinitos contam
+    como ausentes):
+
+    - n: número de linhas do par
+    - media: média da coluna i nessas linhas
+    - m2: soma dos quadrados dos desvios da coluna i nessas linhas
+    - comomento: soma dos produtos dos desvios das colunas i e j
+    """
+
+    def __init__(self, colunas):
+        self.colunas = list(colunas)
+        k = len(self.colunas)
+        self.n, self.media, self.m2, self.comomento = (np.zeros((k, k)) for _ in range(4))
+
+    def atualizar(self, df):
+        """Acumula os momentos de um bloco (DataFrame com `colunas`)."""
+        X = df[self.colunas].to_numpy(dtype=np.float64)
+        presente = np.isfinite(X)
+        if not presente.any():
+            return self
+
+        # Os valores são deslocados pela média do bloco antes dos produtos matriciais,
+        # o que mantém as somas pequenas e as diferenças abaixo precisas
+        with np.errstate(invalid='ignore'):
+            deslocamento = np.nan_to_num(np.nanmean(np.where(presente, X, np.nan), axis=0))
+        X = np.where(presente, X - deslocamento, 0.0)
+        presente = presente.astype(np.float64)
+
+        n = presente.T @ presente
+        soma = X.T @ presente                  # [i, j]: soma de x_i onde x_j também está presente
+        with np.errstate(divide='ignore', invalid='ignore'):
+            media_deslocada = np.where(n > 0, soma / n, 0.0)
+        bloco = MomentosCorrelacao.__new__(MomentosCorrelacao)
+        bloco.colunas = self.colunas
+        bloco.n = n
+        bloco.media = deslocamento[:, None] + media_deslocada
+        bloco.m2 = (X * X).T @ presente - soma * media_deslocada
+        bloco.comomento = X.T @ X - soma * media_deslocada.T
+        return self.combinar(bloco)
+
+    def combinar(self, outro):
+        """Combina os momentos de `outro` (ex.: de outra partição) nestes (fórmula de Chan)."""
+        if outro.colunas != self.colunas:
+            raise ValueError("Momentos de colunas diferentes não podem ser combinados")
+        n = self.n + outro.n
+        delta = outro.media - self.media
+        with np.errstate(divide='ignore', invalid='ignore'):
+            peso = np.where(n > 0, outro.n / n, 0.0)
+        fator = self.n * peso                  # n_a * n_b / n
+        self.media = self.media + delta * peso
+        self.m2 = self.m2 + outro.m2 + delta ** 2 * fator
+        self.comomento = self.comomento + outro.comomento + delta * delta.T * fator
+        self.n = n
+        return self
+
+    # Resultados
+
+    def covariancia(self):
+        """Matriz de covariância amostral (ddof=1), com os pares de valores presentes (como `DataFrame.cov()`)."""
+        with np.errstate(divide='ignore', invalid='ignore'):
+            cov = np.where(self.n > 1, self.comomento / (self.n - 1), np.nan)
+        return pd.DataFrame(cov, index=self.colunas, columns=self.colunas)
+
+    def correlacao(self):
+        """Matriz de correlação de Pearson, com os pares de valores presentes (como `DataFrame.corr()`)."""
+        with np.errstate(divide='ignore', invalid='ignore'):
+            corr = self.comomento / np.sqrt(self.m2 * self.m2.T)
+        corr = np.where(self.n > 1, np.clip(corr, -1, 1), np.nan)
+        np.fill_diagonal(corr, np.where(np.diag(self.n) > 1, 1.0, np.nan))
+        return pd.DataFrame(corr, index=self.colunas, columns=self.colunas)
+
+    def correlacao_com(self, alvo=TARGET):
+        """Correlações de todas as colunas com `alvo`, em ordem decrescente."""
+        return self.correlacao()[alvo].sort_values(ascending=False)
+
+
+def _novos_momentos(colunas, particao):
+    return MomentosCorrelacao(colunas)
+
+
+def _agregar_particao(fabrica, particao, caminho, colunas, tamanho_bloco, transformar):
+    """Executado no worker: agrega os blocos de um row group do arquivo Parquet."""
+    agregado = fabrica(particao)
+    arquivo = pq.ParquetFile(caminho)
+    for batch in arquivo.iter_batches(batch_size=tamanho_bloco, row_groups=[particao], columns=colunas):
+        bloco = batch.to_pandas()
+        agregado.atualizar(transformar(bloco) if transformar else bloco)
+    return agregado
+
+
+def agregar_em_paralelo(fabrica, colunas, caminho=PROCESSED_FILE, processos=None, tamanho_bloco=200_000,
+                        transformar=None):
+    """
+    Agrega o dataset processado por partições (row groups do Parquet), em paralelo.
+
+    - fabrica: `fabrica(particao)` cria um agregado vazio com `atualizar(df)` e
+      `combinar(outro)`; precisa ser serializável (função de módulo ou `partial`)
+    - colunas: colunas lidas do arquivo
+    - processos: número de processos (padrão: um por CPU; 1 agrega no próprio processo)
+    - transformar: função aplicada a cada bloco antes de `atualizar` (ex.: features derivadas)
+
+    As partições são sempre as mesmas e são combinadas na ordem do arquivo,
+    então o resultado não depende do número de processos. O CSV de versões
+    anteriores é lido em uma única partição.
+    """
+    processos = processos or os.cpu_count() or 1
+    if not os.path.exists(caminho):
+        agregado = fabrica(0)
+        for bloco in iterar_dados_processados(colunas, tamanho_bloco, caminho):
+            agregado.atualizar(transformar(bloco) if transformar else bloco)
+        return agregado
+
+    particoes = range(pq.ParquetFile(caminho).num_row_groups)
+    tarefa = partial(_agregar_particao, fabrica, caminho=caminho, colunas=colunas,
+                     tamanho_bloco=tamanho_bloco, transformar=transformar)
+    if processos == 1 or len(particoes) == 1:
+        resultados = map(tarefa, particoes)
+        agregado = next(resultados)
+        for parcial in resultados:
+            agregado.combinar(parcial)
+        return agregado
+
+    with ProcessPoolExecutor(max_workers=min(processos, len(particoes))) as executor:
+        resultados = executor.map(tarefa, particoes)
+        agregado = next(resultados)
+        for parcial in resultados:
+            agregado.combinar(parcial)
+    return agregado
+
+
+def calcular_momentos(colunas=NUMERIC_COLUMNS, caminho=PROCESSED_FILE, processos=None, tamanho_bloco=200_000,
+                      transformar=None, colunas_leitura=None):
+    """
+    Momentos de correlação de `colunas` sobre todo o dataset processado.
+
+    - transformar: função aplicada a cada bloco (pode criar colunas derivadas
+      que estejam em `colunas`)
+    - colunas_leitura: colunas lidas do arquivo (padrão: `colunas`)
+    """
+    return agregar_em_paralelo(partial(_novos_momentos, list(colunas)), colunas_leitura or list(colunas),
+                               caminho, processos, tamanho_bloco, transformar)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Matriz de correlação do dataset processado, calculada em blocos.")
+    parser.add_argument('--processos', type=int, default=None)
+    parser.add_argument('--tamanho-bloco', type=int, default=200_000)
+    args = parser.parse_args()
+
+    momentos = calcular_momentos(processos=args.processos, tamanho_bloco=args.tamanho_bloco)
+    print("Matriz de correlação:")
+    print(momentos.correlacao().round(3))
+    print("\nCorrelações com default:")
+    print(momentos.correlacao_com().round(3))
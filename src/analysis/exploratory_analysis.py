@@ -1,60 +1,130 @@
-import pandas as pd
-import numpy as np
+import argparse
 import matplotlib.pyplot as plt
 import seaborn as sns
 import os
+import sys
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from data_processing.processed_data import PROCESSED_FILE
+from analysis.aggregation import agregar_dados_processados, COLUNAS_EDA
+from utils.plot_cache import RenderizadorGraficos
+
+# Funções de desenho: recebem só os agregados de cada gráfico (veja utils/plot_cache.py)
+
+def desenhar_distribuicao_default(contagens, caminho):
+    plt.figure(figsize=(10, 6))
+    sns.barplot(x=contagens.index.astype(str), y=contagens.values)
+    plt.title('Distribuição de Default')
+    plt.xlabel('Default (0=Não, 1=Sim)')
+    plt.ylabel('Número de Empréstimos')
+    plt.savefig(caminho)
+    plt.close()
+
+def desenhar_default_por_grade(default_by_grade, caminho):
+    plt.figure(figsize=(12, 6))
+    default_by_grade['mean'].plot(kind='bar')
+    plt.title('Taxa de Default por Grade de Crédito')
+    plt.xlabel('Grade')
+    plt.ylabel('Taxa de Default')
+    plt.savefig(caminho)
+    plt.close()
+
+def desenhar_valor_e_juros(boxplot_valor, boxplot_juros, caminho):
+    fig, (ax1, ax2) = plt.subplots(1, 2, figsize=(15, 6))
+
+    # Boxplots desenhados a partir das estatísticas de cada classe (quartis do esboço e
+    # outliers da amostra, ou exatos); veja AgregadorEDA.estatisticas_boxplot
+    # Boxplot do valor do empréstimo por default
+    ax1.bxp(boxplot_valor, patch_artist=True)
+    ax1.set_title('Valor do Empréstimo vs Default')
+    ax1.set_xlabel('Default (0=Não, 1=Sim)')
+    ax1.set_ylabel('Valor do Empréstimo ($)')
+
+    # Boxplot da taxa de juros por default
+    ax2.bxp(boxplot_juros, patch_artist=True)
+    ax2.set_title('Taxa de Juros vs Default')
+    ax2.set_xlabel('Default (0=Não, 1=Sim)')
+    ax2.set_ylabel('Taxa de Juros (%)')
+
+    plt.tight_layout()
+    plt.savefig(caminho)
+    plt.close()
+
+def desenhar_matriz_correlacao(correlation_matrix, caminho):
+    plt.figure(figsize=(12, 10))
+    sns.heatmap(correlation_matrix, annot=True, cmap='coolwarm', center=0)
+    plt.title('Matriz de Correlação - Features Numéricas')
+    plt.tight_layout()
+    plt.savefig(caminho)
+    plt.close()
+
+def desenhar_default_por_finalidade(default_by_purpose, caminho):
+    plt.figure(figsize=(15, 6))
+    sns.barplot(data=default_by_purpose.reset_index(), x='purpose', y='mean')
+    plt.title('Taxa de Default por Finalidade do Empréstimo')
+    plt.xticks(rotation=45)
+    plt.xlabel('Finalidade')
+    plt.ylabel('Taxa de Default')
+    plt.tight_layout()
+    plt.savefig(caminho)
+    plt.close()
 
 class CreditAnalysis:
-    def __init__(self):
+    # Colunas usadas pelas análises (as demais não são carregadas)
+    COLUNAS_ANALISE = COLUNAS_EDA
+
+    def __init__(self, tamanho_bloco=200_000, processos_graficos=None, exato=False, tamanho_amostra=10_000,
+                 processos=1):
         self.project_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
-        self.data_path = os.path.join(self.project_dir, 'data', 'processed', 'lending_club_processed.csv')
+        self.data_path = PROCESSED_FILE
+        self.tamanho_bloco = tamanho_bloco
+        # Processos que agregam as partições do arquivo (None: um por CPU)
+        self.processos = processos
+        # Distribuições exatas (todos os valores na memória) ou aproximadas
+        # (esboço de quantis + amostra de `tamanho_amostra` valores por classe)
+        self.exato = exato
+        self.tamanho_amostra = tamanho_amostra
         self.plots_dir = os.path.join(self.project_dir, 'plots')
-        
+
         # Criar diretório para plots se não existir
         if not os.path.exists(self.plots_dir):
             os.makedirs(self.plots_dir)
-        
-        # Configurações de visualização
-        plt.style.use('seaborn')
-        sns.set_palette('husl')
+
+        # Os gráficos são desenhados em paralelo, com estas configurações de visualização,
+        # e só quando os agregados mudaram; `graficos.concluir()` espera todos ficarem prontos
+        self.graficos = RenderizadorGraficos(self.plots_dir, processos=processos_graficos,
+                                             estilo='seaborn', paleta='husl')
 
     def load_data(self):
-        """Carrega os dados processados"""
+        """
+        Lê os dados processados em blocos, uma única vez, acumulando todas as
+        estatísticas usadas pelas análises (o dataset não fica na memória)
+        """
         print("Carregando dados...")
-        self.df = pd.read_csv(self.data_path)
-        print(f"Dimensões do dataset: {self.df.shape}")
+        self.agregados = agregar_dados_processados(self.COLUNAS_ANALISE, self.tamanho_bloco, self.data_path,
+                                                   self.processos, exato=self.exato,
+                                                   tamanho_amostra=self.tamanho_amostra)
+        print(f"Dimensões do dataset: {(self.agregados.n, len(self.agregados.colunas))}")
         print("\nPrimeiras linhas:")
-        print(self.df.head())
-        return self.df
+        print(self.agregados.amostra_inicial)
+        return self.agregados
 
     def analyze_default_rate(self):
         """Análise da taxa de default geral"""
         print("\n=== Análise da Taxa de Default ===")
-        
-        plt.figure(figsize=(10, 6))
-        sns.countplot(data=self.df, x='default')
-        plt.title('Distribuição de Default')
-        plt.xlabel('Default (0=Não, 1=Sim)')
-        plt.ylabel('Número de Empréstimos')
-        plt.savefig(os.path.join(self.plots_dir, '1_default_distribution.png'))
-        plt.close()
-
-        default_rate = (self.df['default'].mean() * 100)
+
+        self.graficos.agendar('1_default_distribution.png', desenhar_distribuicao_default,
+                              self.agregados.contagem_classes())
+
+        default_rate = (self.agregados.taxa_default() * 100)
         print(f"Taxa de default total: {default_rate:.2f}%")
 
     def analyze_credit_grades(self):
         """Análise por grade de crédito"""
         print("\n=== Análise por Grade de Crédito ===")
-        
-        default_by_grade = self.df.groupby('grade')['default'].agg(['mean', 'count']).sort_index()
-        
-        plt.figure(figsize=(12, 6))
-        default_by_grade['mean'].plot(kind='bar')
-        plt.title('Taxa de Default por Grade de Crédito')
-        plt.xlabel('Grade')
-        plt.ylabel('Taxa de Default')
-        plt.savefig(os.path.join(self.plots_dir, '2_default_by_grade.png'))
-        plt.close()
+
+        default_by_grade = self.agregados.taxa_por_categoria('grade')
+        self.graficos.agendar('2_default_by_grade.png', desenhar_default_por_grade, default_by_grade)
 
         print("\nTaxa de default por grade:")
         print(default_by_grade['mean'].multiply(100).round(2))
@@ -64,43 +134,25 @@ class CreditAnalysis:
     def analyze_loan_amount_and_interest(self):
         """Análise de valor do empréstimo e taxa de juros"""
         print("\n=== Análise de Valor e Taxa de Juros ===")
-        
-        fig, (ax1, ax2) = plt.subplots(1, 2, figsize=(15, 6))
-
-        # Boxplot do valor do empréstimo por default
-        sns.boxplot(data=self.df, x='default', y='loan_amnt', ax=ax1)
-        ax1.set_title('Valor do Empréstimo vs Default')
-        ax1.set_xlabel('Default (0=Não, 1=Sim)')
-        ax1.set_ylabel('Valor do Empréstimo ($)')
-
-        # Boxplot da taxa de juros por default
-        sns.boxplot(data=self.df, x='default', y='int_rate', ax=ax2)
-        ax2.set_title('Taxa de Juros vs Default')
-        ax2.set_xlabel('Default (0=Não, 1=Sim)')
-        ax2.set_ylabel('Taxa de Juros (%)')
 
-        plt.tight_layout()
-        plt.savefig(os.path.join(self.plots_dir, '3_loan_amount_interest.png'))
-        plt.close()
+        self.graficos.agendar('3_loan_amount_interest.png', desenhar_valor_e_juros,
+                              self.agregados.estatisticas_boxplot('loan_amnt'),
+                              self.agregados.estatisticas_boxplot('int_rate'))
 
         # Estatísticas
-        stats = self.df.groupby('default')[['loan_amnt', 'int_rate']].agg(['mean', 'median'])
-        print("\nEstatísticas por status de default:")
+        stats = self.agregados.estatisticas_por_classe()
+        if self.exato:
+            print("\nEstatísticas por status de default:")
+        else:
+            print("\nEstatísticas por status de default (medianas estimadas, erro relativo <= 0,5%):")
         print(stats.round(2))
 
     def analyze_correlations(self):
         """Análise de correlações"""
         print("\n=== Análise de Correlações ===")
-        
-        numeric_cols = self.df.select_dtypes(include=['float64', 'int64']).columns
-        correlation_matrix = self.df[numeric_cols].corr()
 
-        plt.figure(figsize=(12, 10))
-        sns.heatmap(correlation_matrix, annot=True, cmap='coolwarm', center=0)
-        plt.title('Matriz de Correlação - Features Numéricas')
-        plt.tight_layout()
-        plt.savefig(os.path.join(self.plots_dir, '4_correlation_matrix.png'))
-        plt.close()
+        correlation_matrix = self.agregados.correlacao()
+        self.graficos.agendar('4_correlation_matrix.png', desenhar_matriz_correlacao, correlation_matrix)
 
         # Mostrar correlações mais fortes com default
         correlations_with_default = correlation_matrix['default'].sort_values(ascending=False)
@@ -110,19 +162,10 @@ class CreditAnalysis:
     def analyze_loan_purpose(self):
         """Análise por finalidade do empréstimo"""
         print("\n=== Análise por Finalidade do Empréstimo ===")
-        
-        default_by_purpose = self.df.groupby('purpose')['default'].agg(['mean', 'count'])
-        default_by_purpose = default_by_purpose.sort_values('mean', ascending=False)
 
-        plt.figure(figsize=(15, 6))
-        sns.barplot(data=default_by_purpose.reset_index(), x='purpose', y='mean')
-        plt.title('Taxa de Default por Finalidade do Empréstimo')
-        plt.xticks(rotation=45)
-        plt.xlabel('Finalidade')
-        plt.ylabel('Taxa de Default')
-        plt.tight_layout()
-        plt.savefig(os.path.join(self.plots_dir, '5_default_by_purpose.png'))
-        plt.close()
+        default_by_purpose = self.agregados.taxa_por_categoria('purpose')
+        default_by_purpose = default_by_purpose.sort_values('mean', ascending=False)
+        self.graficos.agendar('5_default_by_purpose.png', desenhar_default_por_finalidade, default_by_purpose)
 
         print("\nTaxa de default por finalidade:")
         print(default_by_purpose['mean'].multiply(100).round(2))
@@ -137,8 +180,19 @@ class CreditAnalysis:
         self.analyze_loan_amount_and_interest()
         self.analyze_correlations()
         self.analyze_loan_purpose()
-        print(f"\nTodos os gráficos foram salvos em: {self.plots_dir}")
+        resumo = self.graficos.concluir()
+        print(f"\nGráficos: {resumo['renderizados']} gerado(s), {resumo['em_cache']} sem alteração")
+        print(f"Todos os gráficos foram salvos em: {self.plots_dir}")
 
 if __name__ == "__main__":
-    analyzer = CreditAnalysis()
+    parser = argparse.ArgumentParser(description="Análise exploratória do dataset processado.")
+    parser.add_argument('--exato', action='store_true',
+                        help="Boxplots e medianas com todos os valores (memória proporcional ao dataset)")
+    parser.add_argument('--tamanho-amostra', type=int, default=10_000,
+                        help="Valores amostrados por classe para os outliers dos boxplots no modo aproximado")
+    parser.add_argument('--processos', type=int, default=1,
+                        help="Processos que agregam as partições (row groups) do arquivo em paralelo")
+    args = parser.parse_args()
+
+    analyzer = CreditAnalysis(exato=args.exato, tamanho_amostra=args.tamanho_amostra, processos=args.processos)
     analyzer.run_all_analyses()
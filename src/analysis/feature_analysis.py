@@ -1,35 +1,75 @@
-import pandas as pd
-import numpy as np
+import argparse
+import os
+import sys
 
-# Carregar dados
-df = pd.read_csv(r'C:\Users\ronaldo.pereira\Desktop\Projetos\credit_analysis\data\processed\lending_club_processed.csv')
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from data_processing.processed_data import NUMERIC_COLUMNS, PROCESSED_FILE
+from analysis.aggregation import agregar_dados_processados
 
-print("=== Análise de Features para Modelo de ML ===\n")
+categorical_cols = ['grade', 'home_ownership', 'purpose', 'term']
+new_features = ['loan_to_income', 'payment_to_income']
 
-# Calcular correlações com default (apenas para variáveis numéricas)
-numeric_cols = df.select_dtypes(include=[np.number]).columns
-correlacoes = df[numeric_cols].corr()['default'].sort_values(ascending=False)
-print("\nCorrelações com Default (ordenadas):")
-print(correlacoes.round(3))
 
-# Análise das variáveis categóricas
-print("\nAnálise de Variáveis Categóricas:")
+def adicionar_features_derivadas(df):
+    """Cria as features derivadas em um bloco de dados (aplicada a cada bloco lido)."""
+    df['loan_to_income'] = df['loan_amnt'] / df['annual_inc']
+    df['payment_to_income'] = (df['loan_amnt'] * (df['int_rate']/100)) / df['annual_inc']
+    return df
 
-categorical_cols = ['grade', 'home_ownership', 'purpose', 'term']
-for col in categorical_cols:
-    print(f"\nTaxa de Default por {col}:")
-    default_rate = df.groupby(col)['default'].agg(['count', 'mean']).round(3)
-    default_rate['mean'] = default_rate['mean'] * 100  # Converter para percentagem
-    default_rate.columns = ['Quantidade', 'Taxa de Default (%)']
-    print(default_rate)
-
-# Criar e analisar features derivadas
-print("\nFeatures Derivadas:")
-df['loan_to_income'] = df['loan_amnt'] / df['annual_inc']
-df['payment_to_income'] = (df['loan_amnt'] * (df['int_rate']/100)) / df['annual_inc']
-
-print("\nCorrelações das novas features com default:")
-new_features = ['loan_to_income', 'payment_to_income']
-for feat in new_features:
-    corr = df[feat].corr(df['default'])
-    print(f"- {feat}: {corr:.3f}")
\ No newline at end of file
+
+def analisar_features(caminho=PROCESSED_FILE, processos=None, tamanho_bloco=200_000):
+    """
+    Calcula, em uma leitura dos dados em blocos (partições em paralelo):
+
+    - correlacoes: correlações das variáveis numéricas com default (ordenadas)
+    - taxas: {coluna categórica: DataFrame com 'Quantidade' e 'Taxa de Default (%)'}
+    - correlacoes_derivadas: correlações das features derivadas com default
+    """
+    agregados = agregar_dados_processados(NUMERIC_COLUMNS + categorical_cols, tamanho_bloco, caminho, processos,
+                                          transformar=adicionar_features_derivadas,
+                                          categorias=categorical_cols, colunas_classe=(),
+                                          colunas_correlacao=NUMERIC_COLUMNS + new_features)
+    correlacao = agregados.correlacao()['default']
+
+    taxas = {}
+    for col in categorical_cols:
+        default_rate = agregados.taxa_por_categoria(col)[['count', 'mean']].round(3)
+        default_rate['mean'] = default_rate['mean'] * 100  # Converter para percentagem
+        default_rate.columns = ['Quantidade', 'Taxa de Default (%)']
+        taxas[col] = default_rate
+
+    return {
+        'correlacoes': correlacao[NUMERIC_COLUMNS].sort_values(ascending=False),
+        'taxas': taxas,
+        'correlacoes_derivadas': correlacao[new_features],
+    }
+
+
+def main(processos=None, tamanho_bloco=200_000):
+    print("=== Análise de Features para Modelo de ML ===\n")
+    resultado = analisar_features(processos=processos, tamanho_bloco=tamanho_bloco)
+
+    # Correlações com default (apenas para variáveis numéricas)
+    print("\nCorrelações com Default (ordenadas):")
+    print(resultado['correlacoes'].round(3))
+
+    # Análise das variáveis categóricas
+    print("\nAnálise de Variáveis Categóricas:")
+    for col, default_rate in resultado['taxas'].items():
+        print(f"\nTaxa de Default por {col}:")
+        print(default_rate)
+
+    # Features derivadas
+    print("\nFeatures Derivadas:")
+    print("\nCorrelações das novas features com default:")
+    for feat, corr in resultado['correlacoes_derivadas'].items():
+        print(f"- {feat}: {corr:.3f}")
+    return resultado
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Análise das features do dataset processado.")
+    parser.add_argument('--processos', type=int, default=None)
+    parser.add_argument('--tamanho-bloco', type=int, default=200_000)
+    args = parser.parse_args()
+    main(args.processos, args.tamanho_bloco)
@@ -0,0 +1,147 @@
+"""
+Análise em massa de arquivos de pedidos de empréstimo (CSV ou Parquet).
+
+O arquivo é lido em blocos, e cada bloco é avaliado por um processo de um
+pool; cada processo carrega o modelo uma única vez. Os resultados são
+gravados no arquivo de saída à medida que ficam prontos, na ordem original,
+com no máximo `--blocos-em-andamento` blocos na memória.
+
+Uso:
+    python src/bulk_scoring.py pedidos.csv resultados.csv
+    python src/bulk_scoring.py pedidos.parquet resultados.parquet --processos 4 --tamanho-bloco 50000
+"""
+import argparse
+import os
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+from tqdm import tqdm
+
+from predict_new_loan import registro, analisar_emprestimos_df, fatores_risco_df
+
+# Modelo carregado uma vez em cada processo do pool (veja `_inicializar_worker`)
+_modelo = None
+
+
+def _inicializar_worker():
+    global _modelo
+    _modelo = registro.obter()
+
+
+def pontuar_bloco(df, colunas=None, modelo=None):
+    """
+    Avalia um bloco de pedidos. Retorna as `colunas` do bloco (todas, se None)
+    seguidas de `probabilidade_default`, `previsao`, `nivel_confianca` e `risco_<nome>`.
+    """
+    resultado = analisar_emprestimos_df(df, modelo or _modelo)
+    entrada = df if colunas is None else df[colunas]
+    return pd.concat([entrada, resultado, fatores_risco_df(df)], axis=1)
+
+
+def _formato(caminho):
+    return 'parquet' if caminho.lower().endswith(('.parquet', '.pq')) else 'csv'
+
+
+def ler_blocos(caminho, tamanho_bloco):
+    """Lê o arquivo de entrada em blocos de até `tamanho_bloco` linhas."""
+    if _formato(caminho) == 'parquet':
+        for batch in pq.ParquetFile(caminho).iter_batches(batch_size=tamanho_bloco):
+            yield batch.to_pandas()
+    else:
+        yield from pd.read_csv(caminho, chunksize=tamanho_bloco)
+
+
+def contar_linhas(caminho):
+    """Número de linhas do arquivo para a barra de progresso (None se exigir ler o arquivo inteiro)."""
+    if _formato(caminho) == 'parquet':
+        return pq.ParquetFile(caminho).metadata.num_rows
+    return None
+
+
+class EscritorResultados:
+    """Grava os blocos de resultado em CSV ou Parquet, um bloco por vez."""
+
+    def __init__(self, caminho):
+        self.caminho = caminho
+        self.formato = _formato(caminho)
+        self._writer = None
+        self._primeiro = True
+
+    def escrever(self, df):
+        if self.formato == 'parquet':
+            tabela = pa.Table.from_pandas(df, preserve_index=False)
+            if self._writer is None:
+                self._writer = pq.ParquetWriter(self.caminho, tabela.schema)
+            self._writer.write_table(tabela.cast(self._writer.schema))
+        else:
+            df.to_csv(self.caminho, mode='w' if self._primeiro else 'a', header=self._primeiro, index=False)
+        self._primeiro = False
+
+    def fechar(self):
+        if self._writer is not None:
+            self._writer.close()
+            self._writer = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.fechar()
+
+
+def pontuar_arquivo(entrada, saida, tamanho_bloco=50_000, processos=None, blocos_em_andamento=None,
+                    colunas=None, progresso=True):
+    """
+    Avalia todos os pedidos de `entrada` e grava os resultados em `saida`.
+
+    - colunas: colunas da entrada copiadas para a saída (None copia todas)
+    - blocos_em_andamento: limite de blocos enviados ao pool e ainda não gravados
+      (padrão: 2 por processo), o que limita a memória usada
+
+    Retorna o número de linhas avaliadas.
+    """
+    processos = processos or os.cpu_count() or 1
+    blocos_em_andamento = blocos_em_andamento or 2 * processos
+    os.makedirs(os.path.dirname(os.path.abspath(saida)), exist_ok=True)
+
+    def gravar(future):
+        resultado = future.result()
+        escritor.escrever(resultado)
+        barra.update(len(resultado))
+        return len(resultado)
+
+    total = 0
+    pendentes = deque()
+    with ProcessPoolExecutor(max_workers=processos, initializer=_inicializar_worker) as executor, \
+            EscritorResultados(saida) as escritor, \
+            tqdm(total=contar_linhas(entrada), unit='linhas', disable=not progresso) as barra:
+        for bloco in ler_blocos(entrada, tamanho_bloco):
+            # Espera o bloco mais antigo antes de ler mais (mantém a ordem e limita a memória)
+            if len(pendentes) >= blocos_em_andamento:
+                total += gravar(pendentes.popleft())
+            pendentes.append(executor.submit(pontuar_bloco, bloco, colunas))
+
+        while pendentes:
+            total += gravar(pendentes.popleft())
+
+    return total
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Análise em massa de pedidos de empréstimo (CSV ou Parquet).")
+    parser.add_argument('entrada', help="Arquivo de pedidos (.csv ou .parquet)")
+    parser.add_argument('saida', help="Arquivo de resultados (.csv ou .parquet)")
+    parser.add_argument('--tamanho-bloco', type=int, default=50_000)
+    parser.add_argument('--processos', type=int, default=None)
+    parser.add_argument('--blocos-em-andamento', type=int, default=None,
+                        help="Máximo de blocos em processamento ao mesmo tempo (padrão: 2 por processo)")
+    parser.add_argument('--colunas', nargs='+', default=None,
+                        help="Colunas da entrada copiadas para a saída (padrão: todas)")
+    args = parser.parse_args()
+
+    linhas = pontuar_arquivo(args.entrada, args.saida, args.tamanho_bloco, args.processos,
+                             args.blocos_em_andamento, args.colunas)
+    print(f"{linhas} pedidos avaliados. Resultados em '{args.saida}'")
@@ -1,14 +1,54 @@
-import numpy as np
 import pandas as pd
-from sklearn.linear_model import LogisticRegression
-from sklearn.ensemble import RandomForestClassifier
-import xgboost as xgb
 from sklearn.metrics import classification_report, confusion_matrix, roc_auc_score
-from imblearn.over_sampling import SMOTE
+from threadpoolctl import threadpool_limits
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import argparse
 import pickle
 import os
-import matplotlib.pyplot as plt
-import seaborn as sns
+import tempfile
+import time
+from data_processing.model_matrices import carregar_matrizes, compartilhar_matriz, abrir_matriz_compartilhada
+from core.tuning import FEATURES_BASICAS, criar_estimador, melhores_parametros
+from core.balancing import ESTRATEGIAS, ESTRATEGIA_PADRAO, balancear, resumo_classes
+from utils.recursos import pico_memoria_mb
+from utils.graficos import desenhar_importancia_features, desenhar_matrizes_confusao
+from utils.plot_cache import RenderizadorGraficos
+
+model_dir = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'models')
+
+# Modelos comparados, com a descrição exibida no relatório e o peso no orçamento de threads
+CANDIDATOS = {
+    'Regressão Logística': {
+        'descricao': [
+            "Este é o modelo mais simples e interpretável:",
+            "- Tenta encontrar uma linha que separe os defaults dos não-defaults",
+            "- Bom para entender quais variáveis são mais importantes",
+            "- Rápido para treinar e fácil de interpretar",
+        ],
+        'peso_threads': 1,  # lbfgs praticamente não se beneficia de mais threads
+        'arquivo': 'logistic',
+    },
+    'Random Forest': {
+        'descricao': [
+            "Este modelo é um conjunto de árvores de decisão:",
+            "- Cada árvore 'vota' se acha que será default ou não",
+            "- Bom para capturar relações não lineares",
+            "- Mais robusto que a Regressão Logística",
+        ],
+        'peso_threads': 2,
+        'arquivo': 'random_forest',
+    },
+    'XGBoost': {
+        'descricao': [
+            "Este é o modelo mais avançado:",
+            "- Aprende gradualmente com seus erros",
+            "- Geralmente tem a melhor performance",
+            "- Mais complexo de ajustar",
+        ],
+        'peso_threads': 2,
+        'arquivo': 'xgboost',
+    },
+}
 
 def avaliar_modelo(y_true, y_pred, y_pred_proba, nome_modelo):
     """Função para avaliar e mostrar resultados do modelo de forma clara."""
@@ -40,101 +80,103 @@ def avaliar_modelo(y_true, y_pred, y_pred_proba, nome_modelo):
     
     return conf_matrix, auc_roc
 
-# 1. Carregar os dados preparados
-print("\n1. Carregando dados preparados...")
-model_dir = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'models')
-X_train = np.load(os.path.join(model_dir, 'X_train_transformed.npy'))
-X_test = np.load(os.path.join(model_dir, 'X_test_transformed.npy'))
-y_train = np.load(os.path.join(model_dir, 'y_train.npy'))
-y_test = np.load(os.path.join(model_dir, 'y_test.npy'))
-
-with open(os.path.join(model_dir, 'feature_names.pkl'), 'rb') as f:
-    feature_names = pickle.load(f)
-
-# 2. Aplicar SMOTE para balancear os dados
-print("\n2. Balanceando os dados com SMOTE...")
-smote = SMOTE(random_state=42)
-X_train_balanced, y_train_balanced = smote.fit_resample(X_train, y_train)
-
-print("\nDistribuição das classes após SMOTE:")
-print(f"Não Default: {sum(y_train_balanced == 0)}")
-print(f"Default: {sum(y_train_balanced == 1)}")
-
-# 3. Treinar e avaliar cada modelo
-resultados = {}
-
-# 3.1 Regressão Logística
-print("\n3.1 Treinando Regressão Logística...")
-print("Este é o modelo mais simples e interpretável:")
-print("- Tenta encontrar uma linha que separe os defaults dos não-defaults")
-print("- Bom para entender quais variáveis são mais importantes")
-print("- Rápido para treinar e fácil de interpretar")
+def parametros_buscados(nomes, estrategia_balanceamento):
+    """
+    Parâmetros da última busca de cada modelo (src/core/tuning.py), se ela usou as
+    mesmas features (sem as avançadas) e o mesmo balanceamento desta comparação.
+    """
+    return {nome: melhores_parametros(nome, model_dir, FEATURES_BASICAS, estrategia_balanceamento) for nome in nomes}
 
-log_reg = LogisticRegression(random_state=42, max_iter=1000)
-log_reg.fit(X_train_balanced, y_train_balanced)
-y_pred_log = log_reg.predict(X_test)
-y_pred_proba_log = log_reg.predict_proba(X_test)[:, 1]
+def criar_modelo(nome, n_threads, params=None):
+    """Cria o estimador `nome` limitado a `n_threads` threads, com os parâmetros `params` (ex.: da busca)."""
+    return criar_estimador(nome, params, n_threads)
 
-conf_matrix_log, auc_log = avaliar_modelo(y_test, y_pred_log, y_pred_proba_log, "Regressão Logística")
-resultados['Regressão Logística'] = {'conf_matrix': conf_matrix_log, 'auc': auc_log}
-
-# 3.2 Random Forest
-print("\n3.2 Treinando Random Forest...")
-print("Este modelo é um conjunto de árvores de decisão:")
-print("- Cada árvore 'vota' se acha que será default ou não")
-print("- Bom para capturar relações não lineares")
-print("- Mais robusto que a Regressão Logística")
-
-rf = RandomForestClassifier(n_estimators=100, random_state=42)
-rf.fit(X_train_balanced, y_train_balanced)
-y_pred_rf = rf.predict(X_test)
-y_pred_proba_rf = rf.predict_proba(X_test)[:, 1]
-
-conf_matrix_rf, auc_rf = avaliar_modelo(y_test, y_pred_rf, y_pred_proba_rf, "Random Forest")
-resultados['Random Forest'] = {'conf_matrix': conf_matrix_rf, 'auc': auc_rf}
-
-# 3.3 XGBoost
-print("\n3.3 Treinando XGBoost...")
-print("Este é o modelo mais avançado:")
-print("- Aprende gradualmente com seus erros")
-print("- Geralmente tem a melhor performance")
-print("- Mais complexo de ajustar")
-
-xgb_model = xgb.XGBClassifier(
-    objective='binary:logistic',
-    random_state=42,
-    n_estimators=100
-)
-xgb_model.fit(X_train_balanced, y_train_balanced)
-y_pred_xgb = xgb_model.predict(X_test)
-y_pred_proba_xgb = xgb_model.predict_proba(X_test)[:, 1]
-
-conf_matrix_xgb, auc_xgb = avaliar_modelo(y_test, y_pred_xgb, y_pred_proba_xgb, "XGBoost")
-resultados['XGBoost'] = {'conf_matrix': conf_matrix_xgb, 'auc': auc_xgb}
-
-# 4. Comparação dos modelos
-print("\n4. Comparação Final dos Modelos:")
-print("\nAUC-ROC Scores:")
-for modelo, res in resultados.items():
-    print(f"{modelo}: {res['auc']:.3f}")
-
-# 5. Visualizações
-print("\n5. Criando visualizações comparativas...")
+def orcamento_threads(nomes, max_workers, n_cpus=None):
+    """
+    Divide os núcleos entre os modelos para que a soma das threads não passe do
+    total disponível. Se todos rodam ao mesmo tempo, a divisão segue o peso de
+    cada modelo; caso contrário, cada worker recebe a mesma fatia.
+    """
+    n_cpus = n_cpus or os.cpu_count() or 1
+    if max_workers < len(nomes):
+        return {nome: max(1, n_cpus // max_workers) for nome in nomes}
+    
+    peso_total = sum(CANDIDATOS[nome]['peso_threads'] for nome in nomes)
+    return {
+        nome: max(1, n_cpus * CANDIDATOS[nome]['peso_threads'] // peso_total)
+        for nome in nomes
+    }
 
-# 5.1 Matriz de Confusão para cada modelo
-fig, axes = plt.subplots(1, 3, figsize=(15, 5))
-for i, (modelo, res) in enumerate(resultados.items()):
-    sns.heatmap(res['conf_matrix'], annot=True, fmt='d', cmap='Blues', ax=axes[i])
-    axes[i].set_title(f'Matriz de Confusão\n{modelo}')
-    axes[i].set_ylabel('Real')
-    axes[i].set_xlabel('Previsto')
+def treinar_candidato(nome, n_threads, ref_X_train, ref_y_train, ref_X_test, ref_sample_weight=None, params=None):
+    """
+    Executado em um processo separado: abre as matrizes compartilhadas
+    (somente leitura), treina o modelo e calcula as previsões de teste.
+    """
+    X_train = abrir_matriz_compartilhada(ref_X_train)
+    y_train = abrir_matriz_compartilhada(ref_y_train)
+    X_test = abrir_matriz_compartilhada(ref_X_test)
+    sample_weight = abrir_matriz_compartilhada(ref_sample_weight) if ref_sample_weight else None
+    
+    # Limitar também as threads de BLAS/OpenMP usadas por numpy e scikit-learn
+    with threadpool_limits(limits=n_threads):
+        inicio = time.perf_counter()
+        modelo = criar_modelo(nome, n_threads, params)
+        modelo.fit(X_train, y_train, sample_weight=sample_weight)
+        tempo_treino = time.perf_counter() - inicio
+        
+        y_pred_proba = modelo.predict_proba(X_test)[:, 1]
+    
+    return {
+        'nome': nome,
+        'modelo': modelo,
+        'y_pred_proba': y_pred_proba,
+        'tempo_treino': tempo_treino,
+        'pico_memoria_mb': pico_memoria_mb(),
+    }
 
-plt.tight_layout()
-plt.savefig(os.path.join(model_dir, 'comparison_confusion_matrices.png'))
-plt.close()
+def treinar_em_paralelo(X_train, y_train, X_test, nomes=None, max_workers=None, sample_weight=None,
+                        parametros=None):
+    """
+    Treina os modelos candidatos em paralelo, um processo por modelo
+    (`parametros`: {nome: parâmetros do estimador}, opcional).
+    
+    As matrizes (e os pesos das linhas, se houver) são gravadas uma única vez
+    em disco e abertas via memory-map pelos workers, em vez de serem copiadas
+    para cada processo.
+    """
+    nomes = list(nomes or CANDIDATOS)
+    parametros = parametros or {}
+    max_workers = max_workers or min(len(nomes), os.cpu_count() or 1)
+    threads = orcamento_threads(nomes, max_workers)
+    
+    resultados = {}
+    with tempfile.TemporaryDirectory(prefix='compare_models_') as tmp_dir:
+        ref_X_train = compartilhar_matriz(X_train, tmp_dir, 'X_train')
+        ref_y_train = compartilhar_matriz(y_train, tmp_dir, 'y_train')
+        ref_X_test = compartilhar_matriz(X_test, tmp_dir, 'X_test')
+        ref_sample_weight = (compartilhar_matriz(sample_weight, tmp_dir, 'sample_weight')
+                             if sample_weight is not None else None)
+        
+        # Um processo novo por modelo: o pico de memória medido é só daquele modelo
+        with ProcessPoolExecutor(max_workers=max_workers, max_tasks_per_child=1) as executor:
+            futures = {}
+            for nome in nomes:
+                print(f"- Iniciando {nome} com {threads[nome]} thread(s)")
+                futures[executor.submit(treinar_candidato, nome, threads[nome],
+                                        ref_X_train, ref_y_train, ref_X_test, ref_sample_weight,
+                                        parametros.get(nome))] = nome
+            
+            for future in as_completed(futures):
+                resultado = future.result()
+                print(f"- {resultado['nome']} concluído em {resultado['tempo_treino']:.1f}s")
+                resultados[resultado['nome']] = resultado
+    
+    # Manter a ordem original dos candidatos
+    return {nome: resultados[nome] for nome in nomes}
 
 # 5.2 Importância das Features para cada modelo
-def plot_feature_importance(model, model_name):
+def importancia_features(model, model_name, feature_names):
+    """Top 10 features do modelo (coeficientes absolutos na Regressão Logística)."""
     if model_name == "Regressão Logística":
         importance = abs(model.coef_[0])
     elif model_name == "Random Forest":
@@ -142,33 +184,98 @@ def plot_feature_importance(model, model_name):
     else:  # XGBoost
         importance = model.feature_importances_
     
-    feature_imp = pd.DataFrame({
+    return pd.DataFrame({
         'feature': feature_names,
         'importance': importance
-    }).sort_values('importance', ascending=False)
-    
-    plt.figure(figsize=(10, 6))
-    sns.barplot(x='importance', y='feature', data=feature_imp.head(10))
-    plt.title(f'Top 10 Features Mais Importantes - {model_name}')
-    plt.tight_layout()
-    plt.savefig(os.path.join(model_dir, f'feature_importance_{model_name}.png'))
-    plt.close()
-
-plot_feature_importance(log_reg, "Regressão Logística")
-plot_feature_importance(rf, "Random Forest")
-plot_feature_importance(xgb_model, "XGBoost")
+    }).sort_values('importance', ascending=False).head(10)
 
-# 6. Salvar os modelos
-print("\n6. Salvando os modelos...")
-models = {
-    'logistic': log_reg,
-    'random_forest': rf,
-    'xgboost': xgb_model
-}
-
-for name, model in models.items():
-    with open(os.path.join(model_dir, f'{name}_model.pkl'), 'wb') as f:
-        pickle.dump(model, f)
+def main(max_workers=None, estrategia_balanceamento=ESTRATEGIA_PADRAO, graficos=True):
+    # 1. Carregar os dados preparados
+    print("\n1. Carregando dados preparados...")
+    X_train, X_test, y_train, y_test = carregar_matrizes(model_dir)  # matrizes CSR
+    
+    with open(os.path.join(model_dir, 'feature_names.pkl'), 'rb') as f:
+        feature_names = pickle.load(f)
+    
+    # 2. Balancear os dados
+    print(f"\n2. Balanceando os dados (estratégia: {estrategia_balanceamento})...")
+    X_train_balanced, y_train_balanced, sample_weight = balancear(X_train, y_train, estrategia_balanceamento)
+    
+    distribuicao = resumo_classes(y_train_balanced, sample_weight)
+    print("\nDistribuição das classes após o balanceamento" + (" (soma dos pesos):" if sample_weight is not None else ":"))
+    print(f"Não Default: {distribuicao[0]:.0f}")
+    print(f"Default: {distribuicao[1]:.0f}")
+    
+    # 3. Treinar todos os modelos em paralelo
+    print("\n3. Treinando os modelos em paralelo...")
+    parametros = parametros_buscados(CANDIDATOS, estrategia_balanceamento)
+    treinados = treinar_em_paralelo(X_train_balanced, y_train_balanced, X_test, max_workers=max_workers,
+                                    sample_weight=sample_weight, parametros=parametros)
+    
+    # Avaliar cada modelo (na ordem original, para um relatório legível)
+    resultados = {}
+    for i, (nome, treinado) in enumerate(treinados.items(), start=1):
+        print(f"\n3.{i} {nome}")
+        for linha in CANDIDATOS[nome]['descricao']:
+            print(linha)
+        
+        y_pred_proba = treinado['y_pred_proba']
+        y_pred = (y_pred_proba > 0.5).astype(int)
+        conf_matrix, auc = avaliar_modelo(y_test, y_pred, y_pred_proba, nome)
+        resultados[nome] = {
+            'conf_matrix': conf_matrix,
+            'auc': auc,
+            'tempo_treino': treinado['tempo_treino'],
+            'pico_memoria_mb': treinado['pico_memoria_mb'],
+        }
+    
+    # 4. Comparação dos modelos
+    print("\n4. Comparação Final dos Modelos:")
+    comparacao = pd.DataFrame({
+        nome: {
+            'AUC-ROC': res['auc'],
+            'Tempo de Treino (s)': res['tempo_treino'],
+            'Pico de Memória (MB)': res['pico_memoria_mb'],
+        }
+        for nome, res in resultados.items()
+    }).T
+    print(comparacao.round(3))
+    comparacao.to_csv(os.path.join(model_dir, 'model_comparison.csv'), index_label='modelo')
+    
+    # 5. Visualizações (desenhadas em paralelo enquanto os modelos são salvos; as que não mudaram são mantidas)
+    print("\n5. Criando visualizações comparativas..." if graficos else "\n5. Visualizações desativadas (--sem-graficos)")
+    renderizador = RenderizadorGraficos(model_dir, habilitado=graficos)
+    
+    # 5.1 Matriz de Confusão para cada modelo
+    renderizador.agendar('comparison_confusion_matrices.png', desenhar_matrizes_confusao,
+                         {f'Matriz de Confusão\n{modelo}': res['conf_matrix'] for modelo, res in resultados.items()},
+                         figsize=(15, 5))
+    
+    for nome, treinado in treinados.items():
+        renderizador.agendar(f'feature_importance_{nome}.png', desenhar_importancia_features,
+                             importancia_features(treinado['modelo'], nome, feature_names),
+                             titulo=f'Top 10 Features Mais Importantes - {nome}', figsize=(10, 6))
+    
+    # 6. Salvar os modelos
+    print("\n6. Salvando os modelos...")
+    for nome, treinado in treinados.items():
+        with open(os.path.join(model_dir, f"{CANDIDATOS[nome]['arquivo']}_model.pkl"), 'wb') as f:
+            pickle.dump(treinado['modelo'], f)
+    
+    resumo = renderizador.concluir()
+    if graficos:
+        print(f"- Gráficos: {resumo['renderizados']} gerado(s), {resumo['em_cache']} sem alteração")
+    
+    print("\nAnálise completa! Todos os modelos foram salvos na pasta 'models'")
+    print("Verifique as visualizações geradas para uma comparação detalhada dos modelos.")
 
-print("\nAnálise completa! Todos os modelos foram salvos na pasta 'models'")
-print("Verifique as visualizações geradas para uma comparação detalhada dos modelos.")
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compara Regressão Logística, Random Forest e XGBoost.")
+    parser.add_argument('--workers', type=int, default=None,
+                        help="Número de modelos treinados ao mesmo tempo (padrão: um por núcleo, até 3)")
+    parser.add_argument('--balanceamento', choices=list(ESTRATEGIAS), default=ESTRATEGIA_PADRAO,
+                        help="Estratégia de balanceamento das classes (padrão: pesos por classe, sem linhas novas)")
+    parser.add_argument('--sem-graficos', dest='graficos', action='store_false',
+                        help="Não gera os gráficos comparativos")
+    args = parser.parse_args()
+    main(max_workers=args.workers, estrategia_balanceamento=args.balanceamento, graficos=args.graficos)
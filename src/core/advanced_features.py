@@ -0,0 +1,112 @@
+"""
+Features avançadas do modelo logístico (calculadas sobre as features já padronizadas)
+"""
+import numpy as np
+from scipy import sparse
+
+from data_processing.model_matrices import coluna_densa
+
+# Features usadas no cálculo e nomes das colunas criadas (na ordem em que são anexadas)
+BASE_FEATURES = ['int_rate', 'loan_to_income', 'dti']
+ADVANCED_FEATURE_NAMES = ['int_rate_x_loan_to_income', 'risk_score', 'high_risk_indicator']
+
+
+class AdvancedFeatures:
+    """
+    Cria as features avançadas com estado de treino:
+
+    - fit / partial_fit: guardam as médias de (int_rate, loan_to_income, dti)
+      usadas no indicador de alto risco (partial_fit acumula bloco a bloco)
+    - transform: anexa as novas colunas usando sempre as médias de treino, de
+      forma que o resultado de uma linha não depende do lote em que ela está
+
+    Aceita uma linha (array 1-D), matrizes densas ou esparsas. Matrizes
+    densas são copiadas uma única vez para a saída pré-alocada (ou para `out`),
+    e as novas colunas são escritas diretamente nela; matrizes esparsas
+    continuam esparsas.
+    """
+
+    def __init__(self, feature_names, medias=None):
+        self.feature_names = list(feature_names)
+        self.indices = [self.feature_names.index(nome) for nome in BASE_FEATURES]
+        self.new_feature_names = self.feature_names + ADVANCED_FEATURE_NAMES
+        self.medias_ = None if medias is None else np.asarray(medias, dtype=np.float64)
+        self._soma = np.zeros(len(BASE_FEATURES))
+        self._n = 0
+
+    def partial_fit(self, X):
+        X = np.atleast_2d(X) if not sparse.issparse(X) else X
+        self._soma += [coluna_densa(X, idx).sum() for idx in self.indices]
+        self._n += X.shape[0]
+        self.medias_ = self._soma / self._n
+        return self
+
+    def fit(self, X):
+        self._soma = np.zeros(len(BASE_FEATURES))
+        self._n = 0
+        return self.partial_fit(X)
+
+    def preencher(self, out):
+        """
+        Calcula as features avançadas a partir das primeiras len(feature_names)
+        colunas de `out` (matriz densa) e as escreve nas três últimas colunas.
+        """
+        if self.medias_ is None:
+            raise RuntimeError("AdvancedFeatures precisa de fit antes de transform")
+        n_base = len(self.feature_names)
+        int_rate, loan_to_income, dti = (out[:, idx] for idx in self.indices)
+        interacao, risk_score, high_risk = (out[:, n_base + i] for i in range(len(ADVANCED_FEATURE_NAMES)))
+
+        # 1. Interação entre taxa de juros e loan_to_income
+        np.multiply(int_rate, loan_to_income, out=interacao)
+
+        # 2. Score de risco: 40% taxa de juros, 30% empréstimo/renda, 30% dívida/renda
+        np.multiply(int_rate, 0.4, out=risk_score)
+        risk_score += 0.3 * loan_to_income
+        risk_score += 0.3 * dti
+
+        # 3. Indicador de alto risco: as três variáveis acima da média de treino
+        high_risk[:] = ((int_rate > self.medias_[0]) &
+                        (loan_to_income > self.medias_[1]) &
+                        (dti > self.medias_[2]))
+        return out
+
+    def transform(self, X, out=None):
+        """
+        Retorna X com as três colunas avançadas anexadas.
+
+        - out: matriz densa (n, len(new_feature_names)) já alocada para receber
+          o resultado (apenas para X denso)
+        """
+        if sparse.issparse(X):
+            # Só as 3 colunas base são densificadas; as novas colunas são anexadas em CSR
+            k = len(BASE_FEATURES)
+            calculadas = np.empty((X.shape[0], k + len(ADVANCED_FEATURE_NAMES)))
+            for i, idx in enumerate(self.indices):
+                calculadas[:, i] = coluna_densa(X, idx)
+            AdvancedFeatures(BASE_FEATURES, self.medias_).preencher(calculadas)
+            return sparse.hstack([X, sparse.csr_matrix(calculadas[:, k:])], format='csr')
+
+        linha_unica = np.ndim(X) == 1
+        X = np.atleast_2d(X)
+        if out is None:
+            out = np.empty((X.shape[0], len(self.new_feature_names)))
+        out[:, :len(self.feature_names)] = X
+        self.preencher(out)
+        return out[0] if linha_unica else out
+
+    def fit_transform(self, X):
+        return self.fit(X).transform(X)
+
+
+def create_advanced_features(X, feature_names, medias=None):
+    """
+    Cria features avançadas para melhorar o modelo.
+    Matrizes esparsas continuam esparsas: as novas colunas são anexadas sem densificar X.
+
+    - medias: médias usadas no indicador de alto risco (por padrão, as do próprio X).
+      Para aplicar as médias de treino a outros dados, use `AdvancedFeatures`.
+    """
+    features = AdvancedFeatures(feature_names, medias)
+    X_new = features.transform(X) if medias is not None else features.fit_transform(X)
+    return X_new, features.new_feature_names
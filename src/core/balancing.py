@@ -0,0 +1,283 @@
+"""
+Estratégias de balanceamento das classes para o treino dos modelos.
+
+Todas recebem (X, y) — X denso ou CSR — e retornam (X, y, sample_weight),
+onde sample_weight é None quando as linhas já estão balanceadas:
+
+- 'pesos': nenhuma linha nova; cada classe recebe peso inversamente
+  proporcional à sua frequência (passado em `fit(..., sample_weight=...)`)
+- 'undersampling': amostra aleatória da classe majoritária
+- 'undersampling_clusters': amostra da classe majoritária estratificada por
+  clusters (MiniBatchKMeans), mantendo a cobertura do espaço das features
+- 'smote_aproximado': SMOTE em blocos, com vizinhos procurados em uma
+  amostra de referência da classe minoritária (sem índice k-NN sobre todas
+  as linhas e sem matrizes de distância maiores que bloco x referência)
+- 'smote': SMOTE exato do imbalanced-learn (referência para comparação)
+- 'nenhum': dados originais
+
+Uso (relatório de tempo, memória e AUC de cada estratégia com a regressão logística):
+    python src/core/balancing.py
+    python src/core/balancing.py --estrategias pesos undersampling smote_aproximado
+"""
+import argparse
+import os
+import pickle
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+from scipy import sparse
+from sklearn.cluster import MiniBatchKMeans
+from sklearn.utils.class_weight import compute_sample_weight
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from data_processing.model_matrices import abrir_matriz_compartilhada, carregar_matrizes, compartilhar_matriz
+from core.advanced_features import AdvancedFeatures
+from utils.recursos import pico_memoria_mb
+
+ESTRATEGIA_PADRAO = 'pesos'
+
+
+def _classes(y):
+    """(rótulo minoritário, rótulo majoritário, índices da minoritária, índices da majoritária)."""
+    rotulos, contagens = np.unique(y, return_counts=True)
+    if len(rotulos) != 2:
+        raise ValueError(f"Balanceamento espera 2 classes, recebeu {len(rotulos)}")
+    minoritaria, majoritaria = rotulos[np.argsort(contagens, kind='stable')]
+    return minoritaria, majoritaria, np.flatnonzero(y == minoritaria), np.flatnonzero(y == majoritaria)
+
+
+def _empilhar(blocos):
+    return sparse.vstack(blocos, format='csr') if sparse.issparse(blocos[0]) else np.vstack(blocos)
+
+
+def _manter(X, y, indices):
+    indices = np.sort(indices)
+    return X[indices], y[indices], None
+
+
+def sem_balanceamento(X, y, random_state=42):
+    return X, y, None
+
+
+def pesos_classes(X, y, random_state=42):
+    """Pesos 'balanced' do scikit-learn: n / (2 * n_classe) para cada linha."""
+    return X, y, compute_sample_weight('balanced', y)
+
+
+def undersampling_aleatorio(X, y, random_state=42, proporcao=1.0):
+    """
+    Mantém toda a classe minoritária e uma amostra aleatória da majoritária.
+
+    - proporcao: minoritária / majoritária depois do balanceamento (1.0 = classes iguais)
+    """
+    rng = np.random.default_rng(random_state)
+    _, _, idx_min, idx_maj = _classes(y)
+    n_maj = min(len(idx_maj), int(round(len(idx_min) / proporcao)))
+    return _manter(X, y, np.r_[idx_min, rng.choice(idx_maj, n_maj, replace=False)])
+
+
+def undersampling_clusters(X, y, random_state=42, proporcao=1.0, n_clusters=50, tamanho_ajuste=100_000):
+    """
+    Undersampling da classe majoritária estratificado por clusters.
+
+    A majoritária é dividida em `n_clusters` grupos (MiniBatchKMeans ajustado
+    em até `tamanho_ajuste` linhas) e cada grupo contribui com linhas reais na
+    proporção do seu tamanho, de forma que regiões pouco povoadas do espaço
+    das features não desaparecem por acaso.
+    """
+    rng = np.random.default_rng(random_state)
+    _, _, idx_min, idx_maj = _classes(y)
+    n_maj = min(len(idx_maj), int(round(len(idx_min) / proporcao)))
+
+    X_maj = X[idx_maj]
+    amostra_ajuste = rng.choice(len(idx_maj), min(tamanho_ajuste, len(idx_maj)), replace=False)
+    kmeans = MiniBatchKMeans(n_clusters=min(n_clusters, len(amostra_ajuste)), random_state=random_state,
+                             n_init=3, batch_size=4096)
+    kmeans.fit(X_maj[amostra_ajuste])
+    grupos = kmeans.predict(X_maj)
+
+    # Cotas proporcionais ao tamanho de cada cluster; o resto do arredondamento vai para os maiores
+    tamanhos = np.bincount(grupos, minlength=kmeans.n_clusters)
+    cotas = np.floor(tamanhos * n_maj / len(idx_maj)).astype(int)
+    cotas[np.argsort(-tamanhos)[:n_maj - cotas.sum()]] += 1
+
+    ordem = np.argsort(grupos, kind='stable')
+    inicio = np.r_[0, np.cumsum(tamanhos)[:-1]]
+    escolhidos = [rng.choice(ordem[ini:ini + tam], cota, replace=False)
+                  for ini, tam, cota in zip(inicio, tamanhos, cotas) if cota > 0]
+    return _manter(X, y, np.r_[idx_min, idx_maj[np.concatenate(escolhidos)]])
+
+
+def smote_aproximado(X, y, random_state=42, proporcao=1.0, k_vizinhos=5, tamanho_referencia=5_000,
+                     tamanho_bloco=1_000):
+    """
+    SMOTE com vizinhos aproximados, gerado em blocos.
+
+    Cada linha sintética interpola uma linha minoritária sorteada e um dos
+    `k_vizinhos` vizinhos mais próximos dela dentro de uma amostra de
+    referência de `tamanho_referencia` linhas minoritárias. As distâncias
+    são calculadas bloco a bloco (matriz de no máximo tamanho_bloco x
+    tamanho_referencia), e as linhas sintéticas de entrada CSR continuam CSR.
+
+    - proporcao: minoritária / majoritária depois do balanceamento (1.0 = classes iguais)
+    """
+    rng = np.random.default_rng(random_state)
+    minoritaria, _, idx_min, idx_maj = _classes(y)
+    n_novos = int(round(proporcao * len(idx_maj))) - len(idx_min)
+    if n_novos <= 0:
+        return X, y, None
+
+    X_min = X[idx_min]
+    referencia = rng.choice(len(idx_min), min(tamanho_referencia, len(idx_min)), replace=False)
+    X_ref = X_min[referencia]
+    X_ref = X_ref.toarray() if sparse.issparse(X_ref) else np.asarray(X_ref, dtype=np.float64)
+    norma_ref = np.einsum('ij,ij->i', X_ref, X_ref)
+    k = min(k_vizinhos, len(referencia) - 1)
+    if k < 1:
+        raise ValueError("smote_aproximado precisa de pelo menos 2 linhas da classe minoritária")
+
+    # Posição de cada linha minoritária na referência (-1 se não está nela), para não escolher a própria linha
+    posicao_ref = np.full(len(idx_min), -1)
+    posicao_ref[referencia] = np.arange(len(referencia))
+
+    origens = rng.integers(len(idx_min), size=n_novos)
+    blocos = []
+    for inicio in range(0, n_novos, tamanho_bloco):
+        origem = origens[inicio:inicio + tamanho_bloco]
+        A = X_min[origem]
+        A = A.toarray() if sparse.issparse(A) else np.asarray(A, dtype=np.float64)
+
+        # ||a||² - 2 a·r + ||r||², sem ||a||² (constante na linha), calculado no próprio resultado de A @ X_ref.T
+        distancias = A @ X_ref.T
+        distancias *= -2
+        distancias += norma_ref
+        linhas = np.flatnonzero(posicao_ref[origem] >= 0)
+        distancias[linhas, posicao_ref[origem[linhas]]] = np.inf
+
+        vizinhos = np.argpartition(distancias, k - 1, axis=1)[:, :k]
+        escolhido = vizinhos[np.arange(len(origem)), rng.integers(k, size=len(origem))]
+        passo = rng.random(len(origem))[:, None]
+        novos = A + passo * (X_ref[escolhido] - A)
+        blocos.append(sparse.csr_matrix(novos) if sparse.issparse(X) else novos)
+
+    X_novos = _empilhar(blocos)
+    return _empilhar([X, X_novos]), np.r_[y, np.full(n_novos, minoritaria, dtype=y.dtype)], None
+
+
+def smote_exato(X, y, random_state=42):
+    from imblearn.over_sampling import SMOTE
+
+    X_bal, y_bal = SMOTE(random_state=random_state).fit_resample(X, y)
+    return X_bal, y_bal, None
+
+
+ESTRATEGIAS = {
+    'nenhum': sem_balanceamento,
+    'pesos': pesos_classes,
+    'undersampling': undersampling_aleatorio,
+    'undersampling_clusters': undersampling_clusters,
+    'smote_aproximado': smote_aproximado,
+    'smote': smote_exato,
+}
+
+
+def balancear(X, y, estrategia=ESTRATEGIA_PADRAO, random_state=42, **opcoes):
+    """Aplica a estratégia `estrategia` e retorna (X, y, sample_weight)."""
+    if estrategia not in ESTRATEGIAS:
+        raise ValueError(f"Estratégia de balanceamento desconhecida: {estrategia} (opções: {', '.join(ESTRATEGIAS)})")
+    return ESTRATEGIAS[estrategia](X, np.asarray(y), random_state=random_state, **opcoes)
+
+
+def resumo_classes(y, sample_weight=None):
+    """Contagem (ou soma dos pesos) de cada classe."""
+    y = np.asarray(y)
+    peso = np.ones(len(y)) if sample_weight is None else sample_weight
+    return {int(rotulo): float(peso[y == rotulo].sum()) for rotulo in np.unique(y)}
+
+
+def _avaliar_estrategia(estrategia, ref_X_train, ref_y_train, ref_X_test, ref_y_test):
+    """
+    Executado em um processo separado (o pico de memória é só desta estratégia):
+    balanceia, treina a regressão logística e calcula o AUC no teste.
+    """
+    from sklearn.linear_model import LogisticRegression
+    from sklearn.metrics import roc_auc_score
+
+    X_train = abrir_matriz_compartilhada(ref_X_train)
+    y_train = np.asarray(abrir_matriz_compartilhada(ref_y_train))
+    X_test = abrir_matriz_compartilhada(ref_X_test)
+    y_test = np.asarray(abrir_matriz_compartilhada(ref_y_test))
+    memoria_inicial = pico_memoria_mb()
+
+    inicio = time.perf_counter()
+    X_bal, y_bal, peso = balancear(X_train, y_train, estrategia)
+    tempo_balanceamento = time.perf_counter() - inicio
+
+    inicio = time.perf_counter()
+    model = LogisticRegression(random_state=42, max_iter=1000, C=0.1)
+    model.fit(X_bal, y_bal, sample_weight=peso)
+    tempo_treino = time.perf_counter() - inicio
+
+    pico = pico_memoria_mb()
+    return {
+        'estrategia': estrategia,
+        'linhas_treino': X_bal.shape[0],
+        'tempo_balanceamento (s)': tempo_balanceamento,
+        'tempo_treino (s)': tempo_treino,
+        'pico_memoria_mb': pico,
+        'memoria_adicional_mb': None if pico is None else pico - memoria_inicial,
+        'auc': roc_auc_score(y_test, model.predict_proba(X_test)[:, 1]),
+    }
+
+
+def comparar_estrategias(X_train, y_train, X_test, y_test, estrategias=None):
+    """
+    Relatório de tempo, memória e AUC de cada estratégia (regressão logística).
+
+    As estratégias rodam uma de cada vez, cada uma em um processo novo que abre
+    as matrizes compartilhadas via memory-map, para que tempo e pico de
+    memória de uma não contaminem os da outra.
+    """
+    estrategias = list(estrategias or ESTRATEGIAS)
+    resultados = []
+    with tempfile.TemporaryDirectory(prefix='balancing_') as tmp_dir:
+        refs = [compartilhar_matriz(matriz, tmp_dir, nome) for matriz, nome in
+                ((X_train, 'X_train'), (y_train, 'y_train'), (X_test, 'X_test'), (y_test, 'y_test'))]
+        for estrategia in estrategias:
+            with ProcessPoolExecutor(max_workers=1) as executor:
+                resultado = executor.submit(_avaliar_estrategia, estrategia, *refs).result()
+            print(f"- {estrategia}: AUC {resultado['auc']:.3f} em "
+                  f"{resultado['tempo_balanceamento (s)'] + resultado['tempo_treino (s)']:.1f}s")
+            resultados.append(resultado)
+    return pd.DataFrame(resultados).set_index('estrategia')
+
+
+def main(estrategias=None):
+    project_dir = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    model_dir = os.path.join(project_dir, 'models')
+
+    X_train, X_test, y_train, y_test = carregar_matrizes(model_dir)
+    with open(os.path.join(model_dir, 'feature_names.pkl'), 'rb') as f:
+        feature_names = pickle.load(f)
+    features_avancadas = AdvancedFeatures(feature_names).fit(X_train)
+    X_train = features_avancadas.transform(X_train)
+    X_test = features_avancadas.transform(X_test)
+
+    print(f"Treino: {X_train.shape[0]} linhas, classes {resumo_classes(y_train)}")
+    relatorio = comparar_estrategias(X_train, y_train, X_test, y_test, estrategias)
+    print("\nComparação das estratégias de balanceamento:")
+    print(relatorio.round(3))
+    relatorio.to_csv(os.path.join(model_dir, 'balancing_comparison.csv'))
+    print("\nRelatório salvo em 'models/balancing_comparison.csv'")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compara as estratégias de balanceamento das classes.")
+    parser.add_argument('--estrategias', nargs='+', choices=list(ESTRATEGIAS), default=None,
+                        help="Estratégias comparadas (padrão: todas)")
+    args = parser.parse_args()
+    main(args.estrategias)
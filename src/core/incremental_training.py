@@ -0,0 +1,273 @@
+"""
+Treinamento incremental (out-of-core) do modelo de default.
+
+O dataset processado é lido em blocos e nunca é carregado inteiro na memória:
+- 1ª passagem: média e desvio das numéricas, vocabulário das categorias e contagem das classes
+- passagens seguintes: cada bloco é transformado e usado em `partial_fit` de um
+  classificador linear (regressão logística via SGD)
+- última passagem: avaliação no conjunto de validação separado durante a leitura
+
+Uso:
+    python src/core/incremental_training.py --tamanho-bloco 200000 --epocas 3
+"""
+import argparse
+import os
+import pickle
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+from scipy import sparse
+from sklearn.linear_model import SGDClassifier
+from sklearn.metrics import roc_auc_score
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from data_processing.processed_data import PROCESSED_FILE, iterar_dados_processados
+from core.linear_scorer import exportar_pontuador
+
+# Mesmas features de prepare_model_data.py
+NUMERIC_FEATURES = ['loan_amnt', 'int_rate', 'annual_inc', 'dti', 'inq_last_6mths', 'emp_length', 'revol_util']
+DERIVED_FEATURES = ['loan_to_income', 'payment_to_income']
+CATEGORICAL_FEATURES = ['grade', 'home_ownership', 'purpose', 'term']
+TARGET = 'default'
+
+MODEL_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))), 'models')
+MODEL_FILE = os.path.join(MODEL_DIR, 'incremental_model.pkl')
+SCORER_FILE = os.path.join(MODEL_DIR, 'incremental_scorer.npz')
+
+
+def criar_features_derivadas(df):
+    """Adiciona loan_to_income e payment_to_income (limitadas a 100% da renda), como em prepare_model_data.py."""
+    df = df.copy()
+    df['loan_to_income'] = (df['loan_amnt'] / df['annual_inc']).clip(upper=1)
+    df['payment_to_income'] = ((df['loan_amnt'] * (df['int_rate'] / 100)) / df['annual_inc']).clip(upper=1)
+    return df
+
+
+def mascara_validacao(inicio, n, fracao, seed=42):
+    """
+    Indica quais das linhas [inicio, inicio + n) do dataset pertencem à validação.
+
+    A decisão depende apenas da posição global da linha (hash multiplicativo),
+    então é a mesma em todas as passagens e para qualquer tamanho de bloco.
+    """
+    posicoes = np.arange(inicio, inicio + n, dtype=np.uint64)
+    hash_ = (posicoes * np.uint64(2654435761) + np.uint64(seed)) % np.uint64(2 ** 32)
+    return hash_ < np.uint64(fracao * 2 ** 32)
+
+
+class PreprocessadorIncremental:
+    """
+    Equivalente incremental do ColumnTransformer de prepare_model_data.py.
+
+    - numéricas: padronização com média e desvio acumulados bloco a bloco;
+      valores faltantes recebem a média (a mediana exigiria todos os dados de uma vez)
+    - categóricas: one-hot com vocabulário fixo, definido na 1ª passagem;
+      faltantes recebem a moda e categorias desconhecidas ficam zeradas
+    """
+
+    def __init__(self):
+        self.numericas = NUMERIC_FEATURES + DERIVED_FEATURES
+        self.categoricas = list(CATEGORICAL_FEATURES)
+        self.n = np.zeros(len(self.numericas))
+        self.media = np.zeros(len(self.numericas))
+        self.m2 = np.zeros(len(self.numericas))  # soma dos quadrados dos desvios
+        self.escala = None
+        self.contagens = {coluna: {} for coluna in self.categoricas}
+        self.vocabulario = None
+        self.modas = None
+
+    def partial_fit(self, df):
+        if self.vocabulario is not None:
+            raise RuntimeError("Vocabulário já definido: o preprocessador não aceita mais dados de ajuste.")
+        # Combinação das estatísticas do bloco com as acumuladas (Chan et al.), ignorando NaN
+        valores = df[self.numericas].to_numpy(np.float64)
+        n_bloco = (~np.isnan(valores)).sum(axis=0)
+        com_dados = n_bloco > 0
+        media_bloco = np.zeros(len(self.numericas))
+        m2_bloco = np.zeros(len(self.numericas))
+        media_bloco[com_dados] = np.nanmean(valores[:, com_dados], axis=0)
+        m2_bloco[com_dados] = np.nansum((valores[:, com_dados] - media_bloco[com_dados]) ** 2, axis=0)
+
+        n_total = self.n + n_bloco
+        delta = media_bloco - self.media
+        peso = np.divide(n_bloco, n_total, out=np.zeros_like(n_total), where=n_total > 0)
+        self.media = self.media + delta * peso
+        self.m2 = self.m2 + m2_bloco + delta ** 2 * self.n * peso
+        self.n = n_total
+        for coluna in self.categoricas:
+            for categoria, quantidade in df[coluna].value_counts().items():
+                self.contagens[coluna][categoria] = self.contagens[coluna].get(categoria, 0) + int(quantidade)
+        return self
+
+    def finalizar(self):
+        """Fixa escala, vocabulário e modas. Deve ser chamado ao fim da 1ª passagem."""
+        desvio = np.sqrt(np.divide(self.m2, self.n, out=np.zeros_like(self.m2), where=self.n > 0))
+        # Colunas constantes não são escaladas (mesmo critério do StandardScaler)
+        self.escala = np.where(desvio > 0, desvio, 1.0)
+        self.vocabulario = {coluna: sorted(contagens) for coluna, contagens in self.contagens.items()}
+        self.modas = {coluna: max(contagens, key=contagens.get) for coluna, contagens in self.contagens.items()}
+        return self
+
+    @property
+    def feature_names(self):
+        return self.numericas + [f"{coluna}_{categoria}"
+                                 for coluna in self.categoricas for categoria in self.vocabulario[coluna]]
+
+    def transform(self, df):
+        """Transforma um bloco em uma matriz CSR (numéricas padronizadas + one-hot)."""
+        numericas = df[self.numericas].to_numpy(np.float64)
+        faltantes = np.isnan(numericas)
+        if faltantes.any():
+            numericas[faltantes] = np.take(self.media, np.nonzero(faltantes)[1])
+        numericas = (numericas - self.media) / self.escala
+
+        n = len(df)
+        linhas, colunas = [], []
+        deslocamento = 0
+        for coluna in self.categoricas:
+            vocabulario = self.vocabulario[coluna]
+            valores = df[coluna].astype(object).fillna(self.modas[coluna])
+            codigos = pd.Categorical(valores, categories=vocabulario).codes
+            conhecidas = codigos >= 0
+            linhas.append(np.nonzero(conhecidas)[0])
+            colunas.append(codigos[conhecidas].astype(np.int64) + deslocamento)
+            deslocamento += len(vocabulario)
+
+        linhas, colunas = np.concatenate(linhas), np.concatenate(colunas)
+        one_hot = sparse.csr_matrix((np.ones(len(linhas)), (linhas, colunas)), shape=(n, deslocamento))
+        return sparse.hstack([sparse.csr_matrix(numericas), one_hot], format='csr')
+
+
+def _blocos(caminho, tamanho_bloco, fracao_validacao, seed):
+    """Percorre o dataset devolvendo (bloco, máscara de validação)."""
+    colunas = NUMERIC_FEATURES + CATEGORICAL_FEATURES + [TARGET]
+    inicio = 0
+    for df in iterar_dados_processados(colunas, tamanho_bloco, caminho):
+        df = df.dropna(subset=[TARGET])
+        df = criar_features_derivadas(df)
+        yield df, mascara_validacao(inicio, len(df), fracao_validacao, seed)
+        inicio += len(df)
+
+
+def treinar_incremental(caminho=PROCESSED_FILE, tamanho_bloco=100_000, epocas=1,
+                        fracao_validacao=0.2, alpha=1e-4, seed=42, verbose=True):
+    """
+    Treina um modelo de regressão logística (SGD) percorrendo o dataset em blocos.
+
+    O desbalanceamento é tratado com pesos por classe calculados na 1ª passagem
+    (em vez do SMOTE, que exigiria uma cópia aumentada de todo o treino).
+
+    Retorna um dicionário com 'modelo', 'preprocessador', 'feature_names' e 'metricas'.
+    """
+    log = print if verbose else (lambda *args, **kwargs: None)
+    inicio_total = time.perf_counter()
+
+    log("1. Ajustando o preprocessamento (1ª passagem)...")
+    preprocessador = PreprocessadorIncremental()
+    contagem_classes = np.zeros(2, dtype=np.int64)
+    for df, validacao in _blocos(caminho, tamanho_bloco, fracao_validacao, seed):
+        treino = df[~validacao]
+        preprocessador.partial_fit(treino)
+        contagem_classes += np.bincount(treino[TARGET].astype(np.int64), minlength=2)[:2]
+    preprocessador.finalizar()
+
+    n_treino = int(contagem_classes.sum())
+    pesos_classes = {classe: n_treino / (2 * contagem_classes[classe]) if contagem_classes[classe] else 1.0
+                     for classe in (0, 1)}
+    log(f"- Linhas de treino: {n_treino} (default: {contagem_classes[1] / max(n_treino, 1):.2%})")
+    log(f"- Features: {len(preprocessador.feature_names)}")
+
+    modelo = SGDClassifier(loss='log_loss', alpha=alpha, class_weight=pesos_classes, random_state=seed)
+    rng = np.random.default_rng(seed)
+
+    for epoca in range(1, epocas + 1):
+        log(f"\n2. Treinando (época {epoca}/{epocas})...")
+        for df, validacao in _blocos(caminho, tamanho_bloco, fracao_validacao, seed):
+            treino = df[~validacao]
+            if treino.empty:
+                continue
+            # Embaralhar dentro do bloco ajuda o SGD quando os dados estão ordenados
+            ordem = rng.permutation(len(treino))
+            X = preprocessador.transform(treino)[ordem]
+            y = treino[TARGET].to_numpy(np.int64)[ordem]
+            modelo.partial_fit(X, y, classes=np.array([0, 1]))
+
+    log("\n3. Avaliando no conjunto de validação...")
+    y_validacao, p_validacao = [], []
+    for df, validacao in _blocos(caminho, tamanho_bloco, fracao_validacao, seed):
+        if not validacao.any():
+            continue
+        df = df[validacao]
+        y_validacao.append(df[TARGET].to_numpy(np.int8))
+        p_validacao.append(modelo.predict_proba(preprocessador.transform(df))[:, 1].astype(np.float32))
+
+    y_validacao = np.concatenate(y_validacao) if y_validacao else np.empty(0, np.int8)
+    p_validacao = np.concatenate(p_validacao) if p_validacao else np.empty(0, np.float32)
+    metricas = {
+        'linhas_treino': n_treino,
+        'linhas_validacao': int(len(y_validacao)),
+        'auc_validacao': (float(roc_auc_score(y_validacao, p_validacao))
+                          if len(np.unique(y_validacao)) == 2 else float('nan')),
+        'epocas': epocas,
+        'tempo_s': time.perf_counter() - inicio_total,
+    }
+    log(f"- AUC-ROC (validação): {metricas['auc_validacao']:.3f}")
+
+    return {
+        'modelo': modelo,
+        'preprocessador': preprocessador,
+        'feature_names': preprocessador.feature_names,
+        'metricas': metricas,
+    }
+
+
+def salvar_modelo_incremental(resultado, caminho=MODEL_FILE):
+    """Salva modelo, preprocessamento e métricas em um único artefato."""
+    os.makedirs(os.path.dirname(caminho), exist_ok=True)
+    caminho_tmp = f'{caminho}.{os.getpid()}.tmp'
+    with open(caminho_tmp, 'wb') as f:
+        pickle.dump(resultado, f)
+    os.replace(caminho_tmp, caminho)
+    return caminho
+
+
+def carregar_modelo_incremental(caminho=MODEL_FILE):
+    with open(caminho, 'rb') as f:
+        return pickle.load(f)
+
+
+def exportar_pontuador_incremental(resultado, caminho=SCORER_FILE):
+    """
+    Exporta os coeficientes com a padronização incorporada: o pontuador recebe
+    as numéricas em unidades originais (já imputadas) e o one-hot das categorias.
+    """
+    preprocessador = resultado['preprocessador']
+    n_one_hot = len(preprocessador.feature_names) - len(preprocessador.numericas)
+    media = np.concatenate([preprocessador.media, np.zeros(n_one_hot)])
+    escala = np.concatenate([preprocessador.escala, np.ones(n_one_hot)])
+    pontuador = exportar_pontuador(resultado['modelo'], preprocessador.feature_names, media, escala)
+    return pontuador.salvar(caminho)
+
+
+def prever_incremental(resultado, df):
+    """Probabilidade de default para um DataFrame com as colunas do dataset processado."""
+    X = resultado['preprocessador'].transform(criar_features_derivadas(df))
+    return resultado['modelo'].predict_proba(X)[:, 1]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Treina o modelo de default lendo o dataset em blocos.")
+    parser.add_argument('--dados', default=PROCESSED_FILE, help="Arquivo Parquet do dataset processado")
+    parser.add_argument('--tamanho-bloco', type=int, default=100_000)
+    parser.add_argument('--epocas', type=int, default=1)
+    parser.add_argument('--fracao-validacao', type=float, default=0.2)
+    parser.add_argument('--saida', default=MODEL_FILE)
+    parser.add_argument('--saida-pontuador', default=SCORER_FILE)
+    args = parser.parse_args()
+
+    resultado = treinar_incremental(args.dados, args.tamanho_bloco, args.epocas, args.fracao_validacao)
+    caminho = salvar_modelo_incremental(resultado, args.saida)
+    print(f"\nModelo salvo em '{caminho}'")
+    print(f"Coeficientes salvos em '{exportar_pontuador_incremental(resultado, args.saida_pontuador)}'")
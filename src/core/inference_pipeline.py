@@ -0,0 +1,180 @@
+"""
+Pipeline de inferência do modelo logístico: dados brutos do pedido -> probabilidade de default.
+
+Reúne em um único objeto serializável tudo o que o treinamento aplica:
+preenchimento de faltantes, razões derivadas (loan_to_income, payment_to_income),
+padronização, one-hot, features avançadas e o modelo.
+
+A transformação é extraída do ColumnTransformer ajustado em prepare_model_data.py
+e aplicada diretamente com numpy, em uma única matriz pré-alocada por lote.
+"""
+import os
+import pickle
+
+import numpy as np
+import pandas as pd
+
+from core.linear_scorer import exportar_pontuador
+
+# Razões derivadas: nome -> função dos dados brutos (limitadas a 100% da renda), como em prepare_model_data.py
+DERIVED_FEATURES = {
+    'loan_to_income': lambda loan_amnt, int_rate, annual_inc: np.minimum(loan_amnt / annual_inc, 1),
+    'payment_to_income': lambda loan_amnt, int_rate, annual_inc: np.minimum(loan_amnt * (int_rate / 100) / annual_inc, 1),
+}
+
+
+class PipelineInferencia:
+    """
+    - preprocessor: ColumnTransformer ajustado ('num': StandardScaler, 'cat': OneHotEncoder)
+    - valores_preenchimento: valor usado para cada feature ausente (medianas e modas do treino)
+    - model: classificador treinado sobre preprocessor + features avançadas
+    - features_avancadas: `AdvancedFeatures` ajustado no treino
+
+    Categorias desconhecidas pelo one-hot ficam com todas as colunas zeradas.
+    """
+
+    def __init__(self, preprocessor, valores_preenchimento, model, features_avancadas):
+        transformadores = {nome: (transformador, colunas) for nome, transformador, colunas in preprocessor.transformers_}
+        scaler, self.numeric_features = transformadores['num']
+        encoder, self.categorical_features = transformadores['cat']
+        self.numeric_features = list(self.numeric_features)
+        self.categorical_features = list(self.categorical_features)
+
+        self.media = np.asarray(scaler.mean_, dtype=np.float64)
+        self.escala = np.asarray(scaler.scale_, dtype=np.float64)
+        self.valores_preenchimento = dict(valores_preenchimento)
+        self.preenchimento_numerico = np.array([self.valores_preenchimento[f] for f in self.numeric_features],
+                                               dtype=np.float64)
+
+        # Coluna de cada categoria mantida pelo one-hot (a categoria descartada por drop='first' não tem coluna)
+        coluna = len(self.numeric_features)
+        nomes_categoricos = []
+        self.categorias = {}
+        for i, campo in enumerate(self.categorical_features):
+            descartada = encoder.drop_idx_[i] if encoder.drop_idx_ is not None else None
+            self.categorias[campo] = {}
+            for j, categoria in enumerate(encoder.categories_[i]):
+                if j == descartada:
+                    continue
+                self.categorias[campo][str(categoria)] = coluna
+                nomes_categoricos.append(f'{campo}_{categoria}')
+                coluna += 1
+
+        if features_avancadas.feature_names != self.numeric_features + nomes_categoricos:
+            raise ValueError("As features avançadas foram ajustadas sobre outras colunas do preprocessor")
+        self.features_avancadas = features_avancadas
+        self.feature_names = features_avancadas.new_feature_names
+
+        self.model = model
+        # Modelos lineares binários são avaliados pelos coeficientes, sem o overhead do scikit-learn
+        self.pontuador = exportar_pontuador(model, self.feature_names) if hasattr(model, 'coef_') else None
+
+    def _brutos(self, df):
+        """Valores numéricos informados (NaN onde ausentes), uma linha por pedido."""
+        valores = np.full((len(df), len(self.numeric_features)), np.nan)
+        for j, feature in enumerate(self.numeric_features):
+            if feature in df.columns:
+                valores[:, j] = pd.to_numeric(df[feature], errors='coerce').to_numpy(dtype=np.float64)
+        return valores
+
+    def _brutos_registro(self, dados):
+        valores = np.full((1, len(self.numeric_features)), np.nan)
+        for j, feature in enumerate(self.numeric_features):
+            valor = dados.get(feature)
+            if valor is not None:
+                valores[0, j] = valor
+        return valores
+
+    def _completar(self, valores):
+        """Calcula as razões derivadas e preenche os faltantes (altera `valores`)."""
+        n = len(valores)
+        indices = {feature: j for j, feature in enumerate(self.numeric_features)}
+        entradas = [valores[:, indices[nome]] if nome in indices else np.full(n, np.nan)
+                    for nome in ('loan_amnt', 'int_rate', 'annual_inc')]
+
+        # Razões derivadas calculadas dos dados brutos; o valor informado só é usado se faltar algum dado
+        with np.errstate(divide='ignore', invalid='ignore'):
+            for feature, funcao in DERIVED_FEATURES.items():
+                if feature in indices:
+                    calculado = funcao(*entradas)
+                    informado = valores[:, indices[feature]]
+                    valores[:, indices[feature]] = np.where(np.isnan(calculado), informado, calculado)
+
+        faltantes = np.isnan(valores)
+        if faltantes.any():
+            valores[faltantes] = np.take(self.preenchimento_numerico, np.nonzero(faltantes)[1])
+        return valores
+
+    def _montar(self, valores, colunas_one_hot):
+        """Escreve numéricas padronizadas, one-hot e features avançadas em uma matriz pré-alocada."""
+        n = len(valores)
+        X = np.zeros((n, len(self.feature_names)))
+        k = len(self.numeric_features)
+
+        # 1. Numéricas padronizadas
+        np.subtract(self._completar(valores), self.media, out=X[:, :k])
+        np.divide(X[:, :k], self.escala, out=X[:, :k])
+
+        # 2. One-hot (índice -1: categoria sem coluna)
+        linhas = np.arange(n)
+        for colunas in colunas_one_hot:
+            conhecidas = colunas >= 0
+            X[linhas[conhecidas], colunas[conhecidas]] = 1
+
+        # 3. Features avançadas sobre as colunas já padronizadas, escritas na mesma matriz
+        return self.features_avancadas.preencher(X)
+
+    def transform(self, df):
+        """
+        Matriz de features (densa, uma linha por pedido) na mesma ordem de `feature_names`.
+        `df` pode ser um DataFrame, uma lista de dicionários ou um único dicionário.
+        """
+        if isinstance(df, dict):
+            return self.transform_registro(df)
+        if not isinstance(df, pd.DataFrame):
+            df = pd.DataFrame(list(df))
+
+        colunas_one_hot = []
+        for campo, mapa in self.categorias.items():
+            if campo in df.columns:
+                valores = df[campo].astype(object).where(df[campo].notna(), self.valores_preenchimento[campo])
+            else:
+                valores = pd.Series(self.valores_preenchimento[campo], index=df.index, dtype=object)
+            colunas_one_hot.append(valores.astype(str).map(mapa).fillna(-1).to_numpy(dtype=np.int64))
+
+        return self._montar(self._brutos(df), colunas_one_hot)
+
+    def transform_registro(self, dados):
+        """Mesmo resultado de `transform` para um único pedido (dicionário), sem montar um DataFrame."""
+        colunas_one_hot = []
+        for campo, mapa in self.categorias.items():
+            valor = dados.get(campo)
+            if valor is None or valor != valor:  # ausente ou NaN
+                valor = self.valores_preenchimento[campo]
+            colunas_one_hot.append(np.array([mapa.get(str(valor), -1)]))
+        return self._montar(self._brutos_registro(dados), colunas_one_hot)
+
+    def predict_proba(self, df):
+        X = self.transform(df)
+        if self.pontuador is not None:
+            return self.pontuador.predict_proba(X)
+        return self.model.predict_proba(X)
+
+    def probabilidade(self, dados):
+        """Probabilidade de default de um único pedido (dicionário com os dados brutos)."""
+        X = self.transform_registro(dados)
+        if self.pontuador is not None:
+            return self.pontuador.probabilidade(X[0])
+        return float(self.model.predict_proba(X)[0, 1])
+
+    def salvar(self, caminho):
+        # Arquivo temporário + rename: quem estiver lendo o pipeline nunca vê um arquivo pela metade
+        caminho_tmp = f'{caminho}.{os.getpid()}.tmp'
+        with open(caminho_tmp, 'wb') as f:
+            pickle.dump(self, f)
+        os.replace(caminho_tmp, caminho)
+
+    @staticmethod
+    def carregar(caminho):
+        with open(caminho, 'rb') as f:
+            return pickle.load(f)
@@ -0,0 +1,115 @@
+"""
+Pontuador linear compilado: exporta uma regressão logística treinada para um
+artefato .npz (coeficientes, intercepto e nomes das features) e a avalia com
+um produto escalar + sigmoide, usando apenas numpy.
+
+A padronização das features (média/escala do StandardScaler) pode ser
+incorporada aos coeficientes na exportação, de forma que o pontuador recebe
+os valores originais:
+
+    w' = w / escala
+    b' = b - Σ w * média / escala
+"""
+import math
+import os
+
+import numpy as np
+
+
+def _sigmoide(z):
+    """Sigmoide numericamente estável para arrays (sem overflow em exp)."""
+    e = np.exp(-np.abs(z))
+    return np.where(z >= 0, 1 / (1 + e), e / (1 + e))
+
+
+class PontuadorLinear:
+    """
+    Regressão logística binária reduzida a coeficientes.
+
+    - probabilidade(x): probabilidade da classe 1 para uma linha (float) ou
+      um lote contíguo (array 1-D)
+    - predict_proba(X) / predict(X): mesma interface do scikit-learn
+    """
+
+    def __init__(self, coef, intercept, feature_names):
+        self.coef = np.ascontiguousarray(coef, dtype=np.float64).ravel()
+        self.intercept = float(intercept)
+        self.feature_names = list(feature_names)
+        if len(self.coef) != len(self.feature_names):
+            raise ValueError(f"{len(self.coef)} coeficientes para {len(self.feature_names)} features")
+        self.indices = {nome: i for i, nome in enumerate(self.feature_names)}
+
+    @classmethod
+    def carregar(cls, caminho):
+        artefato = np.load(caminho, allow_pickle=False)
+        return cls(artefato['coef'], artefato['intercept'][0], artefato['feature_names'].tolist())
+
+    def salvar(self, caminho):
+        os.makedirs(os.path.dirname(os.path.abspath(caminho)), exist_ok=True)
+        # np.savez acrescenta .npz a nomes sem extensão; o temporário já termina em .npz
+        caminho_tmp = f'{caminho}.{os.getpid()}.tmp.npz'
+        np.savez(caminho_tmp, coef=self.coef, intercept=np.array([self.intercept]),
+                 feature_names=np.array(self.feature_names, dtype=str))
+        os.replace(caminho_tmp, caminho)
+        return caminho
+
+    def probabilidade(self, x):
+        """
+        Probabilidade de default de uma linha (array 1-D com len(feature_names)
+        valores) ou de um lote (array 2-D, uma linha por cliente).
+        """
+        x = np.asarray(x, dtype=np.float64)
+        if x.ndim == 1:
+            z = float(self.coef @ x) + self.intercept
+            if z >= 0:
+                return 1 / (1 + math.exp(-z))
+            e = math.exp(z)
+            return e / (1 + e)
+        return _sigmoide(x @ self.coef + self.intercept)
+
+    def predict_proba(self, X):
+        p = self.probabilidade(np.atleast_2d(X))
+        return np.column_stack([1 - p, p])
+
+    def predict(self, X):
+        return (self.probabilidade(np.atleast_2d(X)) > 0.5).astype(int)
+
+
+def exportar_pontuador(model, feature_names, media=None, escala=None):
+    """
+    Converte um `LogisticRegression` (ou `SGDClassifier` com loss='log_loss')
+    binário já treinado em um PontuadorLinear.
+
+    - media, escala: padronização aplicada às features antes do modelo
+      (arrays com uma posição por feature; use 0 e 1 nas colunas não padronizadas).
+      Quando informadas, são incorporadas aos coeficientes.
+    """
+    coef = np.asarray(model.coef_, dtype=np.float64)
+    if coef.shape[0] != 1:
+        raise ValueError("Apenas modelos de classificação binária podem ser exportados")
+    coef = coef[0]
+    intercept = float(np.ravel(model.intercept_)[0])
+
+    if media is not None or escala is not None:
+        media = np.zeros_like(coef) if media is None else np.asarray(media, dtype=np.float64)
+        escala = np.ones_like(coef) if escala is None else np.asarray(escala, dtype=np.float64)
+        coef = coef / escala
+        intercept -= float(coef @ media)
+
+    return PontuadorLinear(coef, intercept, feature_names)
+
+
+def escala_do_scaler(scaler, n_features, colunas=None):
+    """
+    Média e escala por feature a partir de um StandardScaler ajustado.
+
+    - colunas: posições (no vetor de features) das colunas padronizadas pelo
+      scaler; por padrão, as primeiras colunas, como no ColumnTransformer de
+      prepare_model_data.py
+    """
+    media = np.zeros(n_features)
+    escala = np.ones(n_features)
+    colunas = np.arange(len(scaler.mean_)) if colunas is None else np.asarray(colunas)
+    media[colunas] = scaler.mean_
+    escala[colunas] = scaler.scale_
+    return media, escala
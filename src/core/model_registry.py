@@ -0,0 +1,139 @@
+"""
+Registro de modelos para a análise de pedidos de empréstimo.
+
+Cada versão do artefato em disco é carregada uma única vez e mantida em
+memória com os índices das features já calculados. Quando o arquivo muda
+(mtime/tamanho), a nova versão é carregada e substitui a anterior sem
+reiniciar o processo; quem já obteve a versão anterior continua usando-a
+até terminar.
+"""
+import os
+import pickle
+import threading
+import time
+
+from core.inference_pipeline import PipelineInferencia
+from core.linear_scorer import PontuadorLinear
+
+
+class ModeloCarregado:
+    """
+    Uma versão do modelo em memória.
+
+    - indices: nome da feature -> coluna
+    - slots: campo categórico -> {categoria -> coluna} (ex.: slots['grade']['B'] é a coluna de 'grade_B')
+    """
+
+    def __init__(self, model, feature_names, campos_categoricos=(), assinatura=None):
+        self.model = model
+        self.feature_names = list(feature_names)
+        self.indices = {nome: i for i, nome in enumerate(self.feature_names)}
+        self.slots = {
+            campo: {nome[len(campo) + 1:]: i for nome, i in self.indices.items() if nome.startswith(f'{campo}_')}
+            for campo in campos_categoricos
+        }
+        self.assinatura = assinatura
+        self.carregado_em = time.time()
+
+
+def ler_artefato(model_dir):
+    """
+    Lê (model, feature_names) de `model_dir`, na ordem de preferência:
+    - inference_pipeline.pkl: pipeline completo, recebe os dados brutos do pedido
+    - logistic_scorer.npz: coeficientes exportados
+    - logistic_model.pkl + feature_names.pkl
+    """
+    caminho_pipeline = os.path.join(model_dir, 'inference_pipeline.pkl')
+    if os.path.exists(caminho_pipeline):
+        pipeline = PipelineInferencia.carregar(caminho_pipeline)
+        return pipeline, pipeline.feature_names
+
+    caminho_pontuador = os.path.join(model_dir, 'logistic_scorer.npz')
+    if os.path.exists(caminho_pontuador):
+        pontuador = PontuadorLinear.carregar(caminho_pontuador)
+        return pontuador, pontuador.feature_names
+
+    with open(os.path.join(model_dir, 'logistic_model.pkl'), 'rb') as f:
+        model = pickle.load(f)
+    with open(os.path.join(model_dir, 'feature_names.pkl'), 'rb') as f:
+        feature_names = pickle.load(f)
+    return model, feature_names
+
+
+def arquivos_artefato(model_dir):
+    """Arquivos que compõem o artefato atual (na mesma ordem de preferência de `ler_artefato`)."""
+    caminho_pipeline = os.path.join(model_dir, 'inference_pipeline.pkl')
+    if os.path.exists(caminho_pipeline):
+        return [caminho_pipeline]
+    caminho_pontuador = os.path.join(model_dir, 'logistic_scorer.npz')
+    if os.path.exists(caminho_pontuador):
+        return [caminho_pontuador]
+    return [os.path.join(model_dir, 'logistic_model.pkl'), os.path.join(model_dir, 'feature_names.pkl')]
+
+
+class RegistroModelos:
+    """
+    Mantém a versão atual do modelo de `model_dir`.
+
+    `obter()` verifica no máximo uma vez a cada `intervalo_verificacao`
+    segundos se o artefato mudou; entre verificações, não há acesso a disco.
+    Se a nova versão não puder ser lida (ex.: arquivo ainda sendo gravado),
+    a versão anterior continua em uso e a leitura é tentada de novo na
+    próxima verificação.
+    """
+
+    def __init__(self, model_dir, campos_categoricos=(), intervalo_verificacao=1.0):
+        self.model_dir = model_dir
+        self.campos_categoricos = tuple(campos_categoricos)
+        self.intervalo_verificacao = intervalo_verificacao
+        self.versoes_carregadas = 0
+        self._atual = None
+        self._ultima_verificacao = 0.0
+        self._lock = threading.Lock()
+
+    def _assinatura(self):
+        assinatura = []
+        for caminho in arquivos_artefato(self.model_dir):
+            stat = os.stat(caminho)
+            assinatura.append((caminho, stat.st_mtime_ns, stat.st_size))
+        return tuple(assinatura)
+
+    def _carregar(self):
+        assinatura = self._assinatura()
+        model, feature_names = ler_artefato(self.model_dir)
+        if self._assinatura() != assinatura:
+            # O artefato mudou durante a leitura: a próxima verificação lê de novo
+            assinatura = None
+        self.versoes_carregadas += 1
+        return ModeloCarregado(model, feature_names, self.campos_categoricos, assinatura)
+
+    def obter(self):
+        """Retorna o `ModeloCarregado` atual, carregando uma nova versão se o artefato mudou."""
+        atual = self._atual
+        if atual is not None and time.monotonic() - self._ultima_verificacao < self.intervalo_verificacao:
+            return atual
+
+        with self._lock:
+            atual = self._atual
+            if atual is not None and time.monotonic() - self._ultima_verificacao < self.intervalo_verificacao:
+                return atual
+            self._ultima_verificacao = time.monotonic()
+
+            if atual is None:
+                self._atual = self._carregar()
+                return self._atual
+
+            try:
+                if self._assinatura() != atual.assinatura:
+                    # A troca é uma única atribuição: requisições em andamento mantêm a versão anterior
+                    self._atual = self._carregar()
+            except (OSError, EOFError, pickle.UnpicklingError, ValueError, KeyError):
+                pass
+            return self._atual
+
+    def recarregar(self):
+        """Força a leitura do artefato na próxima chamada a `obter()`."""
+        with self._lock:
+            self._ultima_verificacao = 0.0
+            if self._atual is not None:
+                self._atual.assinatura = None
@@ -0,0 +1,259 @@
+"""
+Análise de pontos de corte do modelo de default.
+
+Os scores são ordenados uma única vez; TP/FP/TN/FN de todos os pontos de
+corte distintos saem de somas acumuladas sobre essa ordenação (O(n log n)
+no total). A partir delas são calculadas as curvas ROC, precisão-recall e
+lift, e o ponto de corte de menor custo para uma matriz de custos de
+negócio:
+
+- perda_default: custo de aprovar um cliente que entra em default (FN)
+- margem_perdida: custo de recusar um cliente que pagaria (FP), a margem
+  que deixa de ser ganha
+
+Os custos podem ser escalares (mesmo custo para todos os pedidos) ou um
+valor por pedido (ex.: perda proporcional ao valor emprestado).
+
+Uso (sobre o modelo e as matrizes de teste salvas em models/):
+    python src/core/threshold_analysis.py --perda-default 0.6 --margem-perdida 0.15
+"""
+import argparse
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+
+# Custos padrão, em fração do valor emprestado
+PERDA_DEFAULT = 0.6
+MARGEM_PERDIDA = 0.15
+
+
+class CurvaLimiares:
+    """
+    Contagens acumuladas para todos os pontos de corte distintos.
+
+    O i-ésimo ponto de corte classifica como default (positivo) todos os
+    pedidos com score >= limiares[i]. O primeiro ponto (limiar +inf) não
+    classifica ninguém como default, e o último classifica todos.
+
+    - tp, fp: positivos e negativos classificados como default em cada ponto
+    - perda_evitada, margem_perdida: soma dos custos dos TP e dos FP em cada
+      ponto (somente se os custos forem informados)
+    """
+
+    def __init__(self, y_true, scores, perda_default=None, margem_perdida=None):
+        y_true = np.asarray(y_true).ravel().astype(bool)
+        scores = np.asarray(scores, dtype=np.float64).ravel()
+        if len(y_true) != len(scores):
+            raise ValueError("y_true e scores precisam ter o mesmo tamanho")
+
+        ordem = np.argsort(scores)[::-1]
+        scores_ordenados = scores[ordem]
+        y_ordenado = y_true[ordem]
+
+        # Último índice de cada score distinto (empates entram todos no mesmo ponto de corte)
+        fins = np.r_[np.flatnonzero(np.diff(scores_ordenados)), len(scores_ordenados) - 1]
+
+        self.n = len(y_true)
+        self.positivos = int(y_true.sum())
+        self.negativos = self.n - self.positivos
+        self.limiares = np.r_[np.inf, scores_ordenados[fins]]
+        self.tp = np.r_[0, np.cumsum(y_ordenado)[fins]]
+        self.fp = np.r_[0, fins + 1 - self.tp[1:]]
+
+        self.perda_evitada = self.margem_perdida = None
+        if perda_default is not None or margem_perdida is not None:
+            perda = np.broadcast_to(np.asarray(0.0 if perda_default is None else perda_default,
+                                               dtype=np.float64), scores.shape)[ordem]
+            margem = np.broadcast_to(np.asarray(0.0 if margem_perdida is None else margem_perdida,
+                                                dtype=np.float64), scores.shape)[ordem]
+            self.perda_total = float(perda[y_ordenado].sum())
+            self.perda_evitada = np.r_[0.0, np.cumsum(np.where(y_ordenado, perda, 0.0))[fins]]
+            self.margem_perdida = np.r_[0.0, np.cumsum(np.where(y_ordenado, 0.0, margem))[fins]]
+
+    @property
+    def fn(self):
+        return self.positivos - self.tp
+
+    @property
+    def tn(self):
+        return self.negativos - self.fp
+
+    def custo(self):
+        """Custo total em cada ponto de corte: perdas dos defaults aprovados + margem dos bons recusados."""
+        if self.perda_evitada is None:
+            raise ValueError("Informe perda_default/margem_perdida para calcular o custo")
+        return (self.perda_total - self.perda_evitada) + self.margem_perdida
+
+    def metricas(self, posicoes=None):
+        """DataFrame com contagens e métricas de todos os pontos de corte (ou só das `posicoes` da curva)."""
+        posicoes = slice(None) if posicoes is None else np.asarray(posicoes)
+        tp, fp, fn, tn = self.tp[posicoes], self.fp[posicoes], self.fn[posicoes], self.tn[posicoes]
+        with np.errstate(divide='ignore', invalid='ignore'):
+            precision = np.where(tp + fp > 0, tp / (tp + fp), 0.0)
+            recall = np.where(tp + fn > 0, tp / (tp + fn), 0.0)
+            specificity = np.where(tn + fp > 0, tn / (tn + fp), 0.0)
+            f1 = np.where(precision + recall > 0, 2 * precision * recall / (precision + recall), 0.0)
+
+        metricas = pd.DataFrame({
+            'threshold': self.limiares[posicoes],
+            'tp': tp, 'fp': fp, 'tn': tn, 'fn': fn,
+            'precision': precision,
+            'recall': recall,
+            'specificity': specificity,
+            'f1_score': f1,
+            'taxa_aprovacao': (tn + fn) / self.n,
+        })
+        if self.perda_evitada is not None:
+            metricas['custo'] = self.custo()[posicoes]
+        return metricas
+
+    def indices(self, limiares):
+        """Posição na curva de cada limiar em `limiares` (score >= limiar é default)."""
+        # self.limiares é decrescente: conta quantos limiares distintos são >= cada valor pedido
+        return np.searchsorted(-self.limiares, -np.asarray(limiares, dtype=np.float64), side='right') - 1
+
+    def metricas_em(self, limiares):
+        """Métricas apenas nos `limiares` informados (ex.: 0.1, 0.2, ...), sem recalcular a curva."""
+        metricas = self.metricas(self.indices(limiares))
+        metricas['threshold'] = np.asarray(limiares, dtype=np.float64)
+        return metricas
+
+    def roc(self):
+        """(fpr, tpr, limiares) da curva ROC."""
+        fpr = self.fp / self.negativos if self.negativos else np.zeros(len(self.fp))
+        tpr = self.tp / self.positivos if self.positivos else np.zeros(len(self.tp))
+        return fpr, tpr, self.limiares
+
+    def auc(self):
+        fpr, tpr, _ = self.roc()
+        # Regra do trapézio (empates formam um único segmento diagonal)
+        return float(np.sum(np.diff(fpr) * (tpr[1:] + tpr[:-1])) / 2)
+
+    def precisao_recall(self):
+        """(precisão, recall, limiares) da curva precisão-recall, sem o ponto de corte +inf."""
+        tp, fp = self.tp[1:], self.fp[1:]
+        precisao = tp / (tp + fp)
+        recall = tp / self.positivos if self.positivos else np.zeros(len(tp))
+        return precisao, recall, self.limiares[1:]
+
+    def lift(self, n_faixas=10):
+        """
+        Lift acumulado por faixa da população ordenada pelo score (decis por padrão).
+
+        Cada faixa usa o primeiro ponto de corte que cobre pelo menos aquela
+        fração da população (empates não são divididos).
+        """
+        fracoes = np.arange(1, n_faixas + 1) / n_faixas
+        selecionados = self.tp + self.fp
+        pos = np.minimum(np.searchsorted(selecionados, np.ceil(fracoes * self.n)), len(selecionados) - 1)
+        taxa_base = self.positivos / self.n if self.n else 0.0
+        with np.errstate(divide='ignore', invalid='ignore'):
+            taxa_default = self.tp[pos] / selecionados[pos]
+        return pd.DataFrame({
+            'fracao_populacao': fracoes,
+            'threshold': self.limiares[pos],
+            'fracao_selecionada': selecionados[pos] / self.n,
+            'taxa_default': taxa_default,
+            'captura_defaults': self.tp[pos] / self.positivos if self.positivos else 0.0,
+            'lift': taxa_default / taxa_base if taxa_base else np.nan,
+        })
+
+    def limiar_otimo(self):
+        """Ponto de corte de menor custo (dicionário com o limiar e as métricas nesse ponto)."""
+        return self.metricas([int(np.argmin(self.custo()))]).iloc[0].to_dict()
+
+    def melhor_f1(self):
+        """Ponto de corte de maior F1 (dicionário com o limiar e as métricas nesse ponto)."""
+        with np.errstate(divide='ignore', invalid='ignore'):
+            f1 = np.nan_to_num(2 * self.tp / (2 * self.tp + self.fp + self.fn))
+        return self.metricas([int(np.argmax(f1))]).iloc[0].to_dict()
+
+
+def analisar_limiares(y_true, scores, perda_default=PERDA_DEFAULT, margem_perdida=MARGEM_PERDIDA):
+    """Atalho: `CurvaLimiares` com a matriz de custos padrão."""
+    return CurvaLimiares(y_true, scores, perda_default, margem_perdida)
+
+
+def _reduzir(max_pontos, *arrays):
+    """Até `max_pontos` pontos igualmente espaçados de cada curva (incluindo o primeiro e o último)."""
+    n = len(arrays[0])
+    if n <= max_pontos:
+        return arrays
+    indices = np.unique(np.linspace(0, n - 1, max_pontos).round().astype(np.int64))
+    return tuple(array[indices] for array in arrays)
+
+
+def dados_grafico(curva, max_pontos=2000):
+    """Dados pequenos (curvas reduzidas a `max_pontos`) usados por `desenhar_curvas`."""
+    fpr, tpr, _ = curva.roc()
+    precisao, recall, _ = curva.precisao_recall()
+    fpr, tpr = _reduzir(max_pontos, fpr, tpr)
+    precisao, recall = _reduzir(max_pontos, precisao, recall)
+    return {
+        'fpr': fpr, 'tpr': tpr, 'auc': curva.auc(),
+        'precisao': precisao, 'recall': recall, 'taxa_base': curva.positivos / curva.n,
+        'lift': curva.lift()[['fracao_populacao', 'lift']],
+    }
+
+
+def desenhar_curvas(dados, caminho):
+    """Salva ROC, precisão-recall e lift lado a lado em `caminho`."""
+    import matplotlib.pyplot as plt
+
+    lift = dados['lift']
+    fig, (ax_roc, ax_pr, ax_lift) = plt.subplots(1, 3, figsize=(18, 5))
+    ax_roc.plot(dados['fpr'], dados['tpr'], label=f"AUC = {dados['auc']:.3f}")
+    ax_roc.plot([0, 1], [0, 1], 'k--', linewidth=1)
+    ax_roc.set(title='Curva ROC', xlabel='Taxa de Falsos Positivos', ylabel='Taxa de Verdadeiros Positivos')
+    ax_roc.legend(loc='lower right')
+
+    ax_pr.plot(dados['recall'], dados['precisao'])
+    ax_pr.axhline(dados['taxa_base'], color='k', linestyle='--', linewidth=1)
+    ax_pr.set(title='Precisão x Recall', xlabel='Recall', ylabel='Precisão')
+
+    ax_lift.bar(lift['fracao_populacao'] * 100, lift['lift'], width=100 / len(lift) * 0.8)
+    ax_lift.axhline(1, color='k', linestyle='--', linewidth=1)
+    ax_lift.set(title='Lift Acumulado', xlabel='% da população (maiores scores)', ylabel='Lift')
+
+    fig.tight_layout()
+    fig.savefig(caminho)
+    plt.close(fig)
+
+
+def plotar_curvas(curva, caminho):
+    """Salva ROC, precisão-recall e lift de `curva` em `caminho`."""
+    desenhar_curvas(dados_grafico(curva), caminho)
+
+
+def main(perda_default=PERDA_DEFAULT, margem_perdida=MARGEM_PERDIDA):
+    sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    from core.inference_pipeline import PipelineInferencia
+    from data_processing.model_matrices import carregar_matrizes
+
+    project_dir = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    model_dir = os.path.join(project_dir, 'models')
+    _, X_test, _, y_test = carregar_matrizes(model_dir)
+    pipeline = PipelineInferencia.carregar(os.path.join(model_dir, 'inference_pipeline.pkl'))
+    X_test = pipeline.features_avancadas.transform(X_test)
+    scores = pipeline.model.predict_proba(X_test)[:, 1]
+
+    curva = CurvaLimiares(y_test, scores, perda_default, margem_perdida)
+    otimo = curva.limiar_otimo()
+    print(f"Pontos de corte avaliados: {len(curva.limiares)}  |  AUC-ROC: {curva.auc():.3f}")
+    print(f"Custos: perda no default = {perda_default}, margem perdida = {margem_perdida}")
+    print(f"Ponto de corte de menor custo: {otimo['threshold']:.4f} "
+          f"(custo {otimo['custo']:.1f}, aprovação {otimo['taxa_aprovacao']:.1%}, recall {otimo['recall']:.1%})")
+    print("\nLift acumulado:")
+    print(curva.lift().round(3).to_string(index=False))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Curvas e ponto de corte ótimo do modelo logístico.")
+    parser.add_argument('--perda-default', type=float, default=PERDA_DEFAULT,
+                        help="Custo de aprovar um cliente que entra em default (fração do valor emprestado)")
+    parser.add_argument('--margem-perdida', type=float, default=MARGEM_PERDIDA,
+                        help="Custo de recusar um cliente que pagaria (fração do valor emprestado)")
+    args = parser.parse_args()
+    main(args.perda_default, args.margem_perdida)
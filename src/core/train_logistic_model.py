@@ -1,61 +1,34 @@
-import numpy as np
 import pandas as pd
 from sklearn.linear_model import LogisticRegression
 from sklearn.metrics import classification_report, confusion_matrix, roc_auc_score
-from imblearn.over_sampling import SMOTE
+import argparse
 import pickle
 import os
-import matplotlib.pyplot as plt
-import seaborn as sns
-
-def create_advanced_features(X, feature_names):
-    """Cria features avançadas para melhorar o modelo."""
-    X_new = X.copy()
-    
-    # Encontrar índices das features importantes
-    int_rate_idx = feature_names.index('int_rate')
-    loan_to_income_idx = feature_names.index('loan_to_income')
-    annual_inc_idx = feature_names.index('annual_inc')
-    dti_idx = feature_names.index('dti')
-    
-    # 1. Interação entre taxa de juros e loan_to_income
-    X_new = np.column_stack([
-        X_new,
-        X[:, int_rate_idx] * X[:, loan_to_income_idx]
-    ])
-    
-    # 2. Score de risco baseado em múltiplas variáveis
-    risk_score = (
-        X[:, int_rate_idx] * 0.4 +  # taxa de juros (40% do peso)
-        X[:, loan_to_income_idx] * 0.3 +  # razão empréstimo/renda (30% do peso)
-        X[:, dti_idx] * 0.3  # razão dívida/renda (30% do peso)
-    )
-    X_new = np.column_stack([X_new, risk_score])
-    
-    # 3. Indicador de alto risco (combinação de fatores)
-    high_risk = (
-        (X[:, int_rate_idx] > X[:, int_rate_idx].mean()) &  # taxa de juros acima da média
-        (X[:, loan_to_income_idx] > X[:, loan_to_income_idx].mean()) &  # alto empréstimo/renda
-        (X[:, dti_idx] > X[:, dti_idx].mean())  # alto dívida/renda
-    ).astype(int)
-    X_new = np.column_stack([X_new, high_risk])
-    
-    # Atualizar lista de features
-    new_feature_names = feature_names + [
-        'int_rate_x_loan_to_income',
-        'risk_score',
-        'high_risk_indicator'
-    ]
-    
-    return X_new, new_feature_names
+import sys
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from data_processing.model_matrices import carregar_matrizes
+from core.advanced_features import AdvancedFeatures
+from core.balancing import ESTRATEGIAS, ESTRATEGIA_PADRAO, balancear, resumo_classes
+from core.inference_pipeline import PipelineInferencia
+from core.linear_scorer import exportar_pontuador
+from core.tuning import FEATURES_AVANCADAS, melhores_parametros
+from core.threshold_analysis import CurvaLimiares, MARGEM_PERDIDA, PERDA_DEFAULT, dados_grafico, desenhar_curvas
+from utils.graficos import desenhar_importancia_features, desenhar_matrizes_confusao
+from utils.plot_cache import RenderizadorGraficos
+
+parser = argparse.ArgumentParser(description="Treina o modelo de Regressão Logística.")
+parser.add_argument('--balanceamento', choices=list(ESTRATEGIAS), default=ESTRATEGIA_PADRAO,
+                    help="Estratégia de balanceamento das classes (padrão: pesos por classe, sem linhas novas)")
+parser.add_argument('--sem-graficos', dest='graficos', action='store_false',
+                    help="Não gera os gráficos (treino mais rápido)")
+args = parser.parse_args()
 
 # 1. Carregar os dados preparados
 print("1. Carregando dados preparados...")
-model_dir = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'models')
-X_train = np.load(os.path.join(model_dir, 'X_train_transformed.npy'))
-X_test = np.load(os.path.join(model_dir, 'X_test_transformed.npy'))
-y_train = np.load(os.path.join(model_dir, 'y_train.npy'))
-y_test = np.load(os.path.join(model_dir, 'y_test.npy'))
+project_dir = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+model_dir = os.path.join(project_dir, 'models')
+X_train, X_test, y_train, y_test = carregar_matrizes(model_dir)
 
 # Carregar nomes das features
 with open(os.path.join(model_dir, 'feature_names.pkl'), 'rb') as f:
@@ -63,39 +36,47 @@ with open(os.path.join(model_dir, 'feature_names.pkl'), 'rb') as f:
 
 # 2. Criar features avançadas
 print("\n2. Criando features avançadas...")
-X_train, new_feature_names = create_advanced_features(X_train, feature_names)
-X_test, _ = create_advanced_features(X_test, feature_names)
+# As médias do indicador de alto risco vêm do treino e são reaproveitadas no teste e na inferência
+features_avancadas = AdvancedFeatures(feature_names).fit(X_train)
+X_train = features_avancadas.transform(X_train)
+X_test = features_avancadas.transform(X_test)
+new_feature_names = features_avancadas.new_feature_names
 
 print("\nNovas features criadas:")
 for i, feature in enumerate(new_feature_names):
     if feature not in feature_names:
         print(f"- {feature}")
 
-# 3. Aplicar SMOTE para balancear os dados
-print("\n3. Aplicando SMOTE para balancear os dados...")
+# 3. Balancear as classes
+print(f"\n3. Balanceando os dados (estratégia: {args.balanceamento})...")
 print("\nDistribuição original das classes:")
 print("Classe 0 (Não Default):", sum(y_train == 0))
 print("Classe 1 (Default):", sum(y_train == 1))
 print(f"Proporção original de Default: {sum(y_train == 1) / len(y_train):.2%}")
 
-# Aplicar SMOTE apenas nos dados de treino
-smote = SMOTE(random_state=42)
-X_train_balanced, y_train_balanced = smote.fit_resample(X_train, y_train)
+# Balancear apenas os dados de treino (matrizes esparsas continuam esparsas)
+X_train_balanced, y_train_balanced, sample_weight = balancear(X_train, y_train, args.balanceamento)
 
-print("\nDistribuição após SMOTE:")
-print("Classe 0 (Não Default):", sum(y_train_balanced == 0))
-print("Classe 1 (Default):", sum(y_train_balanced == 1))
-print(f"Nova proporção de Default: {sum(y_train_balanced == 1) / len(y_train_balanced):.2%}")
+distribuicao = resumo_classes(y_train_balanced, sample_weight)
+print("\nDistribuição após o balanceamento" + (" (soma dos pesos):" if sample_weight is not None else ":"))
+print(f"Classe 0 (Não Default): {distribuicao[0]:.0f}")
+print(f"Classe 1 (Default): {distribuicao[1]:.0f}")
+print(f"Nova proporção de Default: {distribuicao[1] / sum(distribuicao.values()):.2%}")
 
 # 4. Treinar o modelo
 print("\n4. Treinando modelo de Regressão Logística...")
 # Ajustando também os hiperparâmetros
+# C vem da última busca de hiperparâmetros (src/core/tuning.py --features avancadas), se ela usou
+# as mesmas features e o mesmo balanceamento deste treino
+parametros = {'C': 0.1,  # C=0.1: regularização contra overfitting
+              **melhores_parametros('Regressão Logística', model_dir, FEATURES_AVANCADAS, args.balanceamento)}
+print(f"Parâmetros: {parametros}")
 model = LogisticRegression(
     random_state=42,
     max_iter=1000,
-    C=0.1  # Aumentar regularização para evitar overfitting
+    **parametros
 )
-model.fit(X_train_balanced, y_train_balanced)
+model.fit(X_train_balanced, y_train_balanced, sample_weight=sample_weight)
 
 # 5. Fazer previsões
 print("\n5. Fazendo previsões...")
@@ -126,25 +107,16 @@ print("\nTop 15 features mais importantes:")
 print(feature_importance.head(15))
 
 # 8. Visualizações
-print("\n8. Criando visualizações...")
+# Desenhadas em processos separados enquanto o treino continua; gráficos com os mesmos dados não são redesenhados
+print("\n8. Criando visualizações..." if args.graficos else "\n8. Visualizações desativadas (--sem-graficos)")
+graficos = RenderizadorGraficos(model_dir, habilitado=args.graficos)
 
 # Matriz de confusão
-plt.figure(figsize=(8, 6))
-sns.heatmap(conf_matrix, annot=True, fmt='d', cmap='Blues')
-plt.title('Matriz de Confusão')
-plt.ylabel('Real')
-plt.xlabel('Previsto')
-plt.savefig(os.path.join(model_dir, 'confusion_matrix.png'))
-plt.close()
+graficos.agendar('confusion_matrix.png', desenhar_matrizes_confusao, {'Matriz de Confusão': conf_matrix})
 
 # Importância das features
-plt.figure(figsize=(12, 6))
-sns.barplot(x='importance', y='feature', data=feature_importance.head(15))
-plt.title('Top 15 Features Mais Importantes')
-plt.xlabel('Importância Absoluta')
-plt.tight_layout()
-plt.savefig(os.path.join(model_dir, 'feature_importance.png'))
-plt.close()
+graficos.agendar('feature_importance.png', desenhar_importancia_features, feature_importance.head(15),
+                 titulo='Top 15 Features Mais Importantes', xlabel='Importância Absoluta')
 
 # 9. Salvar o modelo
 print("\n9. Salvando o modelo...")
@@ -155,39 +127,51 @@ with open(os.path.join(model_dir, 'logistic_model.pkl'), 'wb') as f:
 with open(os.path.join(model_dir, 'new_feature_names.pkl'), 'wb') as f:
     pickle.dump(new_feature_names, f)
 
+# Coeficientes para pontuação rápida (recebe as features já transformadas)
+exportar_pontuador(model, new_feature_names).salvar(os.path.join(model_dir, 'logistic_scorer.npz'))
+
+# Pipeline completo de inferência: dados brutos do pedido -> probabilidade
+with open(os.path.join(model_dir, 'preprocessor.pkl'), 'rb') as f:
+    preprocessor = pickle.load(f)
+with open(os.path.join(model_dir, 'valores_preenchimento.pkl'), 'rb') as f:
+    valores_preenchimento = pickle.load(f)
+pipeline = PipelineInferencia(preprocessor, valores_preenchimento, model, features_avancadas)
+pipeline.salvar(os.path.join(model_dir, 'inference_pipeline.pkl'))
+
 print("\nTreinamento concluído! O modelo está salvo em 'models/logistic_model.pkl'")
+print("Pipeline de inferência salvo em 'models/inference_pipeline.pkl'")
 
 # 10. Análise de diferentes pontos de corte
 print("\n10. Analisando diferentes pontos de corte...")
-thresholds = [0.1, 0.2, 0.3, 0.4, 0.5, 0.6, 0.7, 0.8, 0.9]
-results = []
-
-for threshold in thresholds:
-    y_pred_threshold = (y_pred_proba >= threshold).astype(int)
-    tn, fp, fn, tp = confusion_matrix(y_test, y_pred_threshold).ravel()
-    
-    # Calcular métricas
-    precision = tp / (tp + fp) if (tp + fp) > 0 else 0
-    recall = tp / (tp + fn) if (tp + fn) > 0 else 0
-    specificity = tn / (tn + fp) if (tn + fp) > 0 else 0
-    f1 = 2 * (precision * recall) / (precision + recall) if (precision + recall) > 0 else 0
-    
-    results.append({
-        'threshold': threshold,
-        'precision': precision,
-        'recall': recall,
-        'specificity': specificity,
-        'f1_score': f1
-    })
-
-results_df = pd.DataFrame(results)
+# Todos os pontos de corte distintos a partir de uma única ordenação dos scores
+curva = CurvaLimiares(y_test, y_pred_proba, PERDA_DEFAULT, MARGEM_PERDIDA)
+print(f"Pontos de corte avaliados: {len(curva.limiares)}")
+
+results_df = curva.metricas_em([0.1, 0.2, 0.3, 0.4, 0.5, 0.6, 0.7, 0.8, 0.9])
 print("\nAnálise de diferentes pontos de corte:")
-print(results_df.round(3))
+print(results_df[['threshold', 'precision', 'recall', 'specificity', 'f1_score', 'custo']].round(3))
 
-# Encontrar o melhor threshold baseado no F1-score
-best_threshold = results_df.loc[results_df['f1_score'].idxmax(), 'threshold']
-print(f"\nMelhor threshold baseado no F1-score: {best_threshold:.2f}")
+best_f1 = curva.melhor_f1()
+print(f"\nMelhor threshold baseado no F1-score: {best_f1['threshold']:.3f} (F1 = {best_f1['f1_score']:.3f})")
 
-# Salvar resultados em CSV
-results_df.to_csv(os.path.join(model_dir, 'threshold_analysis.csv'), index=False)
+otimo = curva.limiar_otimo()
+print(f"Threshold de menor custo (perda no default = {PERDA_DEFAULT}, margem perdida = {MARGEM_PERDIDA}): "
+      f"{otimo['threshold']:.3f} (aprovação {otimo['taxa_aprovacao']:.1%}, recall {otimo['recall']:.1%})")
+
+lift_df = curva.lift()
+print("\nLift acumulado por decil:")
+print(lift_df.round(3))
+
+# Salvar resultados
+pd.concat([results_df, pd.DataFrame([best_f1, otimo])], ignore_index=True).assign(
+    criterio=[''] * len(results_df) + ['melhor_f1', 'menor_custo']
+).to_csv(os.path.join(model_dir, 'threshold_analysis.csv'), index=False)
+lift_df.to_csv(os.path.join(model_dir, 'lift_analysis.csv'), index=False)
+graficos.agendar('threshold_curves.png', desenhar_curvas, dados_grafico(curva))
 print("\nAnálise de thresholds salva em 'models/threshold_analysis.csv'")
+print("Lift salvo em 'models/lift_analysis.csv'" +
+      (" e curvas ROC/PR/lift em 'models/threshold_curves.png'" if args.graficos else ""))
+
+resumo = graficos.concluir()
+if args.graficos:
+    print(f"\nGráficos: {resumo['renderizados']} gerado(s), {resumo['em_cache']} sem alteração (reaproveitado(s))")
@@ -0,0 +1,395 @@
+"""
+Busca de hiperparâmetros com validação cruzada estratificada e successive halving.
+
+- Folds: em cada fold a padronização das colunas numéricas é refeita com a
+  média e o desvio só das linhas de treino do fold, e o treino recebe as
+  features avançadas (se `features='avancadas'`, ajustadas só no próprio
+  fold) e o balanceamento uma única vez; o resultado fica em cache em disco
+  (models/tuning_cache/<chave>/) e é aberto pelos workers via memory-map.
+  A chave depende dos dados, do número de folds, da semente, do conjunto de
+  features e da estratégia de balanceamento, então uma nova busca sobre os
+  mesmos dados não refaz nenhum fold.
+  Limitação: o preenchimento dos valores faltantes (medianas/modas) e as
+  categorias do one-hot vêm de prepare_model_data.py e não são refeitos por
+  fold (as matrizes salvas não guardam onde havia valores faltantes).
+- Successive halving: na primeira rodada todos os candidatos treinam com
+  uma fração pequena das linhas de cada fold; só o melhor 1/eta (AUC médio
+  na validação) passa para a rodada seguinte, com eta vezes mais linhas.
+  Na última rodada os sobreviventes usam o fold inteiro.
+- Cada rodada avalia candidatos x folds em paralelo, um processo por
+  tarefa, com as threads de BLAS/OpenMP divididas entre os processos.
+
+Os melhores parâmetros de cada modelo são salvos em models/best_params.json,
+junto com o conjunto de features e a estratégia de balanceamento da busca.
+compare_models.py (features básicas) e train_logistic_model.py (features
+avançadas) só usam parâmetros buscados nas mesmas condições em que treinam
+(cada modelo guarda apenas a sua última busca).
+
+Uso:
+    python src/core/tuning.py
+    python src/core/tuning.py --modelos logistic xgboost --folds 5 --eta 3 --workers 4
+    python src/core/tuning.py --modelos logistic --features avancadas  # para o treino principal
+"""
+import argparse
+import hashlib
+import itertools
+import json
+import math
+import os
+import pickle
+import shutil
+import sys
+import time
+import warnings
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+from scipy import sparse
+from sklearn.metrics import roc_auc_score
+from sklearn.model_selection import StratifiedKFold
+from threadpoolctl import threadpool_limits
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from data_processing.model_matrices import abrir_matriz_compartilhada, carregar_matrizes, compartilhar_matriz
+from core.advanced_features import AdvancedFeatures
+from core.balancing import ESTRATEGIAS, ESTRATEGIA_PADRAO, balancear
+
+MODEL_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))), 'models')
+PARAMS_FILE = 'best_params.json'
+
+# Conjuntos de features: as matrizes de prepare_model_data.py (compare_models.py)
+# ou elas mais as de AdvancedFeatures (train_logistic_model.py)
+FEATURES_BASICAS = 'basicas'
+FEATURES_AVANCADAS = 'avancadas'
+CONJUNTOS_FEATURES = (FEATURES_BASICAS, FEATURES_AVANCADAS)
+
+# Espaço de busca de cada modelo (grade completa) e nome curto usado na linha de comando
+ESPACOS = {
+    'Regressão Logística': {
+        'C': [0.001, 0.003, 0.01, 0.03, 0.1, 0.3, 1.0, 3.0, 10.0],
+    },
+    'Random Forest': {
+        'max_depth': [6, 10, 16, None],
+        'min_samples_leaf': [1, 5, 20],
+    },
+    'XGBoost': {
+        'learning_rate': [0.03, 0.1, 0.3],
+        'max_depth': [3, 5, 7],
+    },
+}
+NOMES_CURTOS = {'logistic': 'Regressão Logística', 'random_forest': 'Random Forest', 'xgboost': 'XGBoost'}
+
+
+def criar_estimador(nome, params=None, n_threads=1):
+    """Cria o estimador `nome` com os parâmetros padrão do projeto, sobrescritos por `params`."""
+    params = params or {}
+    if nome == 'Regressão Logística':
+        from sklearn.linear_model import LogisticRegression
+        return LogisticRegression(**{'random_state': 42, 'max_iter': 1000, **params})
+    if nome == 'Random Forest':
+        from sklearn.ensemble import RandomForestClassifier
+        return RandomForestClassifier(**{'n_estimators': 100, 'random_state': 42, 'n_jobs': n_threads, **params})
+    if nome == 'XGBoost':
+        import xgboost as xgb
+        return xgb.XGBClassifier(**{'objective': 'binary:logistic', 'random_state': 42, 'n_estimators': 100,
+                                    'n_jobs': n_threads, **params})
+    raise ValueError(f"Modelo desconhecido: {nome}")
+
+
+def candidatos(espaco):
+    """Todas as combinações da grade `espaco` (lista de dicionários)."""
+    nomes = list(espaco)
+    return [dict(zip(nomes, valores)) for valores in itertools.product(*(espaco[nome] for nome in nomes))]
+
+
+def melhores_parametros(nome, model_dir=MODEL_DIR, features=FEATURES_BASICAS, balanceamento=ESTRATEGIA_PADRAO):
+    """
+    Parâmetros escolhidos pela última busca para o modelo `nome` ({} se ainda
+    não houve busca). Parâmetros buscados com outro conjunto de features ou
+    outra estratégia de balanceamento são ignorados, com um aviso.
+    """
+    try:
+        with open(os.path.join(model_dir, PARAMS_FILE)) as f:
+            entrada = json.load(f).get(nome)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return {}
+    if not entrada:
+        return {}
+
+    buscado = (entrada.get('features'), entrada.get('balanceamento'))
+    if buscado != (features, balanceamento):
+        warnings.warn(f"{PARAMS_FILE}: parâmetros de '{nome}' buscados com features={buscado[0]} e "
+                      f"balanceamento={buscado[1]}, mas o treino usa features={features} e "
+                      f"balanceamento={balanceamento}; usando os parâmetros padrão", stacklevel=2)
+        return {}
+    return entrada.get('params', {})
+
+
+def salvar_melhores_parametros(melhores, model_dir=MODEL_DIR):
+    """
+    Atualiza models/best_params.json com
+    {nome: {'params': ..., 'auc': ..., 'features': ..., 'balanceamento': ...}}
+    (mantém os demais modelos).
+    """
+    caminho = os.path.join(model_dir, PARAMS_FILE)
+    try:
+        with open(caminho) as f:
+            atual = json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        atual = {}
+    atual.update(melhores)
+    caminho_tmp = f'{caminho}.{os.getpid()}.tmp'
+    with open(caminho_tmp, 'w') as f:
+        json.dump(atual, f, indent=2, ensure_ascii=False)
+    os.replace(caminho_tmp, caminho)
+
+
+def _ordem_estratificada(y, rng):
+    """
+    Permutação das linhas em que qualquer prefixo tem (aproximadamente) a
+    proporção de classes de y: as frações usadas no successive halving são
+    sempre prefixos dessa ordem.
+    """
+    posicao = np.empty(len(y))
+    for classe in np.unique(y):
+        linhas = np.flatnonzero(y == classe)
+        posicao[rng.permutation(linhas)] = (np.arange(len(linhas)) + rng.random()) / len(linhas)
+    return np.argsort(posicao, kind='stable')
+
+
+def chave_folds(X, y, feature_names, n_folds, seed, estrategia, features=FEATURES_BASICAS, escala=None):
+    """Hash dos dados e das opções que determinam o conteúdo dos folds."""
+    h = hashlib.sha1()
+    X = sparse.csr_matrix(X)
+    partes = [X.data, X.indices, X.indptr, np.asarray(y)] + ([] if escala is None else list(escala))
+    for parte in partes:
+        h.update(np.ascontiguousarray(parte).view(np.uint8))
+    h.update(repr((X.shape, list(feature_names), n_folds, seed, estrategia, features, escala is None)).encode())
+    return h.hexdigest()[:16]
+
+
+def escala_preprocessador(preprocessor):
+    """(média, desvio) do StandardScaler das colunas numéricas (as primeiras das matrizes) do preprocessor.pkl."""
+    scaler = preprocessor.named_transformers_['num']
+    return np.asarray(scaler.mean_, dtype=np.float64), np.asarray(scaler.scale_, dtype=np.float64)
+
+
+def _padronizar_no_fold(numericas, resto, treino):
+    """
+    Padroniza as colunas `numericas` (na escala original) com a média e o
+    desvio só das linhas de `treino` e junta de novo às demais colunas (CSR).
+    """
+    media = numericas[treino].mean(axis=0)
+    desvio = numericas[treino].std(axis=0)
+    desvio[desvio == 0] = 1.0  # como no StandardScaler
+    return sparse.hstack([sparse.csr_matrix((numericas - media) / desvio), resto], format='csr')
+
+
+def _no_diretorio(refs, diretorio):
+    """Aponta as referências dos folds para os arquivos em `diretorio` (o cache pode ser movido junto com models/)."""
+    for ref in refs:
+        for parte in ref.values():
+            parte['arquivos'] = {k: os.path.join(diretorio, os.path.basename(v)) for k, v in parte['arquivos'].items()}
+    return refs
+
+
+def preparar_folds(X, y, feature_names, n_folds=5, seed=42, estrategia=ESTRATEGIA_PADRAO, model_dir=MODEL_DIR,
+                   features=FEATURES_BASICAS, escala=None):
+    """
+    Cria (ou reaproveita do cache) os folds estratificados já transformados.
+
+    - features: FEATURES_BASICAS (X como está) ou FEATURES_AVANCADAS
+      (mais as de AdvancedFeatures, ajustadas no treino de cada fold)
+    - escala: (média, desvio) com que as primeiras colunas de X foram
+      padronizadas (`escala_preprocessador`); se informada, a padronização
+      é desfeita e refeita em cada fold só com as linhas de treino do fold
+
+    Retorna uma lista com uma referência leve por fold (caminhos dos arquivos
+    em disco), que os workers abrem com `abrir_fold`.
+    """
+    y = np.asarray(y)
+    X = sparse.csr_matrix(X)
+    chave = chave_folds(X, y, feature_names, n_folds, seed, estrategia, features, escala)
+    diretorio = os.path.join(model_dir, 'tuning_cache', chave)
+    caminho_refs = os.path.join(diretorio, 'folds.pkl')
+    if os.path.exists(caminho_refs):
+        with open(caminho_refs, 'rb') as f:
+            return _no_diretorio(pickle.load(f), diretorio)
+
+    # Gravado em um diretório temporário e renomeado no fim: um cache interrompido nunca é usado
+    diretorio_tmp = f'{diretorio}.{os.getpid()}.tmp'
+    os.makedirs(diretorio_tmp, exist_ok=True)
+    rng = np.random.default_rng(seed)
+    folds = StratifiedKFold(n_splits=n_folds, shuffle=True, random_state=seed)
+    if escala is not None:
+        # Colunas numéricas de volta à escala original (padronizadas de novo em cada fold)
+        media, desvio = escala
+        numericas = X[:, :len(media)].toarray() * desvio + media
+        resto = X[:, len(media):]
+    refs = []
+    for i, (treino, validacao) in enumerate(folds.split(np.zeros(len(y)), y)):
+        X_fold = X if escala is None else _padronizar_no_fold(numericas, resto, treino)
+        X_tr, X_val = X_fold[treino], X_fold[validacao]
+        if features == FEATURES_AVANCADAS:
+            features_avancadas = AdvancedFeatures(feature_names).fit(X_tr)
+            X_tr, X_val = features_avancadas.transform(X_tr), features_avancadas.transform(X_val)
+        X_tr, y_tr, peso = balancear(X_tr, y[treino], estrategia, random_state=seed)
+        partes = {
+            'X_train': X_tr,
+            'y_train': y_tr,
+            'ordem': _ordem_estratificada(y_tr, rng),
+            'X_val': X_val,
+            'y_val': y[validacao],
+        }
+        if peso is not None:
+            partes['sample_weight'] = peso
+        refs.append({nome: compartilhar_matriz(matriz, diretorio_tmp, f'fold{i}_{nome}')
+                     for nome, matriz in partes.items()})
+
+    refs = _no_diretorio(refs, diretorio)
+    with open(os.path.join(diretorio_tmp, 'folds.pkl'), 'wb') as f:
+        pickle.dump(refs, f)
+    try:
+        os.replace(diretorio_tmp, diretorio)
+    except OSError:
+        # Outro processo gravou o mesmo cache primeiro
+        shutil.rmtree(diretorio_tmp, ignore_errors=True)
+    return refs
+
+
+def abrir_fold(ref):
+    return {nome: abrir_matriz_compartilhada(parte) for nome, parte in ref.items()}
+
+
+def avaliar_candidato(nome, params, ref_fold, fracao=1.0, n_threads=1):
+    """
+    Executado em um processo do pool: treina o candidato com a `fracao`
+    inicial das linhas de treino do fold e retorna (AUC na validação, tempo).
+    """
+    fold = abrir_fold(ref_fold)
+    n = max(1, math.ceil(fracao * len(fold['ordem'])))
+    linhas = np.sort(fold['ordem'][:n])
+    peso = fold['sample_weight'][linhas] if 'sample_weight' in fold else None
+
+    with threadpool_limits(limits=n_threads):
+        inicio = time.perf_counter()
+        modelo = criar_estimador(nome, params, n_threads)
+        modelo.fit(fold['X_train'][linhas], np.asarray(fold['y_train'][linhas]), sample_weight=peso)
+        tempo = time.perf_counter() - inicio
+        auc = roc_auc_score(np.asarray(fold['y_val']), modelo.predict_proba(fold['X_val'])[:, 1])
+    return auc, tempo
+
+
+def successive_halving(nome, refs, espaco=None, eta=3, fracao_minima=0.05, executor=None, n_threads=1):
+    """
+    Busca de hiperparâmetros do modelo `nome` por successive halving.
+
+    Retorna um DataFrame com uma linha por (rodada, candidato): fração das
+    linhas usada, AUC médio/desvio nos folds e tempo de treino somado.
+    """
+    restantes = candidatos(espaco or ESPACOS[nome])
+    # Uma rodada a cada divisão por eta, até sobrar um candidato; a primeira rodada usa pelo menos `fracao_minima`
+    n_rodadas, n = 1, len(restantes)
+    while n > 1 and float(eta) ** -n_rodadas >= fracao_minima:
+        n, n_rodadas = max(1, n // eta), n_rodadas + 1
+
+    resultados = []
+    for rodada in range(n_rodadas):
+        fracao = float(eta) ** (rodada - n_rodadas + 1)
+        tarefas = {(i, f): executor.submit(avaliar_candidato, nome, params, ref, fracao, n_threads)
+                   for i, params in enumerate(restantes) for f, ref in enumerate(refs)}
+        por_candidato = []
+        for i, params in enumerate(restantes):
+            aucs, tempos = zip(*(tarefas[i, f].result() for f in range(len(refs))))
+            por_candidato.append({
+                'modelo': nome,
+                'rodada': rodada,
+                'fracao_linhas': fracao,
+                'params': json.dumps(params),
+                'auc_medio': float(np.mean(aucs)),
+                'auc_desvio': float(np.std(aucs)),
+                'tempo_treino (s)': float(np.sum(tempos)),
+            })
+        resultados.extend(por_candidato)
+
+        # Na última rodada todos os sobreviventes já foram avaliados no fold inteiro
+        manter = max(1, len(restantes) // eta) if rodada < n_rodadas - 1 else len(restantes)
+        melhores = np.argsort([-r['auc_medio'] for r in por_candidato], kind='stable')[:manter]
+        restantes = [restantes[i] for i in melhores]
+        print(f"- {nome}, rodada {rodada + 1}/{n_rodadas} ({fracao:.0%} das linhas): "
+              f"{len(por_candidato)} candidato(s), melhor AUC {por_candidato[melhores[0]]['auc_medio']:.4f}")
+
+    return pd.DataFrame(resultados)
+
+
+def buscar_hiperparametros(X_train, y_train, feature_names, modelos=None, n_folds=5, eta=3, seed=42,
+                           estrategia=ESTRATEGIA_PADRAO, max_workers=None, model_dir=MODEL_DIR,
+                           features=FEATURES_BASICAS, escala=None):
+    """
+    Executa a busca para cada modelo de `modelos` (padrão: todos de ESPACOS).
+
+    Retorna (resultados de todas as rodadas,
+    {nome: {'params': ..., 'auc': ..., 'features': ..., 'balanceamento': ...}}).
+    """
+    modelos = list(modelos or ESPACOS)
+    inicio = time.perf_counter()
+    refs = preparar_folds(X_train, y_train, feature_names, n_folds, seed, estrategia, model_dir, features, escala)
+    print(f"Folds prontos em {time.perf_counter() - inicio:.1f}s")
+
+    n_cpus = os.cpu_count() or 1
+    max_workers = max_workers or n_cpus
+    n_threads = max(1, n_cpus // max_workers)
+
+    resultados = []
+    melhores = {}
+    with ProcessPoolExecutor(max_workers=max_workers) as executor:
+        for nome in modelos:
+            busca = successive_halving(nome, refs, eta=eta, executor=executor, n_threads=n_threads)
+            final = busca[busca['rodada'] == busca['rodada'].max()]
+            melhor = final.loc[final['auc_medio'].idxmax()]
+            melhores[nome] = {'params': json.loads(melhor['params']), 'auc': float(melhor['auc_medio']),
+                              'features': features, 'balanceamento': estrategia}
+            resultados.append(busca)
+
+    return pd.concat(resultados, ignore_index=True), melhores
+
+
+def main(modelos=None, n_folds=5, eta=3, estrategia=ESTRATEGIA_PADRAO, max_workers=None, features=FEATURES_BASICAS):
+    X_train, _, y_train, _ = carregar_matrizes(MODEL_DIR)
+    with open(os.path.join(MODEL_DIR, 'feature_names.pkl'), 'rb') as f:
+        feature_names = pickle.load(f)
+    with open(os.path.join(MODEL_DIR, 'preprocessor.pkl'), 'rb') as f:
+        escala = escala_preprocessador(pickle.load(f))
+
+    inicio = time.perf_counter()
+    resultados, melhores = buscar_hiperparametros(X_train, y_train, feature_names, modelos, n_folds, eta,
+                                                  estrategia=estrategia, max_workers=max_workers,
+                                                  features=features, escala=escala)
+    print(f"\nBusca concluída em {time.perf_counter() - inicio:.1f}s")
+
+    print("\nMelhores parâmetros (AUC médio na validação cruzada):")
+    for nome, melhor in melhores.items():
+        print(f"- {nome}: {melhor['params']} (AUC {melhor['auc']:.4f})")
+
+    resultados.to_csv(os.path.join(MODEL_DIR, 'tuning_results.csv'), index=False)
+    salvar_melhores_parametros(melhores)
+    print(f"\nResultados salvos em 'models/tuning_results.csv' e 'models/{PARAMS_FILE}'")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Busca de hiperparâmetros com validação cruzada e successive halving.")
+    parser.add_argument('--modelos', nargs='+', choices=list(NOMES_CURTOS), default=None,
+                        help="Modelos incluídos na busca (padrão: todos)")
+    parser.add_argument('--folds', type=int, default=5)
+    parser.add_argument('--eta', type=int, default=3,
+                        help="Fator do successive halving: mantém 1/eta dos candidatos e multiplica as linhas por eta")
+    parser.add_argument('--balanceamento', choices=list(ESTRATEGIAS), default=ESTRATEGIA_PADRAO)
+    parser.add_argument('--features', choices=CONJUNTOS_FEATURES, default=FEATURES_BASICAS,
+                        help="Features dos folds: as de compare_models.py (basicas) ou as do treino principal "
+                             "(avancadas, com AdvancedFeatures)")
+    parser.add_argument('--workers', type=int, default=None,
+                        help="Número de treinos simultâneos (padrão: um por núcleo)")
+    args = parser.parse_args()
+    modelos = [NOMES_CURTOS[nome] for nome in args.modelos] if args.modelos else None
+    main(modelos, args.folds, args.eta, args.balanceamento, args.workers, args.features)
@@ -0,0 +1,82 @@
+"""
+Persistência das matrizes de treino/teste em formato esparso (CSR)
+"""
+import os
+
+import numpy as np
+from scipy import sparse
+
+
+def salvar_matrizes(model_dir, X_train, X_test, y_train, y_test):
+    """
+    Salva as matrizes transformadas como CSR (.npz) e os targets como .npy.
+    Matrizes densas também são aceitas e convertidas para CSR.
+    """
+    sparse.save_npz(os.path.join(model_dir, 'X_train_transformed.npz'), sparse.csr_matrix(X_train))
+    sparse.save_npz(os.path.join(model_dir, 'X_test_transformed.npz'), sparse.csr_matrix(X_test))
+    np.save(os.path.join(model_dir, 'y_train.npy'), np.asarray(y_train))
+    np.save(os.path.join(model_dir, 'y_test.npy'), np.asarray(y_test))
+
+
+def _carregar_matriz(model_dir, nome):
+    caminho_npz = os.path.join(model_dir, f'{nome}.npz')
+    if os.path.exists(caminho_npz):
+        return sparse.load_npz(caminho_npz).tocsr()
+
+    # Formato antigo: np.save de uma matriz densa ou de um objeto esparso serializado
+    matriz = np.load(os.path.join(model_dir, f'{nome}.npy'), allow_pickle=True)
+    if matriz.dtype == object and matriz.ndim == 0:
+        matriz = matriz.item()
+    return sparse.csr_matrix(matriz)
+
+
+def carregar_matrizes(model_dir):
+    """
+    Carrega (X_train, X_test, y_train, y_test) salvos por `salvar_matrizes`.
+    As matrizes X sempre chegam como CSR.
+    """
+    X_train = _carregar_matriz(model_dir, 'X_train_transformed')
+    X_test = _carregar_matriz(model_dir, 'X_test_transformed')
+    y_train = np.load(os.path.join(model_dir, 'y_train.npy'))
+    y_test = np.load(os.path.join(model_dir, 'y_test.npy'))
+    return X_train, X_test, y_train, y_test
+
+
+def coluna_densa(X, idx):
+    """Retorna a coluna `idx` de uma matriz densa ou esparsa como array 1-D."""
+    if sparse.issparse(X):
+        return X[:, idx].toarray().ravel()
+    return X[:, idx]
+
+
+def compartilhar_matriz(X, diretorio, nome):
+    """
+    Grava X em `diretorio` em um formato que outros processos podem abrir com
+    memory-map (somente leitura), sem cópia nem serialização da matriz.
+
+    Retorna uma referência leve (dicionário) para `abrir_matriz_compartilhada`.
+    """
+    if sparse.issparse(X):
+        X = sparse.csr_matrix(X)
+        referencia = {'formato': 'csr', 'shape': X.shape, 'arquivos': {}}
+        for parte in ('data', 'indices', 'indptr'):
+            caminho = os.path.join(diretorio, f'{nome}_{parte}.npy')
+            np.save(caminho, getattr(X, parte))
+            referencia['arquivos'][parte] = caminho
+        return referencia
+
+    caminho = os.path.join(diretorio, f'{nome}.npy')
+    np.save(caminho, np.asarray(X))
+    return {'formato': 'denso', 'arquivos': {'data': caminho}}
+
+
+def abrir_matriz_compartilhada(referencia):
+    """Abre (somente leitura, via memory-map) uma matriz gravada por `compartilhar_matriz`."""
+    arquivos = {parte: np.load(caminho, mmap_mode='r') for parte, caminho in referencia['arquivos'].items()}
+    if referencia['formato'] == 'csr':
+        return sparse.csr_matrix(
+            (arquivos['data'], arquivos['indices'], arquivos['indptr']),
+            shape=referencia['shape'],
+            copy=False
+        )
+    return arquivos['data']
@@ -0,0 +1,122 @@
+"""
+Leitura e escrita do dataset processado do Lending Club em formato colunar (Parquet)
+"""
+import os
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+PROJECT_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+PROCESSED_DIR = os.path.join(PROJECT_DIR, 'data', 'processed')
+PROCESSED_FILE = os.path.join(PROCESSED_DIR, 'lending_club_processed.parquet')
+
+# Arquivo CSV gerado por versões anteriores (usado apenas se o Parquet não existir)
+LEGACY_CSV_FILE = os.path.join(PROCESSED_DIR, 'lending_club_processed.csv')
+
+# Colunas de texto repetitivo armazenadas como categorias
+CATEGORICAL_COLUMNS = ['grade', 'purpose', 'home_ownership', 'term', 'addr_state']
+
+# Colunas numéricas do dataset processado (incluindo o target)
+NUMERIC_COLUMNS = [
+    'loan_amnt', 'int_rate', 'emp_length', 'annual_inc', 'dti', 'delinq_2yrs',
+    'inq_last_6mths', 'open_acc', 'pub_rec', 'revol_bal', 'revol_util', 'total_acc',
+    'default'
+]
+
+
+def _schema(df):
+    """
+    Schema Arrow fixo para o dataset: categorias com índice int32 e texto como
+    string, para que todos os blocos gravados tenham exatamente os mesmos tipos.
+    """
+    fields = []
+    for name, dtype in df.dtypes.items():
+        if isinstance(dtype, pd.CategoricalDtype) or name in CATEGORICAL_COLUMNS:
+            fields.append(pa.field(name, pa.dictionary(pa.int32(), pa.string())))
+        elif pd.api.types.is_object_dtype(dtype) or pd.api.types.is_string_dtype(dtype):
+            fields.append(pa.field(name, pa.string()))
+        else:
+            fields.append(pa.field(name, pa.from_numpy_dtype(dtype)))
+    return pa.schema(fields)
+
+
+def _to_table(df, schema):
+    return pa.Table.from_pandas(df, schema=schema, preserve_index=False)
+
+
+def salvar_dados_processados(df, caminho=PROCESSED_FILE):
+    """Salva o dataset processado completo em Parquet."""
+    os.makedirs(os.path.dirname(caminho), exist_ok=True)
+    pq.write_table(_to_table(df, _schema(df)), caminho)
+    return caminho
+
+
+class EscritorDadosProcessados:
+    """
+    Grava o dataset processado bloco a bloco (um row group por bloco), mantendo
+    em memória apenas o bloco atual.
+
+    Uso:
+        with EscritorDadosProcessados(caminho) as escritor:
+            for chunk in blocos:
+                escritor.escrever(chunk)
+    """
+
+    def __init__(self, caminho=PROCESSED_FILE):
+        self.caminho = caminho
+        self._writer = None
+        self._schema = None
+
+    def escrever(self, df):
+        if self._writer is None:
+            os.makedirs(os.path.dirname(self.caminho), exist_ok=True)
+            self._schema = _schema(df)
+            self._writer = pq.ParquetWriter(self.caminho, self._schema)
+        self._writer.write_table(_to_table(df, self._schema))
+
+    def fechar(self):
+        if self._writer is not None:
+            self._writer.close()
+            self._writer = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.fechar()
+
+
+def carregar_dados_processados(colunas=None, caminho=PROCESSED_FILE):
+    """
+    Carrega o dataset processado lendo apenas as colunas pedidas.
+
+    - colunas: lista de colunas (None carrega todas)
+
+    As colunas de CATEGORICAL_COLUMNS chegam como `category`. Se o arquivo Parquet
+    ainda não existir, o CSV gerado por versões anteriores é usado.
+    """
+    if caminho == PROCESSED_FILE and not os.path.exists(caminho) and os.path.exists(LEGACY_CSV_FILE):
+        categoricas = [c for c in CATEGORICAL_COLUMNS if colunas is None or c in colunas]
+        return pd.read_csv(LEGACY_CSV_FILE, usecols=colunas, dtype={c: 'category' for c in categoricas})
+
+    return pd.read_parquet(caminho, columns=colunas)
+
+
+def iterar_dados_processados(colunas=None, tamanho_bloco=100_000, caminho=PROCESSED_FILE):
+    """
+    Percorre o dataset processado em blocos de até `tamanho_bloco` linhas,
+    lendo apenas as colunas pedidas. A memória usada depende só do tamanho do bloco.
+
+    Assim como `carregar_dados_processados`, usa o CSV de versões anteriores
+    se o Parquet ainda não existir.
+    """
+    if caminho == PROCESSED_FILE and not os.path.exists(caminho) and os.path.exists(LEGACY_CSV_FILE):
+        categoricas = [c for c in CATEGORICAL_COLUMNS if colunas is None or c in colunas]
+        yield from pd.read_csv(LEGACY_CSV_FILE, usecols=colunas, dtype={c: 'category' for c in categoricas},
+                               chunksize=tamanho_bloco)
+        return
+
+    arquivo = pq.ParquetFile(caminho)
+    for batch in arquivo.iter_batches(batch_size=tamanho_bloco, columns=colunas):
+        yield batch.to_pandas()
@@ -1,4 +1,5 @@
-from enhanced_model import treinar_modelo_avancado, analisar_novo_caso
+from enhanced_model import analisar_novo_caso
+from model_lifecycle import obter_pontuador
 
 def formatar_moeda(valor):
     """Formata valor em reais"""
@@ -48,9 +49,9 @@ def analisar_cliente():
         'tem_outros_emprestimos': 1 if outros_emprestimos else 0
     }
     
-    # Treinar modelo e fazer análise
+    # Carregar modelo (treinado apenas na primeira execução) e fazer análise
     print("\nAnalisando dados...")
-    model, feature_names = treinar_modelo_avancado()
+    model, feature_names = obter_pontuador()
     resultado = analisar_novo_caso(model, feature_names, dados_cliente)
     
     # Mostrar resultado
@@ -1,119 +1,259 @@
 import pandas as pd
 import numpy as np
-import requests
 import zipfile
+import json
 import os
+from contextlib import contextmanager
 from tqdm import tqdm
+from utils.download import baixar_arquivo, ler_metadados
+from data_processing.processed_data import salvar_dados_processados, EscritorDadosProcessados
 
 class LendingClubScraper:
     """
     Classe para baixar e preparar dados do Lending Club para análise de crédito.
     """
-    def __init__(self):
+    # Features relevantes e tipos usados na leitura do arquivo bruto
+    FEATURES = [
+        'loan_amnt',           # Valor do empréstimo
+        'term',                # Prazo
+        'int_rate',           # Taxa de juros
+        'grade',              # Grade de crédito atribuído
+        'emp_length',         # Tempo de emprego
+        'home_ownership',     # Tipo de residência
+        'annual_inc',         # Renda anual
+        'purpose',            # Finalidade do empréstimo
+        'addr_state',         # Estado
+        'dti',               # Debt-to-Income ratio
+        'delinq_2yrs',       # Número de delinquências nos últimos 2 anos
+        'earliest_cr_line',   # Data da primeira linha de crédito
+        'inq_last_6mths',    # Consultas nos últimos 6 meses
+        'open_acc',          # Número de contas abertas
+        'pub_rec',           # Registros públicos
+        'revol_bal',         # Saldo rotativo
+        'revol_util',        # Utilização do crédito rotativo
+        'total_acc',         # Total de contas
+        'loan_status'        # Status do empréstimo (target)
+    ]
+
+    # Tipos compactos: categorias para texto repetitivo, float32 para contagens e taxas.
+    # int_rate, revol_util e emp_length são lidos como texto e convertidos na limpeza.
+    DTYPES = {
+        'loan_amnt': 'float64',
+        'term': 'category',
+        'int_rate': 'object',
+        'grade': 'category',
+        'emp_length': 'object',
+        'home_ownership': 'category',
+        'annual_inc': 'float64',
+        'purpose': 'category',
+        'addr_state': 'category',
+        'dti': 'float32',
+        'delinq_2yrs': 'float32',
+        'earliest_cr_line': 'object',
+        'inq_last_6mths': 'float32',
+        'open_acc': 'float32',
+        'pub_rec': 'float32',
+        'revol_bal': 'float64',
+        'revol_util': 'object',
+        'total_acc': 'float32',
+        'loan_status': 'category'
+    }
+
+    # Status considerados default
+    DEFAULT_STATUS = ['Charged Off', 'Default', 'Late (31-120 days)', 'Late (16-30 days)']
+
+    # Dataset de 2018 Q4, publicamente disponível
+    DEFAULT_URL = "https://resources.lendingclub.com/LoanStats_2018Q4.csv.zip"
+
+    def __init__(self, url=DEFAULT_URL):
         # Definir caminhos relativos ao diretório do projeto
         self.project_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
         self.data_dir = os.path.join(self.project_dir, 'data', 'raw')
         self.processed_dir = os.path.join(self.project_dir, 'data', 'processed')
         
+        self.url = url
+        self.zip_file = 'loan_stats.zip'
         self.raw_file = 'LoanStats_2018Q4.csv'
-        self.processed_file = 'lending_club_processed.csv'
+        self.processed_file = 'lending_club_processed.parquet'
         
         # Criar diretórios se não existirem
         os.makedirs(self.data_dir, exist_ok=True)
         os.makedirs(self.processed_dir, exist_ok=True)
 
-    def download_data(self):
+    def download_data(self, verificar_remoto=True, extrair=False):
         """
-        Baixa os dados do Lending Club.
-        Usaremos o dataset de 2018 Q4 que está publicamente disponível.
+        Baixa os dados do Lending Club, se necessário.
+        
+        O zip é mantido em disco para servir de cache: quando o arquivo remoto não
+        mudou (mesmo ETag/Last-Modified) nada é transferido, e com
+        `verificar_remoto=False` nem a rede é consultada. Downloads interrompidos
+        são retomados de onde pararam.
+        
+        Por padrão o CSV é lido diretamente de dentro do zip; use `extrair=True`
+        para manter também uma cópia extraída em disco.
         """
-        url = "https://resources.lendingclub.com/LoanStats_2018Q4.csv.zip"
-        zip_path = os.path.join(self.data_dir, 'loan_stats.zip')
-        
-        print("Baixando dados do Lending Club...")
-        response = requests.get(url, stream=True)
-        total_size = int(response.headers.get('content-length', 0))
-        
-        with open(zip_path, 'wb') as file, tqdm(
-            desc="Download Progress",
-            total=total_size,
-            unit='iB',
-            unit_scale=True
-        ) as pbar:
-            for data in response.iter_content(chunk_size=1024):
-                size = file.write(data)
-                pbar.update(size)
-        
-        print("Extraindo arquivo...")
-        with zipfile.ZipFile(zip_path, 'r') as zip_ref:
-            zip_ref.extractall(self.data_dir)
-        
-        # Remover arquivo zip após extração
-        os.remove(zip_path)
+        zip_path = os.path.join(self.data_dir, self.zip_file)
+        
+        print("Verificando dados do Lending Club...")
+        baixado = baixar_arquivo(self.url, zip_path, verificar_remoto=verificar_remoto)
+        print("Download concluído." if baixado else "Dados locais já estão atualizados.")
+        
+        raw_path = os.path.join(self.data_dir, self.raw_file)
+        if extrair and (baixado or not os.path.exists(raw_path)):
+            print("Extraindo arquivo...")
+            with zipfile.ZipFile(zip_path, 'r') as zip_ref:
+                zip_ref.extract(self._zip_member(zip_ref), self.data_dir)
+        
+        return baixado
 
-    def process_data(self):
+    def _zip_member(self, zip_ref):
+        """Nome do CSV bruto dentro do zip."""
+        for name in zip_ref.namelist():
+            if os.path.basename(name) == self.raw_file:
+                return name
+        raise FileNotFoundError(f"{self.raw_file} não encontrado em {zip_ref.filename}")
+
+    @contextmanager
+    def _open_raw(self):
         """
-        Processa os dados brutos do Lending Club para análise.
-        Seleciona features relevantes e prepara target variable.
+        Abre o CSV bruto: o arquivo extraído, se existir, ou o conteúdo do zip
+        descompactado em streaming (sem cópia em disco).
         """
-        print("Processando dados...")
+        raw_path = os.path.join(self.data_dir, self.raw_file)
+        if os.path.exists(raw_path):
+            yield raw_path
+            return
         
-        # Carregar dados (pulando linhas de cabeçalho desnecessárias)
-        df = pd.read_csv(os.path.join(self.data_dir, self.raw_file), skiprows=1)
-        
-        # Selecionar features relevantes
-        features = [
-            'loan_amnt',           # Valor do empréstimo
-            'term',                # Prazo
-            'int_rate',           # Taxa de juros
-            'grade',              # Grade de crédito atribuído
-            'emp_length',         # Tempo de emprego
-            'home_ownership',     # Tipo de residência
-            'annual_inc',         # Renda anual
-            'purpose',            # Finalidade do empréstimo
-            'addr_state',         # Estado
-            'dti',               # Debt-to-Income ratio
-            'delinq_2yrs',       # Número de delinquências nos últimos 2 anos
-            'earliest_cr_line',   # Data da primeira linha de crédito
-            'inq_last_6mths',    # Consultas nos últimos 6 meses
-            'open_acc',          # Número de contas abertas
-            'pub_rec',           # Registros públicos
-            'revol_bal',         # Saldo rotativo
-            'revol_util',        # Utilização do crédito rotativo
-            'total_acc',         # Total de contas
-            'loan_status'        # Status do empréstimo (target)
-        ]
-        
-        df_processed = df[features].copy()
+        with zipfile.ZipFile(os.path.join(self.data_dir, self.zip_file), 'r') as zip_ref:
+            with zip_ref.open(self._zip_member(zip_ref)) as raw:
+                yield raw
+
+    def _source_checksum(self):
+        """Checksum do zip baixado (None se os dados não vieram do download)."""
+        if os.path.exists(os.path.join(self.data_dir, self.raw_file)):
+            return None
+        return ler_metadados(os.path.join(self.data_dir, self.zip_file)).get('sha256')
+
+    def _processed_meta_path(self):
+        return os.path.join(self.processed_dir, f'{self.processed_file}.meta.json')
+
+    def _cached_summary(self):
+        """Resumo do último processamento, se ele corresponde aos dados brutos atuais."""
+        checksum = self._source_checksum()
+        output_path = os.path.join(self.processed_dir, self.processed_file)
+        if checksum is None or not os.path.exists(output_path):
+            return None
+        try:
+            with open(self._processed_meta_path(), 'r', encoding='utf-8') as f:
+                resumo = json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return None
+        return resumo if resumo.get('origem_sha256') == checksum else None
+
+    def _save_summary(self, resumo):
+        with open(self._processed_meta_path(), 'w', encoding='utf-8') as f:
+            json.dump({**resumo, 'origem_sha256': self._source_checksum()}, f, indent=2)
+
+    def _read_raw(self, source, chunksize=None):
+        """Lê o arquivo bruto apenas com as colunas necessárias e tipos explícitos."""
+        return pd.read_csv(
+            source,
+            skiprows=1,  # Pulando linha de cabeçalho desnecessária
+            usecols=self.FEATURES,
+            dtype=self.DTYPES,
+            chunksize=chunksize
+        )
+
+    def _clean_chunk(self, df):
+        """Cria a variável target e limpa os tipos de dados de um bloco."""
+        df = df[self.FEATURES]
         
         # Criar target variable (1 = default, 0 = não default)
-        df_processed['default'] = df_processed['loan_status'].map(
-            lambda x: 1 if x in ['Charged Off', 'Default', 'Late (31-120 days)', 
-                               'Late (16-30 days)'] else 0
-        )
+        df = df.assign(default=df['loan_status'].isin(self.DEFAULT_STATUS).astype('int8'))
         
         # Remover a coluna loan_status original
-        df_processed.drop('loan_status', axis=1, inplace=True)
+        df = df.drop(columns='loan_status')
         
         # Limpar e converter tipos de dados
-        df_processed['int_rate'] = df_processed['int_rate'].str.rstrip('%').astype(float)
-        df_processed['revol_util'] = df_processed['revol_util'].str.rstrip('%').astype(float)
-        df_processed['emp_length'] = df_processed['emp_length'].str.extract('(\d+)').fillna(0).astype(int)
+        df['int_rate'] = df['int_rate'].str.rstrip('%').astype('float32')
+        df['revol_util'] = df['revol_util'].str.rstrip('%').astype('float32')
+        df['emp_length'] = df['emp_length'].str.extract(r'(\d+)', expand=False).fillna(0).astype('int8')
+        return df
+
+    def process_data(self):
+        """
+        Processa os dados brutos do Lending Club para análise.
+        Seleciona features relevantes e prepara target variable.
+        """
+        print("Processando dados...")
+        
+        with self._open_raw() as source:
+            df_processed = self._clean_chunk(self._read_raw(source))
         
         # Salvar dados processados
         output_path = os.path.join(self.processed_dir, self.processed_file)
-        df_processed.to_csv(output_path, index=False)
+        salvar_dados_processados(df_processed, output_path)
+        self._save_summary({
+            'caminho': output_path,
+            'linhas': len(df_processed),
+            'defaults': int(df_processed['default'].sum())
+        })
         
         print(f"\nDados processados e salvos em: {output_path}")
         print(f"Dimensões do dataset: {df_processed.shape}")
         return df_processed
 
-    def get_data(self):
+    def process_data_streaming(self, chunksize=100_000):
+        """
+        Processa os dados brutos em blocos, gravando cada bloco assim que fica pronto.
+        O uso de memória depende apenas de `chunksize`, não do tamanho do arquivo.
+        
+        Retorna um resumo com o número de linhas e de defaults processados. Se os
+        dados brutos não mudaram desde o último processamento, o resumo salvo é
+        retornado sem reprocessar nada.
+        """
+        resumo = self._cached_summary()
+        if resumo is not None:
+            print(f"Dados processados já estão atualizados: {resumo['caminho']}")
+            return resumo
+        
+        print(f"Processando dados em blocos de {chunksize:,} linhas...")
+        
+        output_path = os.path.join(self.processed_dir, self.processed_file)
+        total_linhas = 0
+        total_defaults = 0
+        
+        with self._open_raw() as source, EscritorDadosProcessados(output_path) as writer:
+            for chunk in tqdm(self._read_raw(source, chunksize), desc="Blocos processados", unit=' blocos'):
+                chunk = self._clean_chunk(chunk)
+                writer.escrever(chunk)
+                total_linhas += len(chunk)
+                total_defaults += int(chunk['default'].sum())
+        
+        print(f"\nDados processados e salvos em: {output_path}")
+        print(f"Linhas processadas: {total_linhas:,}")
+        resumo = {
+            'caminho': output_path,
+            'linhas': total_linhas,
+            'defaults': total_defaults
+        }
+        self._save_summary(resumo)
+        return resumo
+
+    def get_data(self, chunksize=None, verificar_remoto=True):
         """
         Função principal para obter os dados processados.
+        Com `chunksize`, os dados são processados em blocos e apenas um resumo é exibido.
         """
         try:
-            self.download_data()
+            self.download_data(verificar_remoto=verificar_remoto)
+            
+            if chunksize:
+                resumo = self.process_data_streaming(chunksize)
+                default_rate = resumo['defaults'] / resumo['linhas'] * 100 if resumo['linhas'] else 0
+                print(f"\nTaxa de default no dataset: {default_rate:.2f}%")
+                return resumo
+            
             df = self.process_data()
             
             print("\nInformações do dataset:")
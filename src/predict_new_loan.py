@@ -1,23 +1,76 @@
-import pickle
 import numpy as np
 import pandas as pd
 import os
+from core.inference_pipeline import PipelineInferencia
+from core.linear_scorer import PontuadorLinear
+from core.model_registry import ModeloCarregado, RegistroModelos
+
+MODEL_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'models')
+
+# Campos numéricos aceitos no pedido de empréstimo
+NUMERIC_FIELDS = ['loan_amnt', 'int_rate', 'annual_inc', 'dti', 'loan_to_income']
+
+# Campos categóricos codificados em one-hot (colunas '<campo>_<categoria>')
+CATEGORICAL_FIELDS = ['grade', 'purpose']
+
+# Modelo em uso pelo processo: carregado uma vez e recarregado quando o artefato muda
+registro = RegistroModelos(MODEL_DIR, campos_categoricos=CATEGORICAL_FIELDS)
 
 def carregar_modelo():
-    """Carrega o modelo treinado e os nomes das features."""
-    model_dir = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'models')
+    """
+    Retorna o modelo treinado e os nomes das features (do registro: o disco só
+    é lido na primeira chamada ou quando o artefato muda).
     
-    # Carregar o modelo
-    with open(os.path.join(model_dir, 'logistic_model.pkl'), 'rb') as f:
-        model = pickle.load(f)
+    Se o pipeline de inferência salvo pelo treinamento (inference_pipeline.pkl)
+    existir, o modelo é um PipelineInferencia, que recebe os dados brutos do pedido
+    e aplica exatamente a transformação do treino.
+    """
+    modelo = registro.obter()
+    return modelo.model, modelo.feature_names
+
+def _modelo_carregado(model, feature_names):
+    """Modelo do registro ou, se informado pelo chamador, o próprio modelo com seus índices."""
+    if model is None:
+        return registro.obter()
+    if isinstance(model, ModeloCarregado):
+        return model
+    return ModeloCarregado(model, feature_names, CATEGORICAL_FIELDS)
+
+# Regras de fatores de risco do pedido: nome -> (campo, comparação, limite)
+REGRAS_RISCO = {
+    'dti_alto': ('dti', np.greater, 30),
+    'emprestimo_renda_alto': ('loan_to_income', np.greater, 0.3),
+    'taxa_alta': ('int_rate', np.greater, 20),
+    'grade_baixa': ('grade', np.isin, ['E', 'F', 'G']),
+}
+
+def preencher_features(X, dados_emprestimo, modelo):
+    """Preenche a linha de features X (array 1-D) com os dados de um pedido."""
+    # Preencher valores numéricos
+    for field in NUMERIC_FIELDS:
+        idx = modelo.indices.get(field)
+        if idx is not None and field in dados_emprestimo:
+            X[idx] = dados_emprestimo[field]
     
-    # Carregar nomes das features
-    with open(os.path.join(model_dir, 'feature_names.pkl'), 'rb') as f:
-        feature_names = pickle.load(f)
+    # Preencher campos categóricos (coluna da categoria, se o modelo a conhece)
+    for campo in CATEGORICAL_FIELDS:
+        if campo in dados_emprestimo:
+            idx = modelo.slots[campo].get(str(dados_emprestimo[campo]))
+            if idx is not None:
+                X[idx] = 1
     
-    return model, feature_names
+    return X
+
+def montar_resultado(prob_default):
+    """Resultado da análise a partir da probabilidade de default (a classe é derivada dela)."""
+    prob_default = float(prob_default)
+    return {
+        'probabilidade_default': round(prob_default * 100, 1),
+        'previsao': 'ALTO RISCO' if prob_default > 0.5 else 'BAIXO RISCO',
+        'nivel_confianca': 'ALTA' if abs(prob_default - 0.5) > 0.3 else 'MÉDIA' if abs(prob_default - 0.5) > 0.15 else 'BAIXA'
+    }
 
-def analisar_emprestimo(dados_emprestimo):
+def analisar_emprestimo(dados_emprestimo, model=None, feature_names=None):
     """
     Analisa um novo pedido de empréstimo.
     
@@ -31,48 +84,92 @@ def analisar_emprestimo(dados_emprestimo):
         'grade': 'B',              # Nota de crédito
         'purpose': 'debt_consolidation'  # Finalidade
     }
+    
+    Se `model` não for informado, é usado o modelo do registro. `model` também
+    pode ser um `ModeloCarregado` (nesse caso, `feature_names` é dispensado).
     """
-    # Carregar modelo e features
-    model, feature_names = carregar_modelo()
+    modelo = _modelo_carregado(model, feature_names)
+    model = modelo.model
+    
+    # O pipeline aplica toda a transformação do treino aos dados brutos
+    if isinstance(model, PipelineInferencia):
+        return montar_resultado(model.probabilidade(dados_emprestimo))
     
     # Preparar os dados no formato correto
-    X = np.zeros(len(feature_names))
+    X = preencher_features(np.zeros(len(modelo.feature_names)), dados_emprestimo, modelo)
     
-    # Preencher valores numéricos
-    numeric_fields = ['loan_amnt', 'int_rate', 'annual_inc', 'dti', 'loan_to_income']
-    for field in numeric_fields:
-        if field in dados_emprestimo and field in feature_names:
-            idx = feature_names.index(field)
-            X[idx] = dados_emprestimo[field]
+    # Fazer a previsão
+    if isinstance(model, PontuadorLinear):
+        prob_default = model.probabilidade(X)
+    else:
+        prob_default = model.predict_proba(X.reshape(1, -1))[0][1]
     
-    # Preencher campos categóricos
-    if 'grade' in dados_emprestimo:
-        grade = dados_emprestimo['grade']
-        grade_feature = f'grade_{grade}'
-        if grade_feature in feature_names:
-            idx = feature_names.index(grade_feature)
-            X[idx] = 1
+    return montar_resultado(prob_default)
+
+def montar_matriz(df, modelo):
+    """
+    Matriz de features (uma linha por pedido) a partir de um DataFrame com as
+    colunas de `NUMERIC_FIELDS` e `CATEGORICAL_FIELDS`. Campos ausentes ou vazios
+    ficam zerados, como em `preencher_features`.
+    """
+    X = np.zeros((len(df), len(modelo.feature_names)))
     
-    if 'purpose' in dados_emprestimo:
-        purpose = dados_emprestimo['purpose']
-        purpose_feature = f'purpose_{purpose}'
-        if purpose_feature in feature_names:
-            idx = feature_names.index(purpose_feature)
-            X[idx] = 1
+    for field in NUMERIC_FIELDS:
+        if field in df.columns and field in modelo.indices:
+            X[:, modelo.indices[field]] = pd.to_numeric(df[field], errors='coerce').fillna(0).to_numpy(dtype=float)
     
-    # Fazer a previsão
-    X = X.reshape(1, -1)
-    prob_default = model.predict_proba(X)[0][1]
-    is_default = model.predict(X)[0]
+    # One-hot: coluna de cada categoria conhecida (categorias fora do modelo ficam zeradas)
+    linhas = np.arange(len(df))
+    for campo in CATEGORICAL_FIELDS:
+        if campo not in df.columns:
+            continue
+        colunas = df[campo].astype(str).map(modelo.slots[campo]).fillna(-1).to_numpy(dtype=int)
+        conhecidas = colunas >= 0
+        X[linhas[conhecidas], colunas[conhecidas]] = 1
     
-    # Preparar o resultado
-    resultado = {
-        'probabilidade_default': round(prob_default * 100, 1),
-        'previsao': 'ALTO RISCO' if is_default == 1 else 'BAIXO RISCO',
-        'nivel_confianca': 'ALTA' if abs(prob_default - 0.5) > 0.3 else 'MÉDIA' if abs(prob_default - 0.5) > 0.15 else 'BAIXA'
-    }
+    return X
+
+def analisar_emprestimos_df(df, model=None, feature_names=None):
+    """
+    Analisa um DataFrame de pedidos de empréstimo com uma única chamada ao modelo.
     
-    return resultado
+    Retorna um DataFrame com o mesmo índice de `df` e as colunas
+    `probabilidade_default`, `previsao` e `nivel_confianca`.
+    """
+    modelo = _modelo_carregado(model, feature_names)
+    if isinstance(modelo.model, PipelineInferencia):
+        prob_default = modelo.model.predict_proba(df)[:, 1]
+    else:
+        prob_default = modelo.model.predict_proba(montar_matriz(df, modelo))[:, 1]
+    distancia = np.abs(prob_default - 0.5)
+    return pd.DataFrame({
+        'probabilidade_default': np.round(prob_default * 100, 1),
+        'previsao': np.where(prob_default > 0.5, 'ALTO RISCO', 'BAIXO RISCO'),
+        'nivel_confianca': np.select([distancia > 0.3, distancia > 0.15], ['ALTA', 'MÉDIA'], 'BAIXA'),
+    }, index=df.index)
+
+def fatores_risco_df(df):
+    """
+    Uma coluna booleana `risco_<nome>` por regra de REGRAS_RISCO (campos
+    ausentes no DataFrame não disparam a regra).
+    """
+    fatores = pd.DataFrame(index=df.index)
+    for nome, (campo, comparacao, limite) in REGRAS_RISCO.items():
+        if campo in df.columns:
+            valores = df[campo].astype(object) if comparacao is np.isin else pd.to_numeric(df[campo], errors='coerce')
+            fatores[f'risco_{nome}'] = comparacao(valores.to_numpy(), limite)
+        else:
+            fatores[f'risco_{nome}'] = False
+    return fatores
+
+def analisar_emprestimos_lote(lista_dados, model=None, feature_names=None):
+    """
+    Analisa vários pedidos de empréstimo com uma única chamada ao modelo.
+    
+    Retorna uma lista de resultados (no formato de `analisar_emprestimo`), na
+    mesma ordem de `lista_dados`.
+    """
+    return analisar_emprestimos_df(pd.DataFrame(list(lista_dados)), model, feature_names).to_dict('records')
 
 def imprimir_resultado(resultado):
     """Imprime o resultado da análise de forma clara."""
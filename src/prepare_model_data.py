@@ -1,10 +1,10 @@
-import pandas as pd
-import numpy as np
 from sklearn.preprocessing import StandardScaler, OneHotEncoder
 from sklearn.model_selection import train_test_split
 from sklearn.compose import ColumnTransformer
 import pickle
 import os
+from data_processing.processed_data import carregar_dados_processados
+from data_processing.model_matrices import salvar_matrizes
 
 # Criar diretório para salvar os objetos do modelo
 print("0. Criando diretório para os objetos do modelo...")
@@ -12,12 +12,8 @@ model_dir = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'models')
 if not os.path.exists(model_dir):
     os.makedirs(model_dir)
 
-# 1. Carregar e preparar os dados
-print("\n1. Carregando os dados...")
-df = pd.read_csv(r'C:\Users\ronaldo.pereira\Desktop\Projetos\credit_analysis\data\processed\lending_club_processed.csv')
-
-# 2. Selecionar features relevantes
-print("\n2. Selecionando features relevantes...")
+# 1. Selecionar features relevantes
+print("\n1. Selecionando features relevantes...")
 numeric_features = [
     'loan_amnt',      # Valor do empréstimo
     'int_rate',       # Taxa de juros
@@ -35,6 +31,10 @@ categorical_features = [
     'term'           # Prazo
 ]
 
+# 2. Carregar apenas as colunas necessárias
+print("\n2. Carregando os dados...")
+df = carregar_dados_processados(colunas=numeric_features + categorical_features + ['default'])
+
 # 3. Criar features derivadas
 print("\n3. Criando features derivadas...")
 df['loan_to_income'] = (df['loan_amnt'] / df['annual_inc']).clip(upper=1)  # Limitando a 100% da renda
@@ -44,13 +44,17 @@ numeric_features.extend(['loan_to_income', 'payment_to_income'])
 # 4. Tratar valores faltantes
 print("\n4. Tratando valores faltantes...")
 # Para features numéricas: preencher com a mediana
+# (os valores usados são guardados para aplicar o mesmo preenchimento na inferência)
+valores_preenchimento = {}
 for col in numeric_features:
-    df[col] = df[col].fillna(df[col].median())
+    valores_preenchimento[col] = df[col].median()
+    df[col] = df[col].fillna(valores_preenchimento[col])
     print(f"- Valores faltantes em {col}: {df[col].isnull().sum()}")
 
 # Para features categóricas: preencher com a moda (valor mais frequente)
 for col in categorical_features:
-    df[col] = df[col].fillna(df[col].mode()[0])
+    valores_preenchimento[col] = df[col].mode()[0]
+    df[col] = df[col].fillna(valores_preenchimento[col])
     print(f"- Valores faltantes em {col}: {df[col].isnull().sum()}")
 
 # 5. Separar features (X) e target (y)
@@ -71,12 +75,13 @@ print("\n7. Criando pipeline de transformação...")
 numeric_transformer = StandardScaler()  # Padroniza os dados numéricos
 categorical_transformer = OneHotEncoder(drop='first')  # Converte categorias em colunas binárias
 
-# Combinar transformadores
+# Combinar transformadores (saída sempre esparsa: o one-hot não é materializado em formato denso)
 preprocessor = ColumnTransformer(
     transformers=[
         ('num', numeric_transformer, numeric_features),
         ('cat', categorical_transformer, categorical_features)
-    ])
+    ],
+    sparse_threshold=1.0)
 
 # 8. Ajustar e transformar os dados de treino
 print("\n8. Transformando os dados...")
@@ -84,12 +89,8 @@ X_train_transformed = preprocessor.fit_transform(X_train)
 X_test_transformed = preprocessor.transform(X_test)
 
 # Obter nomes das features após transformação
-cat_feature_names = []
-for i, feature in enumerate(categorical_features):
-    # Obter categorias únicas para cada feature categórica
-    unique_cats = X_train[feature].unique()
-    # Adicionar nomes das features (excluindo primeira categoria devido a drop='first')
-    cat_feature_names.extend([f"{feature}_{cat}" for cat in unique_cats[1:]])
+# (categorias na ordem do encoder, sem a primeira de cada feature devido a drop='first')
+cat_feature_names = list(preprocessor.named_transformers_['cat'].get_feature_names_out(categorical_features))
 
 feature_names = numeric_features + cat_feature_names
 
@@ -101,11 +102,11 @@ with open(os.path.join(model_dir, 'preprocessor.pkl'), 'wb') as f:
 with open(os.path.join(model_dir, 'feature_names.pkl'), 'wb') as f:
     pickle.dump(feature_names, f)
 
-# Salvar também os dados transformados
-np.save(os.path.join(model_dir, 'X_train_transformed.npy'), X_train_transformed)
-np.save(os.path.join(model_dir, 'X_test_transformed.npy'), X_test_transformed)
-np.save(os.path.join(model_dir, 'y_train.npy'), y_train.values)
-np.save(os.path.join(model_dir, 'y_test.npy'), y_test.values)
+with open(os.path.join(model_dir, 'valores_preenchimento.pkl'), 'wb') as f:
+    pickle.dump(valores_preenchimento, f)
+
+# Salvar também os dados transformados (CSR em .npz)
+salvar_matrizes(model_dir, X_train_transformed, X_test_transformed, y_train.values, y_test.values)
 
 print("\nPreparação dos dados concluída! Os dados estão prontos para o modelo.")
 print(f"Dimensões finais dos dados de treino: {X_train_transformed.shape}")
@@ -113,9 +114,10 @@ print(f"Dimensões finais dos dados de treino: {X_train_transformed.shape}")
 # 10. Mostrar algumas estatísticas dos dados transformados
 print("\n10. Estatísticas dos dados transformados:")
 print("\nFeatures numéricas (após padronização):")
+X_train_numeric = X_train_transformed[:, :len(numeric_features)].toarray()
 for i, feature in enumerate(numeric_features):
-    mean = X_train_transformed[:, i].mean()
-    std = X_train_transformed[:, i].std()
+    mean = X_train_numeric[:, i].mean()
+    std = X_train_numeric[:, i].std()
     print(f"{feature}:")
     print(f"  - Média: {mean:.3f}")
     print(f"  - Desvio Padrão: {std:.3f}")
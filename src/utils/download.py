@@ -0,0 +1,149 @@
+"""
+Download de arquivos com cache, retomada e verificação de integridade
+"""
+import hashlib
+import json
+import os
+
+import requests
+from tqdm import tqdm
+
+# Buffer de leitura/escrita (1 MiB)
+TAMANHO_BUFFER = 1024 * 1024
+
+
+def caminho_metadados(destino):
+    """Arquivo com ETag, Last-Modified e checksum do download."""
+    return f'{destino}.meta.json'
+
+
+def ler_metadados(destino):
+    """Lê os metadados de um download anterior (dicionário vazio se não houver)."""
+    try:
+        with open(caminho_metadados(destino), 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return {}
+
+
+def salvar_metadados(destino, metadados):
+    with open(caminho_metadados(destino), 'w', encoding='utf-8') as f:
+        json.dump(metadados, f, indent=2)
+
+
+def _remover_parcial(parcial):
+    for caminho in (parcial, caminho_metadados(parcial)):
+        if os.path.exists(caminho):
+            os.remove(caminho)
+
+
+def _tamanho_content_range(content_range):
+    """Tamanho total em um cabeçalho `Content-Range: bytes */N` (None se desconhecido)."""
+    total = (content_range or '').rpartition('/')[2].strip()
+    return int(total) if total.isdigit() else None
+
+
+def calcular_sha256(caminho, tamanho_buffer=TAMANHO_BUFFER):
+    """Calcula o SHA-256 de um arquivo lendo-o em blocos."""
+    sha256 = hashlib.sha256()
+    with open(caminho, 'rb') as f:
+        for bloco in iter(lambda: f.read(tamanho_buffer), b''):
+            sha256.update(bloco)
+    return sha256.hexdigest()
+
+
+def _transferir(response, parcial, url, inicio, tamanho_buffer):
+    """Grava o corpo da resposta em `parcial` (anexando, se for 206). Retorna os metadados do download."""
+    if response.status_code != 206:
+        # Servidor ignorou o Range (ou o arquivo mudou): recomeçar do zero
+        inicio = 0
+
+    metadados = {
+        'url': url,
+        'etag': response.headers.get('ETag'),
+        'last_modified': response.headers.get('Last-Modified'),
+    }
+    if inicio == 0:
+        salvar_metadados(parcial, metadados)
+
+    total_size = inicio + int(response.headers.get('content-length', 0))
+    with open(parcial, 'ab' if inicio else 'wb') as file, tqdm(
+        desc="Download Progress",
+        total=total_size,
+        initial=inicio,
+        unit='iB',
+        unit_scale=True
+    ) as pbar:
+        for data in response.iter_content(chunk_size=tamanho_buffer):
+            size = file.write(data)
+            pbar.update(size)
+    return metadados
+
+
+def baixar_arquivo(url, destino, verificar_remoto=True, sha256_esperado=None,
+                   tamanho_buffer=TAMANHO_BUFFER, timeout=60):
+    """
+    Baixa `url` para `destino` apenas quando necessário.
+
+    - Se o arquivo local já tem o checksum esperado, nada é feito.
+    - Com `verificar_remoto=False`, um arquivo local já baixado é usado sem acessar a rede.
+    - Caso contrário é feita uma requisição condicional (ETag / Last-Modified);
+      a resposta 304 encerra o processo sem transferir dados.
+    - Downloads interrompidos continuam de onde pararam (HTTP Range) a partir
+      do arquivo `<destino>.part`. Se o servidor responde 416 e o `.part` já tem
+      o tamanho total do arquivo (processo interrompido antes da renomeação),
+      ele só é verificado e renomeado; com outro tamanho, o download recomeça.
+
+    Retorna True se o arquivo foi (re)baixado e False se o local já estava atualizado.
+    """
+    metadados = ler_metadados(destino)
+    existe = os.path.exists(destino) and metadados.get('url') == url
+
+    if existe:
+        if sha256_esperado and metadados.get('sha256') == sha256_esperado:
+            return False
+        if not verificar_remoto and not sha256_esperado:
+            return False
+
+    parcial = f'{destino}.part'
+    metadados_parcial = ler_metadados(parcial)
+    inicio = os.path.getsize(parcial) if os.path.exists(parcial) else 0
+
+    headers = {}
+    if existe:
+        if metadados.get('etag'):
+            headers['If-None-Match'] = metadados['etag']
+        if metadados.get('last_modified'):
+            headers['If-Modified-Since'] = metadados['last_modified']
+    elif inicio and metadados_parcial.get('url') == url:
+        headers['Range'] = f'bytes={inicio}-'
+        # Só retoma se o arquivo remoto não mudou desde o início do download
+        validador = metadados_parcial.get('etag') or metadados_parcial.get('last_modified')
+        if validador:
+            headers['If-Range'] = validador
+    else:
+        inicio = 0
+
+    with requests.get(url, headers=headers, stream=True, timeout=timeout) as response:
+        if response.status_code == 304:
+            return False
+        if response.status_code == 416 and 'Range' in headers:
+            if _tamanho_content_range(response.headers.get('Content-Range')) != inicio:
+                # O .part não corresponde ao arquivo remoto: recomeçar do zero
+                _remover_parcial(parcial)
+                return baixar_arquivo(url, destino, verificar_remoto, sha256_esperado, tamanho_buffer, timeout)
+            # O .part já está completo: falta só verificar e renomear
+            novos_metadados = {chave: metadados_parcial.get(chave) for chave in ('url', 'etag', 'last_modified')}
+        else:
+            response.raise_for_status()
+            novos_metadados = _transferir(response, parcial, url, inicio, tamanho_buffer)
+
+    sha256 = calcular_sha256(parcial, tamanho_buffer)
+    if sha256_esperado and sha256 != sha256_esperado:
+        _remover_parcial(parcial)
+        raise ValueError(f"Checksum inválido para {url}: esperado {sha256_esperado}, obtido {sha256}")
+
+    os.replace(parcial, destino)
+    os.remove(caminho_metadados(parcial))
+    salvar_metadados(destino, {**novos_metadados, 'sha256': sha256, 'tamanho': os.path.getsize(destino)})
+    return True
@@ -0,0 +1,33 @@
+"""
+Funções de desenho compartilhadas pelo treino e pela comparação de modelos.
+
+Recebem apenas os dados do gráfico e o `caminho` do PNG, para serem
+agendadas em `utils.plot_cache.RenderizadorGraficos`.
+"""
+import matplotlib.pyplot as plt
+import seaborn as sns
+
+
+def desenhar_matrizes_confusao(matrizes, caminho, figsize=(8, 6)):
+    """Uma matriz de confusão por subplot; `matrizes` é {título: matriz}."""
+    fig, axes = plt.subplots(1, len(matrizes), figsize=figsize, squeeze=False)
+    for ax, (titulo, matriz) in zip(axes[0], matrizes.items()):
+        sns.heatmap(matriz, annot=True, fmt='d', cmap='Blues', ax=ax)
+        ax.set_title(titulo)
+        ax.set_ylabel('Real')
+        ax.set_xlabel('Previsto')
+    fig.tight_layout()
+    fig.savefig(caminho)
+    plt.close(fig)
+
+
+def desenhar_importancia_features(feature_importance, caminho, titulo, xlabel=None, figsize=(12, 6)):
+    """Barras horizontais de `feature_importance` (colunas 'feature' e 'importance', já ordenado)."""
+    plt.figure(figsize=figsize)
+    sns.barplot(x='importance', y='feature', data=feature_importance)
+    plt.title(titulo)
+    if xlabel:
+        plt.xlabel(xlabel)
+    plt.tight_layout()
+    plt.savefig(caminho)
+    plt.close()
@@ -0,0 +1,197 @@
+"""
+Geração de gráficos com cache por conteúdo e renderização em paralelo.
+
+Cada gráfico é descrito por uma função de desenho (nível de módulo) e pelos
+dados pequenos que ela recebe (agregados, matrizes de confusão, curvas). A
+chave do gráfico é o hash desses dados e do código da função; se o PNG já
+existe com a mesma chave (manifesto `.plot_cache.json` no diretório), ele
+não é desenhado de novo. Os gráficos que faltam são desenhados em processos
+separados com o backend 'Agg', sem bloquear quem os agendou até `concluir()`.
+
+Uso:
+    with RenderizadorGraficos(plots_dir) as graficos:
+        graficos.agendar('grafico.png', desenhar_barras, dados, titulo='...')
+"""
+import hashlib
+import inspect
+import json
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+MANIFESTO = '.plot_cache.json'
+
+
+def _atualizar_hash(h, obj):
+    """Inclui `obj` no hash pelo conteúdo (arrays e DataFrames pelos valores, não pela identidade)."""
+    if isinstance(obj, (pd.DataFrame, pd.Series)):
+        h.update(pd.util.hash_pandas_object(obj, index=True).to_numpy().tobytes())
+        nomes = list(obj.columns) if isinstance(obj, pd.DataFrame) else [obj.name]
+        h.update(repr((type(obj).__name__, obj.shape, nomes, obj.index.name)).encode())
+    elif isinstance(obj, np.ndarray):
+        h.update(repr((obj.dtype.str, obj.shape)).encode())
+        h.update(np.ascontiguousarray(obj).view(np.uint8) if obj.dtype != object else repr(obj.tolist()).encode())
+    elif isinstance(obj, dict):
+        h.update(b'{')
+        for chave in sorted(obj, key=repr):
+            _atualizar_hash(h, chave)
+            _atualizar_hash(h, obj[chave])
+        h.update(b'}')
+    elif isinstance(obj, (list, tuple)):
+        h.update(b'[')
+        for item in obj:
+            _atualizar_hash(h, item)
+        h.update(b']')
+    else:
+        h.update(repr(obj).encode())
+
+
+def hash_conteudo(*objs):
+    h = hashlib.sha256()
+    for obj in objs:
+        _atualizar_hash(h, obj)
+    return h.hexdigest()
+
+
+def _codigo(funcao):
+    try:
+        return inspect.getsource(funcao)
+    except (OSError, TypeError):
+        return f'{funcao.__module__}.{funcao.__qualname__}'
+
+
+def _aplicar_estilo(estilo, paleta):
+    import matplotlib
+    matplotlib.use('Agg')
+    import matplotlib.pyplot as plt
+
+    if estilo:
+        try:
+            plt.style.use(estilo)
+        except OSError:
+            # 'seaborn' foi renomeado para 'seaborn-v0_8' no matplotlib 3.6
+            plt.style.use(estilo.replace('seaborn', 'seaborn-v0_8', 1))
+    if paleta:
+        import seaborn as sns
+        sns.set_palette(paleta)
+
+
+def _desenhar(funcao, caminho, args, kwargs):
+    """Executado no worker: desenha em um arquivo temporário e renomeia (nunca deixa um PNG pela metade)."""
+    import matplotlib.pyplot as plt
+
+    raiz, extensao = os.path.splitext(caminho)
+    caminho_tmp = f'{raiz}.{os.getpid()}.tmp{extensao}'
+    try:
+        funcao(*args, caminho=caminho_tmp, **kwargs)
+        os.replace(caminho_tmp, caminho)
+    finally:
+        plt.close('all')
+        if os.path.exists(caminho_tmp):
+            os.remove(caminho_tmp)
+    return caminho
+
+
+class RenderizadorGraficos:
+    """
+    Agenda gráficos em `diretorio`, desenhando apenas os que mudaram.
+
+    - processos: workers usados para desenhar (0 desenha no próprio processo,
+      na hora do agendamento). Os workers são criados com 'fork': com
+      'spawn' eles reimportariam o script principal, e scripts sem
+      `if __name__ == "__main__"` (como o treino) rodariam de novo; onde
+      'fork' não existe, os gráficos são desenhados no próprio processo
+    - habilitado: False ignora todos os gráficos (treino sem gráficos)
+    - estilo, paleta: estilo do matplotlib e paleta do seaborn aplicados
+      antes de desenhar (fazem parte da chave do cache)
+    """
+
+    def __init__(self, diretorio, processos=None, habilitado=True, estilo=None, paleta=None):
+        self.diretorio = diretorio
+        self.processos = min(4, os.cpu_count() or 1) if processos is None else processos
+        if 'fork' not in multiprocessing.get_all_start_methods():
+            self.processos = 0
+        self.habilitado = habilitado
+        self.estilo = estilo
+        self.paleta = paleta
+        self.em_cache = 0
+        self.renderizados = 0
+        self._executor = None
+        self._pendentes = {}
+        self._manifesto = None
+
+    def _carregar_manifesto(self):
+        if self._manifesto is None:
+            try:
+                with open(os.path.join(self.diretorio, MANIFESTO)) as f:
+                    self._manifesto = json.load(f)
+            except (FileNotFoundError, json.JSONDecodeError):
+                self._manifesto = {}
+        return self._manifesto
+
+    def _salvar_manifesto(self):
+        caminho = os.path.join(self.diretorio, MANIFESTO)
+        caminho_tmp = f'{caminho}.{os.getpid()}.tmp'
+        with open(caminho_tmp, 'w') as f:
+            json.dump(self._manifesto, f, indent=2, sort_keys=True)
+        os.replace(caminho_tmp, caminho)
+
+    def agendar(self, arquivo, funcao, *args, **kwargs):
+        """
+        Agenda `funcao(*args, caminho=<diretorio>/<arquivo>, **kwargs)`.
+        Retorna False se o gráfico já está atualizado (nada a desenhar).
+        """
+        if not self.habilitado:
+            return False
+        os.makedirs(self.diretorio, exist_ok=True)
+        caminho = os.path.join(self.diretorio, arquivo)
+        chave = hash_conteudo(_codigo(funcao), self.estilo, self.paleta, args, kwargs)
+        manifesto = self._carregar_manifesto()
+        if manifesto.get(arquivo) == chave and os.path.exists(caminho):
+            self.em_cache += 1
+            return False
+
+        # O arquivo sai do manifesto até ser redesenhado
+        manifesto.pop(arquivo, None)
+        if self.processos == 0:
+            _aplicar_estilo(self.estilo, self.paleta)
+            _desenhar(funcao, caminho, args, kwargs)
+            self._registrar(arquivo, chave)
+        else:
+            if self._executor is None:
+                self._executor = ProcessPoolExecutor(max_workers=self.processos,
+                                                     mp_context=multiprocessing.get_context('fork'),
+                                                     initializer=_aplicar_estilo,
+                                                     initargs=(self.estilo, self.paleta))
+            self._pendentes[arquivo] = (chave, self._executor.submit(_desenhar, funcao, caminho, args, kwargs))
+        return True
+
+    def _registrar(self, arquivo, chave):
+        self._manifesto[arquivo] = chave
+        self.renderizados += 1
+        self._salvar_manifesto()
+
+    def concluir(self):
+        """Espera os gráficos agendados e atualiza o manifesto. Retorna {'renderizados': n, 'em_cache': n}."""
+        try:
+            for arquivo, (chave, future) in self._pendentes.items():
+                future.result()
+                self._manifesto[arquivo] = chave
+                self.renderizados += 1
+        finally:
+            self._pendentes = {}
+            if self._executor is not None:
+                self._executor.shutdown()
+                self._executor = None
+            if self._manifesto is not None:
+                self._salvar_manifesto()
+        return {'renderizados': self.renderizados, 'em_cache': self.em_cache}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.concluir()
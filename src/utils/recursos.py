@@ -0,0 +1,27 @@
+"""
+Medição de recursos do processo atual
+"""
+import sys
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+
+def pico_memoria_mb():
+    """Pico de memória residente do processo atual (None se indisponível)."""
+    # No Linux, ru_maxrss herda o pico do processo pai; VmHWM mede só este processo
+    try:
+        with open('/proc/self/status') as f:
+            for linha in f:
+                if linha.startswith('VmHWM:'):
+                    return int(linha.split()[1]) / 1024
+    except OSError:
+        pass
+
+    if resource is None:
+        return None
+    pico = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux informa em KiB, macOS em bytes
+    return pico / (1024 * 1024) if sys.platform == 'darwin' else pico / 1024
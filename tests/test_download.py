@@ -0,0 +1,128 @@
+"""
+Testes de `utils.download.baixar_arquivo` contra um servidor HTTP local
+(http.server) com ETag, requisições condicionais e Range.
+"""
+import hashlib
+import os
+import sys
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'src'))
+from utils.download import baixar_arquivo, caminho_metadados, ler_metadados, salvar_metadados
+
+CONTEUDO = bytes(range(256)) * 400
+ETAG = '"v1"'
+
+
+class Handler(BaseHTTPRequestHandler):
+    conteudo = CONTEUDO
+    etag = ETAG
+    requisicoes = []
+
+    def log_message(self, *args):
+        pass
+
+    def do_GET(self):
+        type(self).requisicoes.append(dict(self.headers))
+        if self.headers.get('If-None-Match') == self.etag:
+            self.send_response(304)
+            self.end_headers()
+            return
+
+        intervalo = self.headers.get('Range')
+        if intervalo and self.headers.get('If-Range', self.etag) == self.etag:
+            inicio = int(intervalo.removeprefix('bytes=').rstrip('-'))
+            if inicio >= len(self.conteudo):
+                self.send_response(416)
+                self.send_header('Content-Range', f'bytes */{len(self.conteudo)}')
+                self.send_header('Content-Length', '0')
+                self.end_headers()
+                return
+            corpo = self.conteudo[inicio:]
+            self.send_response(206)
+            self.send_header('Content-Range', f'bytes {inicio}-{len(self.conteudo) - 1}/{len(self.conteudo)}')
+        else:
+            corpo = self.conteudo
+            self.send_response(200)
+        self.send_header('ETag', self.etag)
+        self.send_header('Content-Length', str(len(corpo)))
+        self.end_headers()
+        self.wfile.write(corpo)
+
+
+@pytest.fixture
+def servidor():
+    Handler.requisicoes = []
+    httpd = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    yield f'http://127.0.0.1:{httpd.server_address[1]}/dados.zip'
+    httpd.shutdown()
+    httpd.server_close()
+
+
+def _parcial(destino, conteudo, etag=ETAG, url=None):
+    """Simula um download interrompido: `<destino>.part` e seus metadados."""
+    with open(f'{destino}.part', 'wb') as f:
+        f.write(conteudo)
+    salvar_metadados(f'{destino}.part', {'url': url, 'etag': etag, 'last_modified': None})
+
+
+def _verificar_completo(destino):
+    with open(destino, 'rb') as f:
+        assert f.read() == CONTEUDO
+    assert not os.path.exists(f'{destino}.part')
+    assert not os.path.exists(caminho_metadados(f'{destino}.part'))
+    assert ler_metadados(destino)['sha256'] == hashlib.sha256(CONTEUDO).hexdigest()
+
+
+def test_download_completo(servidor, tmp_path):
+    destino = str(tmp_path / 'dados.zip')
+    assert baixar_arquivo(servidor, destino) is True
+    _verificar_completo(destino)
+    assert 'Range' not in Handler.requisicoes[-1]
+
+
+def test_arquivo_atualizado_responde_304(servidor, tmp_path):
+    destino = str(tmp_path / 'dados.zip')
+    baixar_arquivo(servidor, destino)
+    assert baixar_arquivo(servidor, destino) is False
+    assert Handler.requisicoes[-1]['If-None-Match'] == ETAG
+    _verificar_completo(destino)
+
+
+def test_retoma_download_interrompido(servidor, tmp_path):
+    destino = str(tmp_path / 'dados.zip')
+    _parcial(destino, CONTEUDO[:1000], url=servidor)
+    assert baixar_arquivo(servidor, destino) is True
+    assert Handler.requisicoes[-1]['Range'] == 'bytes=1000-'
+    _verificar_completo(destino)
+
+
+def test_parcial_completo_responde_416(servidor, tmp_path):
+    # Processo interrompido depois da última escrita e antes da renomeação
+    destino = str(tmp_path / 'dados.zip')
+    _parcial(destino, CONTEUDO, url=servidor)
+    assert baixar_arquivo(servidor, destino) is True
+    assert len(Handler.requisicoes) == 1
+    _verificar_completo(destino)
+
+
+def test_parcial_maior_que_remoto_recomeca(servidor, tmp_path):
+    destino = str(tmp_path / 'dados.zip')
+    _parcial(destino, CONTEUDO + b'lixo', url=servidor)
+    assert baixar_arquivo(servidor, destino) is True
+    assert 'Range' not in Handler.requisicoes[-1]
+    _verificar_completo(destino)
+
+
+def test_if_range_diferente_recomeca(servidor, tmp_path):
+    # O arquivo remoto mudou desde o início do download: o servidor envia tudo (200)
+    destino = str(tmp_path / 'dados.zip')
+    _parcial(destino, b'x' * 1000, etag='"v0"', url=servidor)
+    assert baixar_arquivo(servidor, destino) is True
+    assert Handler.requisicoes[-1]['If-Range'] == '"v0"'
+    _verificar_completo(destino)
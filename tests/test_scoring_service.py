@@ -0,0 +1,70 @@
+"""
+Testes de validação do `scoring_service` através de uma conexão HTTP real
+(servidor asyncio local). O endpoint /analisar usa o validador do serviço
+e uma função de lote simples no lugar do modelo.
+"""
+import asyncio
+import json
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from scoring_service import ServicoPontuacao, validar_historico
+
+FEATURES = ['renda', 'divida']
+
+
+def _avaliar(casos):
+    return [{'probabilidade_default': 0.1, 'previsao': 'BAIXO RISCO'} for _ in casos]
+
+
+async def _post(corpo, funcao_lote=_avaliar):
+    servico = ServicoPontuacao()
+    servico._registrar('/analisar', funcao_lote, validar_historico, FEATURES)
+    servico.iniciar()
+    servidor = await asyncio.start_server(servico.tratar_conexao, '127.0.0.1', 0)
+    try:
+        reader, writer = await asyncio.open_connection('127.0.0.1', servidor.sockets[0].getsockname()[1])
+        writer.write(f"POST /analisar HTTP/1.1\r\nContent-Length: {len(corpo)}\r\n"
+                     f"Connection: close\r\n\r\n".encode('latin-1') + corpo)
+        await writer.drain()
+        resposta = await asyncio.wait_for(reader.read(), 5)
+        writer.close()
+    finally:
+        servidor.close()
+        await servico.parar()
+    cabecalho, _, corpo_resposta = resposta.partition(b'\r\n\r\n')
+    return int(cabecalho.split()[1]), corpo_resposta
+
+
+def post(corpo, **kwargs):
+    return asyncio.run(_post(corpo, **kwargs))
+
+
+def test_caso_valido():
+    status, corpo = post(b'{"renda": 5000, "divida": 1200}')
+    assert status == 200
+    assert json.loads(corpo)['previsao'] == 'BAIXO RISCO'
+
+
+def test_nan_rejeitado():
+    status, corpo = post(b'{"renda": NaN, "divida": 1200}')
+    assert status == 400
+    assert 'erro' in json.loads(corpo)
+
+
+def test_infinito_rejeitado():
+    for valor in (b'Infinity', b'-Infinity', b'1e999'):
+        status, _ = post(b'[{"renda": 5000, "divida": ' + valor + b'}]')
+        assert status == 400
+
+
+def test_resposta_nao_finita_nao_gera_json_invalido():
+    status, corpo = post(b'{"renda": 5000, "divida": 1200}',
+                         funcao_lote=lambda casos: [{'probabilidade_default': float('nan')} for _ in casos])
+    assert status == 500
+    json.loads(corpo, parse_constant=_constante_invalida)
+
+
+def _constante_invalida(nome):
+    raise AssertionError(f"Constante não JSON na resposta: {nome}")